@@ -0,0 +1,13 @@
+from fastapi import Query
+
+
+def get_fields(
+    fields: str | None = Query(
+        default=None,
+        description="Список полей через запятую, которые нужно вернуть, например: fields=title,description",
+    ),
+) -> tuple[str, ...]:
+    if not fields:
+        return ()
+
+    return tuple(dict.fromkeys(field.strip() for field in fields.split(',') if field.strip()))
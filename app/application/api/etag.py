@@ -0,0 +1,78 @@
+import zlib
+
+from fastapi import Response, status
+
+VERSION_FIELD = 'version'
+
+
+def build_etag(version: int, fields: tuple[str, ...] = ()) -> str:
+    """
+    Сильный ETag ревизии документа. Ответ с fields - другое представление того же документа,
+    поэтому набор полей входит в тег (контрольной суммой, чтобы в теге не было запятых и кавычек).
+    """
+    if not fields:
+        return f'"v{version}"'
+
+    return f'"v{version}-{zlib.crc32(",".join(fields).encode()):08x}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    If-None-Match сравнивается слабо (RFC 9110): W/ у тега клиента не мешает совпадению.
+    """
+    if if_none_match.strip() == '*':
+        return True
+
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+
+def with_version_field(fields: tuple[str, ...]) -> tuple[str, ...]:
+    """
+    Частичный документ читается вместе с version, иначе для ответа не из чего собрать ETag.
+    """
+    if not fields or VERSION_FIELD in fields:
+        return fields
+
+    return (*fields, VERSION_FIELD)
+
+
+def split_version(document: dict, fields: tuple[str, ...]) -> tuple[int, dict]:
+    """
+    Версия частичного документа и сам документ без version, если поле не запрашивали.
+    Документ не меняется: один результат чтения может достаться нескольким одинаковым запросам.
+    """
+    version = document.get(VERSION_FIELD, 0)
+
+    if VERSION_FIELD in fields:
+        return version, document
+
+    return version, {key: value for key, value in document.items() if key != VERSION_FIELD}
+
+
+def parse_if_match(if_match: str) -> int | None:
+    """
+    Версия документа из If-Match для условной записи. If-Match сравнивается строго (RFC 9110): слабый тег
+    и тег частичного представления (с набором полей) не совпадают ни с одной ревизией, как и разные версии
+    в одном заголовке. Для них поднимается ValueError, запись не выполняется. * - условия на версию нет.
+    """
+    if if_match.strip() == '*':
+        return None
+
+    versions = set()
+
+    for tag in if_match.split(','):
+        tag = tag.strip()
+
+        if not (tag.startswith('"v') and tag.endswith('"') and tag[2:-1].isascii() and tag[2:-1].isdigit()):
+            raise ValueError(tag)
+
+        versions.add(int(tag[2:-1]))
+
+    if len(versions) != 1:
+        raise ValueError(if_match)
+
+    return versions.pop()
@@ -0,0 +1,148 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Literal
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+from ...infra.repositories.converters import PRODUCT_DOCUMENT_FIELDS
+from .pagination import json_default
+
+ExportFormat = Literal['ndjson', 'csv']
+
+EXPORT_MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+INVENTORY_CSV_COLUMNS = ('pharmacy_oid', 'pharmacy_title', 'product_oid', 'price', 'count')
+
+
+def format_csv_value(value):
+    if value is None:
+        return ''
+
+    if isinstance(value, datetime):
+        return value.isoformat()
+
+    return value
+
+
+async def iter_ndjson(documents: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    async for document in documents:
+        yield orjson.dumps(document, default=json_default, option=orjson.OPT_APPEND_NEWLINE)
+
+
+async def iter_csv(rows: AsyncIterator[dict], columns: tuple[str, ...], chunk_size: int) -> AsyncIterator[bytes]:
+    """
+    Строки пишутся в один буфер и отдаются кусками не меньше chunk_size, буфер после отдачи очищается.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+
+    async for row in rows:
+        writer.writerow([format_csv_value(row.get(column)) for column in columns])
+
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def iter_inventory_rows(pharmacies: AsyncIterator[dict]) -> AsyncIterator[dict]:
+    """
+    Аптеки разворачиваются в строки позиций, для CSV у каждой позиции свои колонки аптеки.
+    """
+    async for pharmacy_document in pharmacies:
+        for position in pharmacy_document['products']:
+            yield {
+                'pharmacy_oid': pharmacy_document['oid'],
+                'pharmacy_title': pharmacy_document['title'],
+                **position,
+            }
+
+
+async def join_chunks(parts: AsyncIterator[bytes], chunk_size: int) -> AsyncIterator[bytes]:
+    """
+    Маленькие куски (строка NDJSON на документ) склеиваются, чтобы не отправлять каждый отдельной записью в сокет.
+    """
+    chunk = []
+    size = 0
+
+    async for part in parts:
+        chunk.append(part)
+        size += len(part)
+
+        if size >= chunk_size:
+            yield b''.join(chunk)
+            chunk.clear()
+            size = 0
+
+    if chunk:
+        yield b''.join(chunk)
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=GZIP_WBITS)
+
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+
+        if compressed:
+            yield compressed
+
+    yield compressor.flush()
+
+
+def export_response(
+    chunks: AsyncIterator[bytes],
+    filename: str,
+    export_format: ExportFormat,
+    gzip: bool,
+) -> StreamingResponse:
+    """
+    Файл выгрузки отдается потоком. Сжатый файл отдается как .gz, а не через Content-Encoding,
+    чтобы клиент сохранял его без распаковки.
+    """
+    filename = f'{filename}.{export_format}'
+    media_type = EXPORT_MEDIA_TYPES[export_format]
+
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        filename = f'{filename}.gz'
+        media_type = 'application/gzip'
+
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+
+def encode_products_export(
+    products: AsyncIterator[dict],
+    export_format: ExportFormat,
+    chunk_size: int,
+) -> AsyncIterator[bytes]:
+    if export_format == 'csv':
+        return iter_csv(products, PRODUCT_DOCUMENT_FIELDS, chunk_size)
+
+    return join_chunks(iter_ndjson(products), chunk_size)
+
+
+def encode_pharmacies_export(
+    pharmacies: AsyncIterator[dict],
+    export_format: ExportFormat,
+    chunk_size: int,
+) -> AsyncIterator[bytes]:
+    """
+    NDJSON - одна аптека со всеми позициями на строку, CSV - одна позиция на строку.
+    """
+    if export_format == 'csv':
+        return iter_csv(iter_inventory_rows(pharmacies), INVENTORY_CSV_COLUMNS, chunk_size)
+
+    return join_chunks(iter_ndjson(pharmacies), chunk_size)
@@ -1,8 +1,97 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 
+from app.infra.connections.mongo import MongoConnectionManager
+from app.infra.outbox.base import BaseOutbox
+from app.infra.repositories.base import (BasePharmacyRepo, BaseProductRepo,
+                                         BaseReservationRepo)
+from app.logic.containers.init import init_container
+from app.logic.mediator import Mediator
+from app.logic.outbox import OutboxRelay
+from app.logic.reservations import ReservationSweeper
+from app.settings.config import Config
+
+from .monitoring.handlers import router as monitoring_router
 from .pharmacy.handlers import router as pharmacy_router
 from .products.handlers import router as product_router
 
+logger = logging.getLogger(__name__)
+
+
+async def rebuild_search_indexes(repositories, interval_seconds: int):
+    """
+    Каждый воркер держит свой поисковый индекс, периодическое перестроение подтягивает изменения других воркеров.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+
+        for repository in repositories:
+            try:
+                await repository.build_search_index()
+            except Exception:
+                logger.exception('Search index rebuild failed for %s', type(repository).__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    container = init_container()
+    config: Config = container.resolve(Config)
+    connection_manager: MongoConnectionManager | None = None
+
+    if config.repository_backend == 'mongo':
+        connection_manager = container.resolve(MongoConnectionManager)
+        await connection_manager.connect()
+
+    repositories = (container.resolve(BasePharmacyRepo), container.resolve(BaseProductRepo))
+
+    for repository in repositories:
+        await repository.ensure_indexes()
+        await repository.build_search_index()
+
+    await container.resolve(BaseReservationRepo).ensure_indexes()
+    reservation_sweeper = container.resolve(ReservationSweeper)
+    reservation_sweeper.start()
+
+    event_bus = container.resolve(Mediator).event_bus
+
+    if event_bus is not None:
+        event_bus.start()
+
+    outbox_relay: OutboxRelay | None = None
+
+    if config.outbox_enabled:
+        await container.resolve(BaseOutbox).check_storage()
+        await container.resolve(BaseOutbox).ensure_indexes()
+        outbox_relay = container.resolve(OutboxRelay)
+        outbox_relay.start()
+
+    rebuild_task = None
+    if config.search_index_rebuild_interval_seconds > 0:
+        rebuild_task = asyncio.create_task(
+            rebuild_search_indexes(repositories, config.search_index_rebuild_interval_seconds),
+        )
+
+    yield
+
+    if rebuild_task is not None:
+        rebuild_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await rebuild_task
+
+    if outbox_relay is not None:
+        await outbox_relay.stop()
+
+    await reservation_sweeper.stop()
+
+    if event_bus is not None:
+        await event_bus.stop()
+
+    if connection_manager is not None:
+        await connection_manager.close()
+
 
 def create_app() -> FastAPI:
     app = FastAPI(
@@ -10,8 +99,10 @@ def create_app() -> FastAPI:
         docs_url="/api/docs",
         description="Amazon s3 + ddd",
         debug=True,
+        lifespan=lifespan,
     )
     app.include_router(pharmacy_router, prefix='/pharmacy')
     app.include_router(product_router, prefix='/products')
+    app.include_router(monitoring_router, prefix='/monitoring')
 
     return app
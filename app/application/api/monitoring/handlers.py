@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Depends, Response, status
+
+from app.infra.connections.mongo import MongoConnectionManager
+from app.infra.repositories.base import BasePharmacyRepo, BaseProductRepo
+from app.infra.repositories.cached import CachedPharmacyRepo, CachedProductRepo
+from app.logic.containers.init import init_container
+from app.logic.mediator import Mediator
+from app.logic.outbox import OutboxRelay
+from app.logic.reservations import ReservationSweeper
+from app.settings.config import Config
+
+from ..responses import render_json
+
+router = APIRouter(tags=['Monitoring'])
+
+
+@router.get(
+    '/mongo-pool',
+    status_code=status.HTTP_200_OK,
+    description="Эндпоинт возвращает статистику пула соединений MongoDB текущего воркера",
+)
+async def mongo_pool_stats(container=Depends(init_container)) -> Response:
+    '''Статистика пула соединений MongoDB'''
+    connection_manager: MongoConnectionManager = container.resolve(MongoConnectionManager)
+    return render_json(connection_manager.pool_metrics.snapshot())
+
+
+@router.get(
+    '/repository-cache',
+    status_code=status.HTTP_200_OK,
+    description="Эндпоинт возвращает счетчики кэша репозиториев текущего воркера, если кэш включен",
+)
+async def repository_cache_stats(container=Depends(init_container)) -> Response:
+    '''Статистика кэша репозиториев'''
+    stats = {}
+
+    for name, repository in (
+        ('products', container.resolve(BaseProductRepo)),
+        ('pharmacies', container.resolve(BasePharmacyRepo)),
+    ):
+        if isinstance(repository, (CachedProductRepo, CachedPharmacyRepo)):
+            stats[name] = repository.cache.snapshot()
+
+    return render_json(stats)
+
+
+@router.get(
+    '/singleflight',
+    status_code=status.HTTP_200_OK,
+    description="Эндпоинт возвращает счетчики склейки одновременных читающих команд текущего воркера",
+)
+async def singleflight_stats(container=Depends(init_container)) -> Response:
+    '''Статистика склейки читающих команд'''
+    mediator: Mediator = container.resolve(Mediator)
+
+    if mediator.singleflight is None:
+        return render_json({})
+
+    return render_json(mediator.singleflight.snapshot())
+
+
+@router.get(
+    '/event-bus',
+    status_code=status.HTTP_200_OK,
+    description="Эндпоинт возвращает глубину очереди, задержку и счетчики фоновой доставки событий текущего воркера",
+)
+async def event_bus_stats(container=Depends(init_container)) -> Response:
+    '''Статистика шины событий'''
+    mediator: Mediator = container.resolve(Mediator)
+
+    if mediator.event_bus is None:
+        return render_json({})
+
+    return render_json(mediator.event_bus.snapshot())
+
+
+@router.get(
+    '/outbox',
+    status_code=status.HTTP_200_OK,
+    description="Эндпоинт возвращает счетчики доставки событий из outbox текущего воркера, если outbox включен",
+)
+async def outbox_stats(container=Depends(init_container)) -> Response:
+    '''Статистика доставки событий из outbox'''
+    config: Config = container.resolve(Config)
+
+    if not config.outbox_enabled:
+        return render_json({})
+
+    outbox_relay: OutboxRelay = container.resolve(OutboxRelay)
+    return render_json(outbox_relay.snapshot())
+
+
+@router.get(
+    '/reservations',
+    status_code=status.HTTP_200_OK,
+    description="Эндпоинт возвращает счетчики очистки истекших резервов текущего воркера",
+)
+async def reservation_sweeper_stats(container=Depends(init_container)) -> Response:
+    '''Статистика очистки истекших резервов'''
+    return render_json(container.resolve(ReservationSweeper).snapshot())
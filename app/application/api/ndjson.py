@@ -0,0 +1,44 @@
+from typing import AsyncIterable, AsyncIterator
+
+
+async def iter_ndjson_lines(
+    stream: AsyncIterable[bytes],
+    max_line_bytes: int,
+) -> AsyncIterator[tuple[int, bytes | None]]:
+    """
+    Построчное чтение NDJSON тела запроса, возвращает номер строки и саму строку.
+    Тело читается по мере обработки строк, поэтому в памяти держится только текущий кусок
+    и незаконченная строка. Перевод строки ищется только в новом куске, а строка длиннее
+    max_line_bytes не накапливается: ее байты пропускаются до конца строки, вместо нее возвращается None.
+    """
+    buffer = bytearray()
+    line_number = 0
+    too_long = False
+
+    async for chunk in stream:
+        start = 0
+
+        while (end := chunk.find(b'\n', start)) != -1:
+            line_number += 1
+
+            if too_long or len(buffer) + end - start > max_line_bytes:
+                yield line_number, None
+            else:
+                line = bytes(buffer + chunk[start:end]) if buffer else chunk[start:end]
+                if line.strip():
+                    yield line_number, line
+
+            buffer.clear()
+            too_long = False
+            start = end + 1
+
+        if too_long or len(buffer) + len(chunk) - start > max_line_bytes:
+            buffer.clear()
+            too_long = True
+        else:
+            buffer += chunk[start:]
+
+    if too_long:
+        yield line_number + 1, None
+    elif buffer.strip():
+        yield line_number + 1, bytes(buffer)
@@ -0,0 +1,53 @@
+from typing import AsyncIterator, Callable
+
+import orjson
+
+from ...logic.pagination import encode_continuation_token
+from ...settings.config import Config
+
+
+def resolve_page_size(config: Config, page_size: int | None) -> int:
+    return min(page_size or config.search_page_size, config.search_max_page_size)
+
+
+def json_default(value):
+    # datetime orjson пишет сам, сюда попадают только типы BSON вроде ObjectId
+    return str(value)
+
+
+def search_cursor_key(item: dict) -> tuple[float, str]:
+    return item.pop('score', 0.0), item['oid']
+
+
+def inventory_cursor_key(item: dict) -> tuple[float, str]:
+    return 0.0, item['product_oid']
+
+
+def offer_cursor_key(item: dict) -> tuple[float, str]:
+    return item['price'], item['pharmacy_oid']
+
+
+async def stream_search_page(
+    items: AsyncIterator[dict],
+    items_key: str,
+    page_size: int,
+    cursor_key: Callable[[dict], tuple[float, str]] = search_cursor_key,
+) -> AsyncIterator[bytes]:
+    """
+    Отдает страницу поиска в виде {"<items_key>": [...], "continuation_token": ...} по мере чтения курсора.
+    Токен продолжения выдается только для полной страницы, его ключ берется из последнего элемента через cursor_key.
+    """
+    yield f'{{"{items_key}":['.encode()
+
+    count = 0
+    last_key = None
+
+    async for item in items:
+        last_key = cursor_key(item)
+
+        yield (b',' if count else b'') + orjson.dumps(item, default=json_default)
+        count += 1
+
+    continuation_token = encode_continuation_token(*last_key) if count == page_size else None
+
+    yield b'],"continuation_token":' + orjson.dumps(continuation_token) + b'}'
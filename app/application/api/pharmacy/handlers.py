@@ -1,24 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import Response, StreamingResponse
 
 from app.logic.containers.init import init_container
 
 from ....domain.exceptions.base import ApplicationException
 from ....domain.values.product import Text, Title
-from ....logic.commands.pharmacy import (ChangeProductPriceCommand,
+from ....logic.commands.pharmacy import (ChangeInventoryBulkCommand,
+                                         ChangeProductPriceCommand,
                                          CreatePharmacyCommand,
                                          DeletePharmacyCommand,
                                          DeleteProductFromPharmacyCommand,
+                                         ExportPharmaciesCommand,
                                          FindPharmacyCommand,
+                                         GetPharmaciesByOidsCommand,
                                          GetPharmacyByOidCommand,
+                                         GetPharmacyInventoryCommand,
+                                         GetPharmacyVersionCommand,
+                                         InventoryOperationRow,
                                          UpdatePharmacyCommand)
+from ....logic.commands.reservations import (CommitReservationCommand,
+                                             ReleaseReservationCommand,
+                                             ReserveStockCommand)
+from ....logic.exceptions.pharmacy import (NotEnoughStockException,
+                                           PharmacyVersionConflictException)
 from ....logic.mediator import Mediator
+from ....settings.config import Config
+from ..dependecies.base import get_fields
+from ..etag import (build_etag, etag_matches, not_modified, parse_if_match,
+                    split_version, with_version_field)
+from ..export import ExportFormat, encode_pharmacies_export, export_response
+from ..pagination import (inventory_cursor_key, resolve_page_size,
+                          stream_search_page)
+from ..responses import render_model
 from ..schemas import ErrorSchema
-from .schemas import (ChangeProductPriceRequestSchema,
+from .schemas import (ChangeInventoryBulkRequestSchema,
+                      ChangeInventoryBulkResponseSchema,
+                      ChangeProductPriceRequestSchema,
                       CreatePharmacyRequestSchema,
                       CreatePharmacyResponseSchema,
                       DeletePharmacyRequestSchema,
                       DeleteProductFromPharmacyRequestSchema,
                       FindPharmacyRequestSchema, FindPharmacyResponseSchema,
+                      GetPharmaciesRequestSchema, GetPharmaciesResponseSchema,
+                      GetPharmacyInventoryResponseSchema,
+                      InventoryOperationResultSchema,
+                      PartialPharmacyResponseSchema, ReservationRequestSchema,
+                      ReservationResponseSchema, ReserveProductRequestSchema,
                       UpdatePharmacyRequestSchema)
 
 router = APIRouter(
@@ -26,6 +53,19 @@ router = APIRouter(
 )
 
 
+def get_expected_version(if_match: str | None) -> int | None:
+    if if_match is None:
+        return None
+
+    try:
+        return parse_if_match(if_match)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail={'error': 'If-Match не совпадает ни с одной версией аптеки'},
+        )
+
+
 @router.post(
     '/',
     status_code=status.HTTP_201_CREATED,
@@ -41,7 +81,7 @@ async def create_pharmacy_handler(schema: CreatePharmacyRequestSchema, container
     mediator: Mediator = container.resolve(Mediator)
 
     try:
-        pharmacy, *_ = await mediator.handle_command(
+        pharmacy = await mediator.send(
             CreatePharmacyCommand(
                 title=Title(schema.title),
                 description=Text(schema.description),
@@ -50,36 +90,84 @@ async def create_pharmacy_handler(schema: CreatePharmacyRequestSchema, container
     except ApplicationException as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
 
-    return CreatePharmacyResponseSchema.from_entity(pharmacy)
+    return render_model(CreatePharmacyResponseSchema.from_entity(pharmacy), status_code=status.HTTP_201_CREATED)
 
 
 @router.get(
     '/get-pharmacy',
     status_code=status.HTTP_200_OK,
-    description="Эндпоинт ищет аптеку по oid, если его нет то возвращается 400 ошибка",
+    description="Эндпоинт ищет аптеку по oid, если его нет то возвращается 400 ошибка. "
+                "Параметр fields ограничивает набор возвращаемых полей. Ответ помечается ETag, "
+                "на запрос с совпадающим If-None-Match возвращается 304 без тела",
+    response_model=PartialPharmacyResponseSchema,
+    response_model_exclude_unset=True,
 )
 async def get_pharmacy_by_oid(
     pharmacy_oid: str,
+    fields: tuple[str, ...] = Depends(get_fields),
+    if_none_match: str | None = Header(default=None),
     container=Depends(init_container),
 ):
     '''Ищет аптеку по oid'''
     mediator: Mediator = container.resolve(Mediator)
     try:
-        pharmacy, *_ = await mediator.handle_command(
+        if if_none_match is not None:
+            version = await mediator.send(GetPharmacyVersionCommand(pharmacy_oid=pharmacy_oid))
+            etag = build_etag(version, fields)
+
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        pharmacy = await mediator.send(
             GetPharmacyByOidCommand(
                 pharmacy_oid=pharmacy_oid,
+                fields=with_version_field(fields),
             ),
         )
     except ApplicationException as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
 
-    return CreatePharmacyResponseSchema(
-        oid=pharmacy.oid,
-        title=pharmacy.title,
-        description=pharmacy.description,
-        products=pharmacy.products,
-        prices=pharmacy.prices,
-    )
+    if fields:
+        version, pharmacy = split_version(pharmacy, fields)
+        response = render_model(PartialPharmacyResponseSchema.from_document(pharmacy), exclude_unset=True)
+    else:
+        version = pharmacy.version
+        response = render_model(CreatePharmacyResponseSchema.from_stored_entity(pharmacy))
+
+    response.headers['ETag'] = build_etag(version, fields)
+    return response
+
+
+@router.post(
+    '/get-pharmacies',
+    status_code=status.HTTP_200_OK,
+    description="Эндпоинт возвращает несколько аптек по списку oid одним запросом, "
+                "oid, по которым аптека не найдена, перечисляются в not_found",
+    responses={
+        status.HTTP_200_OK: {'model': GetPharmaciesResponseSchema},
+        status.HTTP_400_BAD_REQUEST: {'model': ErrorSchema},
+    },
+)
+async def get_pharmacies_by_oids(
+    schema: GetPharmaciesRequestSchema,
+    container=Depends(init_container),
+):
+    '''Ищет аптеки по списку oid'''
+    mediator: Mediator = container.resolve(Mediator)
+
+    try:
+        pharmacies = await mediator.send(
+            GetPharmaciesByOidsCommand(pharmacy_oids=tuple(schema.pharmacy_oids)),
+        )
+    except ApplicationException as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
+
+    found_oids = {pharmacy.oid for pharmacy in pharmacies}
+
+    return render_model(GetPharmaciesResponseSchema.model_construct(
+        pharmacies=[CreatePharmacyResponseSchema.from_stored_entity(pharmacy) for pharmacy in pharmacies],
+        not_found=[oid for oid in dict.fromkeys(schema.pharmacy_oids) if oid not in found_oids],
+    ))
 
 
 @router.post(
@@ -97,7 +185,7 @@ async def update_pharmacy(
 
     try:
 
-        pharmacy, *_ = await mediator.handle_command(
+        pharmacy = await mediator.send(
             UpdatePharmacyCommand(
                 pharmacy_oid=pharmacy_oid,
                 title=Title(schema.title),
@@ -107,72 +195,122 @@ async def update_pharmacy(
     except ApplicationException as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
 
-    return CreatePharmacyResponseSchema(
-        oid=pharmacy.oid,
-        title=pharmacy.title,
-        description=pharmacy.description,
-        products=pharmacy.products,
-        prices=pharmacy.prices,
-    )
+    return render_model(CreatePharmacyResponseSchema.from_stored_entity(pharmacy), status_code=status.HTTP_202_ACCEPTED)
 
 
 @router.post(
     '/change-price-product',
-    description="Эндпоинт изменения цены товара из аптеки, если нет товара или аптеки то возвращается 400 ошибка",
+    description="Эндпоинт изменения цены товара из аптеки, если нет товара или аптеки то возвращается 400 ошибка. "
+                "С заголовком If-Match (ETag из get-pharmacy) цена меняется, только если аптека с тех пор "
+                "не изменилась, иначе возвращается 412 ошибка. Ответ помечается ETag новой версии аптеки",
     status_code=status.HTTP_202_ACCEPTED,
     responses={
         status.HTTP_202_ACCEPTED: {'model': CreatePharmacyResponseSchema},
         status.HTTP_400_BAD_REQUEST: {'model': ErrorSchema},
+        status.HTTP_412_PRECONDITION_FAILED: {'model': ErrorSchema},
     },
 )
 async def change_price_product(
     schema: ChangeProductPriceRequestSchema,
+    if_match: str | None = Header(default=None),
     container=Depends(init_container),
 ):
     mediator: Mediator = container.resolve(Mediator)
 
     try:
-        pharmacy, *_ = await mediator.handle_command(
+        pharmacy = await mediator.send(
             ChangeProductPriceCommand(
                 pharmacy_oid=schema.pharmacy_oid,
                 product_oid=schema.product_oid,
                 price=schema.price,
+                expected_version=get_expected_version(if_match),
             ),
         )
+    except PharmacyVersionConflictException as exc:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail={'error': exc.message})
     except ApplicationException as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
 
-    return CreatePharmacyResponseSchema(
-        oid=pharmacy.oid,
-        title=pharmacy.title,
-        description=pharmacy.description,
-        products=pharmacy.products,
-        prices=pharmacy.prices,
+    response = render_model(
+        CreatePharmacyResponseSchema.from_stored_entity(pharmacy),
+        status_code=status.HTTP_202_ACCEPTED,
     )
+    response.headers['ETag'] = build_etag(pharmacy.version)
+    return response
 
 
 @router.post(
     '/delete-product-from-pharmacy',
     status_code=status.HTTP_204_NO_CONTENT,
-    description="Эндпоинт удаления товара из аптеки, если товар или аптека не найдена, возвращается 400 ошибка",
+    description="Эндпоинт удаления товара из аптеки, если товар или аптека не найдена, возвращается 400 ошибка. "
+                "С заголовком If-Match товар удаляется, только если аптека не изменилась, иначе 412 ошибка",
+    responses={
+        status.HTTP_400_BAD_REQUEST: {'model': ErrorSchema},
+        status.HTTP_412_PRECONDITION_FAILED: {'model': ErrorSchema},
+    },
 )
 async def delete_product_from_pharmacy(
     schema: DeleteProductFromPharmacyRequestSchema,
+    if_match: str | None = Header(default=None),
     container=Depends(init_container),
 ):
     mediator: Mediator = container.resolve(Mediator)
 
     try:
-        await mediator.handle_command(
+        await mediator.send(
             DeleteProductFromPharmacyCommand(
                 pharmacy_oid=schema.pharmacy_oid,
                 product_oid=schema.product_oid,
+                expected_version=get_expected_version(if_match),
             ),
         )
+    except PharmacyVersionConflictException as exc:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail={'error': exc.message})
     except ApplicationException as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
 
-    return True
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post(
+    '/change-inventory-bulk',
+    status_code=status.HTTP_200_OK,
+    description="Эндпоинт пакетного изменения товаров аптек: op set_price меняет цену (price), set_count - остаток "
+                "(count), remove удаляет товар из аптеки. Операции выполняются в порядке списка, статус возвращается "
+                "по каждой, ошибка одной операции не отменяет остальные",
+    responses={
+        status.HTTP_200_OK: {'model': ChangeInventoryBulkResponseSchema},
+        status.HTTP_400_BAD_REQUEST: {'model': ErrorSchema},
+    },
+)
+async def change_inventory_bulk(
+    schema: ChangeInventoryBulkRequestSchema,
+    container=Depends(init_container),
+):
+    mediator: Mediator = container.resolve(Mediator)
+    config: Config = container.resolve(Config)
+
+    if len(schema.operations) > config.inventory_bulk_max_operations:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={'error': f'Не больше {config.inventory_bulk_max_operations} операций в одном запросе'},
+        )
+
+    result = await mediator.send(
+        ChangeInventoryBulkCommand(
+            operations=tuple(InventoryOperationRow(**operation.model_dump()) for operation in schema.operations),
+        ),
+    )
+
+    return render_model(ChangeInventoryBulkResponseSchema.model_construct(
+        applied=result.applied,
+        results=[
+            InventoryOperationResultSchema.model_construct(index=index, status='error', error=result.errors[index])
+            if index in result.errors
+            else InventoryOperationResultSchema.model_construct(index=index, status='ok', error=None)
+            for index in range(len(schema.operations))
+        ],
+    ))
 
 
 @router.post(
@@ -187,7 +325,7 @@ async def delete_pharmacy(
     mediator: Mediator = container.resolve(Mediator)
 
     try:
-        await mediator.handle_command(
+        await mediator.send(
             DeletePharmacyCommand(
                 pharmacy_oid=schema.pharmacy_oid,
             ),
@@ -195,29 +333,192 @@ async def delete_pharmacy(
     except ApplicationException as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
 
-    return True
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post(
+    '/reserve-product',
+    status_code=status.HTTP_201_CREATED,
+    description="Эндпоинт резервирует quantity единиц товара аптеки на ttl_seconds "
+                "(по умолчанию RESERVATION_TTL_SECONDS). Остаток уменьшается сразу, "
+                "если в остатке меньше quantity, возвращается 409 ошибка. "
+                "Неподтвержденный за срок резерв снимается автоматически, единицы возвращаются в остаток",
+    responses={
+        status.HTTP_201_CREATED: {'model': ReservationResponseSchema},
+        status.HTTP_400_BAD_REQUEST: {'model': ErrorSchema},
+        status.HTTP_409_CONFLICT: {'model': ErrorSchema},
+    },
+)
+async def reserve_product(
+    schema: ReserveProductRequestSchema,
+    container=Depends(init_container),
+):
+    '''Резервирует товар в аптеке'''
+    mediator: Mediator = container.resolve(Mediator)
+    config: Config = container.resolve(Config)
+    ttl_seconds = min(schema.ttl_seconds or config.reservation_ttl_seconds, config.reservation_max_ttl_seconds)
+
+    try:
+        reservation = await mediator.send(
+            ReserveStockCommand(
+                pharmacy_oid=schema.pharmacy_oid,
+                product_oid=schema.product_oid,
+                quantity=schema.quantity,
+                ttl_seconds=ttl_seconds,
+            ),
+        )
+    except NotEnoughStockException as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail={'error': exc.message})
+    except ApplicationException as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
+
+    return render_model(ReservationResponseSchema.from_entity(reservation), status_code=status.HTTP_201_CREATED)
+
+
+@router.post(
+    '/release-reservation',
+    status_code=status.HTTP_200_OK,
+    description="Эндпоинт отменяет резерв и возвращает его единицы в остаток, "
+                "если резерв уже подтвержден, отменен или снят по сроку, возвращается 400 ошибка",
+    responses={
+        status.HTTP_200_OK: {'model': ReservationResponseSchema},
+        status.HTTP_400_BAD_REQUEST: {'model': ErrorSchema},
+    },
+)
+async def release_reservation(
+    schema: ReservationRequestSchema,
+    container=Depends(init_container),
+):
+    '''Отменяет резерв'''
+    mediator: Mediator = container.resolve(Mediator)
+
+    try:
+        reservation = await mediator.send(ReleaseReservationCommand(reservation_oid=schema.reservation_oid))
+    except ApplicationException as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
+
+    return render_model(ReservationResponseSchema.from_entity(reservation))
+
+
+@router.post(
+    '/commit-reservation',
+    status_code=status.HTTP_200_OK,
+    description="Эндпоинт подтверждает резерв: зарезервированные единицы списываются окончательно. "
+                "Если резерв истек, отменен или уже подтвержден, возвращается 400 ошибка",
+    responses={
+        status.HTTP_200_OK: {'model': ReservationResponseSchema},
+        status.HTTP_400_BAD_REQUEST: {'model': ErrorSchema},
+    },
+)
+async def commit_reservation(
+    schema: ReservationRequestSchema,
+    container=Depends(init_container),
+):
+    '''Подтверждает резерв'''
+    mediator: Mediator = container.resolve(Mediator)
+
+    try:
+        reservation = await mediator.send(CommitReservationCommand(reservation_oid=schema.reservation_oid))
+    except ApplicationException as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
+
+    return render_model(ReservationResponseSchema.from_entity(reservation))
 
 
 @router.post(
     '/find-pharmacy',
     status_code=status.HTTP_200_OK,
-    description="Эндпоинт ищет товар с заданным названием от пользователя, если товара нет, возвращается 400 ошибка",
+    description="Эндпоинт ищет аптеку с заданным названием от пользователя, если аптеки нет, возвращается 400 ошибка. "
+                "Результаты отдаются страницами, следующую страницу можно получить по continuation_token",
+    responses={
+        status.HTTP_200_OK: {'model': FindPharmacyResponseSchema},
+        status.HTTP_400_BAD_REQUEST: {'model': ErrorSchema},
+    },
 )
 async def find_pharmacy(
     schema: FindPharmacyRequestSchema,
     container=Depends(init_container),
 ):
     mediator: Mediator = container.resolve(Mediator)
+    config: Config = container.resolve(Config)
+    page_size = resolve_page_size(config, schema.page_size)
 
     try:
-        pharmacies = await mediator.handle_command(
+        pharmacies = await mediator.send(
             FindPharmacyCommand(
                 pharmacy_title=schema.pharmacy_title,
+                page_size=page_size,
+                continuation_token=schema.continuation_token,
             ),
         )
     except ApplicationException as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
 
-    return FindPharmacyResponseSchema(
-        pharmacies=pharmacies,
+    return StreamingResponse(
+        stream_search_page(pharmacies, items_key='pharmacies', page_size=page_size),
+        media_type='application/json',
+    )
+
+
+@router.get(
+    '/inventory',
+    status_code=status.HTTP_200_OK,
+    description="Эндпоинт возвращает товары аптеки страницами, отсортированными по product_oid, "
+                "если аптеки нет, возвращается 400 ошибка. "
+                "Следующую страницу можно получить по continuation_token",
+    responses={
+        status.HTTP_200_OK: {'model': GetPharmacyInventoryResponseSchema},
+        status.HTTP_400_BAD_REQUEST: {'model': ErrorSchema},
+    },
+)
+async def get_pharmacy_inventory(
+    pharmacy_oid: str,
+    page_size: int | None = Query(default=None, gt=0),
+    continuation_token: str | None = None,
+    container=Depends(init_container),
+):
+    '''Товары аптеки'''
+    mediator: Mediator = container.resolve(Mediator)
+    config: Config = container.resolve(Config)
+    page_size = resolve_page_size(config, page_size)
+
+    try:
+        positions = await mediator.send(
+            GetPharmacyInventoryCommand(
+                pharmacy_oid=pharmacy_oid,
+                page_size=page_size,
+                continuation_token=continuation_token,
+            ),
+        )
+    except ApplicationException as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
+
+    return StreamingResponse(
+        stream_search_page(positions, items_key='products', page_size=page_size, cursor_key=inventory_cursor_key),
+        media_type='application/json',
+    )
+
+
+@router.get(
+    '/export',
+    status_code=status.HTTP_200_OK,
+    description="Эндпоинт выгружает все аптеки с товарами потоком: NDJSON - аптека со всеми позициями на строку, "
+                "CSV - позиция аптеки на строку. С gzip=true файл отдается сжатым",
+)
+async def export_pharmacies(
+    export_format: ExportFormat = Query(default='ndjson', alias='format'),
+    gzip: bool = False,
+    container=Depends(init_container),
+):
+    '''Выгрузка аптек и их товаров'''
+    mediator: Mediator = container.resolve(Mediator)
+    config: Config = container.resolve(Config)
+
+    pharmacies = await mediator.send(ExportPharmaciesCommand(batch_size=config.export_batch_size))
+
+    return export_response(
+        encode_pharmacies_export(pharmacies, export_format, config.export_chunk_size),
+        filename='pharmacies',
+        export_format=export_format,
+        gzip=gzip,
     )
@@ -1,8 +1,11 @@
-from typing import Any, Dict, List
+from datetime import datetime
+from typing import Any, Dict, List, Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.domain.entities.pharmacy import PharmacyEntity
+from app.domain.entities.reservation import ReservationEntity
+from app.infra.repositories.bulk import InventoryOp
 
 
 class CreatePharmacyRequestSchema(BaseModel):
@@ -18,13 +21,41 @@ class CreatePharmacyResponseSchema(BaseModel):
 
     @classmethod
     def from_entity(cls, pharmacy: PharmacyEntity) -> 'CreatePharmacyResponseSchema':
-        return cls(
+        """
+        Поля сущности уже проверены value objects, поэтому схема собирается без повторной валидации.
+        """
+        return cls.model_construct(
             oid=pharmacy.oid,
             title=pharmacy.title.as_generic_type(),
             description=pharmacy.description.as_generic_type(),
             products=pharmacy.products,
         )
 
+    @classmethod
+    def from_stored_entity(cls, pharmacy: PharmacyEntity) -> 'CreatePharmacyResponseSchema':
+        """
+        Аптека, прочитанная из репозитория, хранит поля простыми значениями, а не value objects.
+        """
+        return cls.model_construct(
+            oid=pharmacy.oid,
+            title=pharmacy.title,
+            description=pharmacy.description,
+            products=pharmacy.products,
+        )
+
+
+class PartialPharmacyResponseSchema(BaseModel):
+    oid: str | None = None
+    title: str | None = None
+    description: str | None = None
+    products: List[Dict[str, Any]] | None = None
+    created_at: datetime | None = None
+    version: int | None = None
+
+    @classmethod
+    def from_document(cls, document: dict) -> 'PartialPharmacyResponseSchema':
+        return cls.model_construct(**document)
+
 
 class UpdatePharmacyRequestSchema(BaseModel):
     title: str
@@ -42,13 +73,82 @@ class DeleteProductFromPharmacyRequestSchema(BaseModel):
     product_oid: str
 
 
+class InventoryOperationSchema(BaseModel):
+    pharmacy_oid: str
+    product_oid: str
+    op: InventoryOp
+    price: float | None = None
+    count: int | None = Field(default=None, ge=0)
+
+
+class ChangeInventoryBulkRequestSchema(BaseModel):
+    operations: List[InventoryOperationSchema]
+
+
+class InventoryOperationResultSchema(BaseModel):
+    index: int
+    status: Literal['ok', 'error']
+    error: str | None = None
+
+
+class ChangeInventoryBulkResponseSchema(BaseModel):
+    applied: int
+    results: List[InventoryOperationResultSchema]
+
+
 class DeletePharmacyRequestSchema(BaseModel):
     pharmacy_oid: str
 
 
 class FindPharmacyRequestSchema(BaseModel):
     pharmacy_title: str
+    page_size: int | None = Field(default=None, gt=0)
+    continuation_token: str | None = None
 
 
 class FindPharmacyResponseSchema(BaseModel):
     pharmacies: list
+    continuation_token: str | None = None
+
+
+class GetPharmacyInventoryResponseSchema(BaseModel):
+    products: List[Dict[str, Any]]
+    continuation_token: str | None = None
+
+
+class GetPharmaciesRequestSchema(BaseModel):
+    pharmacy_oids: list[str] = Field(min_length=1, max_length=1000)
+
+
+class GetPharmaciesResponseSchema(BaseModel):
+    pharmacies: list[CreatePharmacyResponseSchema]
+    not_found: list[str]
+
+
+class ReserveProductRequestSchema(BaseModel):
+    pharmacy_oid: str
+    product_oid: str
+    quantity: int = Field(gt=0)
+    ttl_seconds: float | None = Field(default=None, gt=0)
+
+
+class ReservationRequestSchema(BaseModel):
+    reservation_oid: str
+
+
+class ReservationResponseSchema(BaseModel):
+    reservation_oid: str
+    pharmacy_oid: str
+    product_oid: str
+    quantity: int
+    expires_at: datetime
+
+    @classmethod
+    def from_entity(cls, reservation: ReservationEntity) -> 'ReservationResponseSchema':
+        return cls.model_construct(
+            reservation_oid=reservation.oid,
+            pharmacy_oid=reservation.pharmacy_oid,
+            product_oid=reservation.product_oid,
+            quantity=reservation.quantity,
+            expires_at=reservation.expires_at,
+        )
@@ -1,4 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+
+from fastapi import (APIRouter, Depends, Header, HTTPException, Query, Request,
+                     status)
+from fastapi.responses import Response, StreamingResponse
+from pydantic import ValidationError
 
 from app.domain.exceptions.base import ApplicationException
 from app.logic.containers.init import init_container
@@ -7,16 +12,35 @@ from ....domain.values.product import ExpiresDate, Text, Title
 from ....logic.commands.pharmacy import AddProductWithPriceCommand
 from ....logic.commands.products import (CreateProductCommand,
                                          DeleteProductCommand,
+                                         ExportProductsCommand,
+                                         FindOffersForProductCommand,
                                          FindProductCommand,
                                          GetProductByOidCommand,
+                                         GetProductsByOidsCommand,
+                                         GetProductVersionCommand,
+                                         ImportProductsCommand,
                                          UpdateProductCommand)
+from ....logic.exceptions.pharmacy import PharmacyVersionConflictException
 from ....logic.mediator import Mediator
+from ....settings.config import Config
+from ..dependecies.base import get_fields
+from ..etag import (build_etag, etag_matches, not_modified, split_version,
+                    with_version_field)
+from ..export import ExportFormat, encode_products_export, export_response
+from ..ndjson import iter_ndjson_lines
+from ..pagination import (offer_cursor_key, resolve_page_size,
+                          stream_search_page)
+from ..responses import render_model
 from ..schemas import ErrorSchema
 from .schemas import (AddProductToPharmacyRequestSchema,
                       AddProductToPharmacyResponseSchema,
                       CreateProductRequestSchema, CreateProductResponseSchema,
-                      DeleteProductRequestSchema, FindProductRequestSchema,
-                      FindProductResponseSchema, UpdateProductRequestSchema)
+                      DeleteProductRequestSchema,
+                      FindOffersForProductResponseSchema,
+                      FindProductRequestSchema, FindProductResponseSchema,
+                      GetProductsRequestSchema, GetProductsResponseSchema,
+                      ImportProductErrorSchema, ImportProductsResponseSchema,
+                      PartialProductResponseSchema, UpdateProductRequestSchema)
 
 router = APIRouter(tags=['Products'])
 
@@ -36,7 +60,7 @@ async def create_product_handler(schema: CreateProductRequestSchema, container=D
     mediator: Mediator = container.resolve(Mediator)
 
     try:
-        product, *_ = await mediator.handle_command(
+        product = await mediator.send(
             CreateProductCommand(
                 title=schema.title,
                 description=schema.description,
@@ -49,7 +73,76 @@ async def create_product_handler(schema: CreateProductRequestSchema, container=D
     except ApplicationException as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
 
-    return CreateProductResponseSchema.from_entity(product)
+    return render_model(CreateProductResponseSchema.from_entity(product), status_code=status.HTTP_201_CREATED)
+
+
+@router.post(
+    '/import-products',
+    status_code=status.HTTP_200_OK,
+    description="Эндпоинт массовой загрузки товаров в формате NDJSON (один товар на строку). "
+                "Строки обрабатываются пачками, ошибки возвращаются по номеру строки. "
+                "Строка длиннее PRODUCTS_IMPORT_MAX_LINE_BYTES не читается в память и считается ошибкой",
+    responses={
+        status.HTTP_200_OK: {'model': ImportProductsResponseSchema},
+    },
+)
+async def import_products_handler(
+    request: Request,
+    container=Depends(init_container),
+):
+    '''Массовая загрузка товаров'''
+    mediator: Mediator = container.resolve(Mediator)
+    config: Config = container.resolve(Config)
+
+    imported = 0
+    errors = []
+    line_numbers = []
+    rows = []
+
+    async def flush():
+        nonlocal imported
+
+        try:
+            result = await mediator.send(ImportProductsCommand(rows=tuple(rows)))
+        except ApplicationException as exc:
+            # Предыдущие пачки уже сохранены: ошибка пачки относится к ее строкам, загрузка идет дальше
+            errors.extend(ImportProductErrorSchema(line=line_number, error=exc.message) for line_number in line_numbers)
+        else:
+            imported += result.imported
+            errors.extend(
+                ImportProductErrorSchema(line=line_numbers[index], error=error)
+                for index, error in result.errors.items()
+            )
+
+        line_numbers.clear()
+        rows.clear()
+
+    async for line_number, line in iter_ndjson_lines(request.stream(), config.products_import_max_line_bytes):
+        if line is None:
+            errors.append(ImportProductErrorSchema(
+                line=line_number,
+                error=f'Строка длиннее {config.products_import_max_line_bytes} байт',
+            ))
+            continue
+
+        try:
+            schema = CreateProductRequestSchema.model_validate(json.loads(line))
+        except (ValueError, ValidationError) as exc:
+            errors.append(ImportProductErrorSchema(line=line_number, error=str(exc)))
+            continue
+
+        line_numbers.append(line_number)
+        rows.append(CreateProductCommand(**schema.model_dump()))
+
+        if len(rows) >= config.products_import_batch_size:
+            await flush()
+
+    if rows:
+        await flush()
+
+    errors.sort(key=lambda error: error.line)
+
+    return render_model(ImportProductsResponseSchema(imported=imported, errors=errors))
 
 
 @router.post(
@@ -60,17 +153,18 @@ async def create_product_handler(schema: CreateProductRequestSchema, container=D
     responses={
         status.HTTP_201_CREATED: {'model': AddProductToPharmacyResponseSchema},
         status.HTTP_400_BAD_REQUEST: {'model': ErrorSchema},
+        status.HTTP_409_CONFLICT: {'model': ErrorSchema},
     },
 )
 async def add_product_to_pharmacy_handler(
     schema: AddProductToPharmacyRequestSchema,
     container=Depends(init_container),
-) -> AddProductToPharmacyResponseSchema:
+):
     '''Добавляет товар в аптеку с указанием цены'''
     mediator: Mediator = container.resolve(Mediator)
 
     try:
-        pharmacy, *_ = await mediator.handle_command(
+        pharmacy = await mediator.send(
             AddProductWithPriceCommand(
                 product_oid=schema.product_oid,
                 pharmacy_oid=schema.pharmacy_oid,
@@ -78,43 +172,90 @@ async def add_product_to_pharmacy_handler(
                 count=schema.count,
             ),
         )
+    except PharmacyVersionConflictException as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail={'error': exc.message})
     except ApplicationException as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
 
-    return AddProductToPharmacyResponseSchema.from_entity(pharmacy)
+    return render_model(AddProductToPharmacyResponseSchema.from_entity(pharmacy), status_code=status.HTTP_201_CREATED)
 
 
 @router.get(
     '/get-product',
     status_code=status.HTTP_200_OK,
-    description="Эндпоинт который ищет товар по oid, если его нет возвращается 400 ошибка",
+    description="Эндпоинт который ищет товар по oid, если его нет возвращается 400 ошибка. "
+                "Параметр fields ограничивает набор возвращаемых полей. Ответ помечается ETag, "
+                "на запрос с совпадающим If-None-Match возвращается 304 без тела",
+    response_model=PartialProductResponseSchema,
+    response_model_exclude_unset=True,
 )
 async def get_product_by_oid(
     product_oid: str,
+    fields: tuple[str, ...] = Depends(get_fields),
+    if_none_match: str | None = Header(default=None),
     container=Depends(init_container),
-) -> CreateProductResponseSchema:
+):
     '''Ищет товар по oid'''
     mediator: Mediator = container.resolve(Mediator)
 
     try:
-        product, *_ = await mediator.handle_command(
+        if if_none_match is not None:
+            version = await mediator.send(GetProductVersionCommand(product_oid=product_oid))
+            etag = build_etag(version, fields)
+
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        product = await mediator.send(
             GetProductByOidCommand(
                 product_oid=product_oid,
+                fields=with_version_field(PartialProductResponseSchema.document_fields(fields)),
             ),
         )
     except ApplicationException as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
 
-    return CreateProductResponseSchema(
-        product_oid=product.oid,
-        title=product.title,
-        description=product.description,
-        expiry_date=product.expiry_date,
-        image_url=product.image_url,
-        manufacturer=product.manufacturer,
-        ingredients=product.ingredients,
-        count=product.count,
-    )
+    if fields:
+        version, product = split_version(product, fields)
+        response = render_model(PartialProductResponseSchema.from_document(product), exclude_unset=True)
+    else:
+        version = product.version
+        response = render_model(CreateProductResponseSchema.from_stored_entity(product))
+
+    response.headers['ETag'] = build_etag(version, fields)
+    return response
+
+
+@router.post(
+    '/get-products',
+    status_code=status.HTTP_200_OK,
+    description="Эндпоинт возвращает несколько товаров по списку oid одним запросом, "
+                "oid, по которым товар не найден, перечисляются в not_found",
+    responses={
+        status.HTTP_200_OK: {'model': GetProductsResponseSchema},
+        status.HTTP_400_BAD_REQUEST: {'model': ErrorSchema},
+    },
+)
+async def get_products_by_oids(
+    schema: GetProductsRequestSchema,
+    container=Depends(init_container),
+):
+    '''Ищет товары по списку oid'''
+    mediator: Mediator = container.resolve(Mediator)
+
+    try:
+        products = await mediator.send(
+            GetProductsByOidsCommand(product_oids=tuple(schema.product_oids)),
+        )
+    except ApplicationException as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
+
+    found_oids = {product.oid for product in products}
+
+    return render_model(GetProductsResponseSchema.model_construct(
+        products=[CreateProductResponseSchema.from_stored_entity(product) for product in products],
+        not_found=[oid for oid in dict.fromkeys(schema.product_oids) if oid not in found_oids],
+    ))
 
 
 @router.post(
@@ -130,7 +271,7 @@ async def update_product(
     mediator: Mediator = container.resolve(Mediator)
 
     try:
-        product, *_ = await mediator.handle_command(
+        product = await mediator.send(
             UpdateProductCommand(
                 oid=product_oid,
                 title=Title(schema.title),
@@ -145,15 +286,7 @@ async def update_product(
     except ApplicationException as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
 
-    return CreateProductResponseSchema(
-        product_oid=product.oid,
-        title=product.title,
-        description=product.description,
-        expiry_date=product.expiry_date,
-        image_url=product.image_url,
-        manufacturer=product.manufacturer,
-        ingredients=product.ingredients,
-    )
+    return render_model(CreateProductResponseSchema.from_stored_entity(product), status_code=status.HTTP_202_ACCEPTED)
 
 
 @router.post(
@@ -168,7 +301,7 @@ async def delete_product(
     mediator: Mediator = container.resolve(Mediator)
 
     try:
-        await mediator.handle_command(
+        await mediator.send(
             DeleteProductCommand(
                 product_oid=schema.product_oid,
             ),
@@ -176,15 +309,16 @@ async def delete_product(
     except ApplicationException as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
 
-    return True
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.post(
     '/search-product',
     status_code=status.HTTP_200_OK,
-    description="Эндпоинт ищет товар с заданным названием от пользователя, если товара нет, возвращается 400 ошибка",
+    description="Эндпоинт ищет товар с заданным названием от пользователя, если товара нет, возвращается 400 ошибка. "
+                "Результаты отдаются страницами, следующую страницу можно получить по continuation_token",
     responses={
-        status.HTTP_201_CREATED: {'model': FindProductResponseSchema},
+        status.HTTP_200_OK: {'model': FindProductResponseSchema},
         status.HTTP_400_BAD_REQUEST: {'model': ErrorSchema},
     },
 )
@@ -193,15 +327,84 @@ async def search_product(
     container=Depends(init_container),
 ):
     mediator: Mediator = container.resolve(Mediator)
+    config: Config = container.resolve(Config)
+    page_size = resolve_page_size(config, schema.page_size)
+
     try:
-        products = await mediator.handle_command(
+        products = await mediator.send(
             FindProductCommand(
                 product_title=schema.product_title,
+                page_size=page_size,
+                continuation_token=schema.continuation_token,
+            ),
+        )
+    except ApplicationException as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
+
+    return StreamingResponse(
+        stream_search_page(products, items_key='products', page_size=page_size),
+        media_type='application/json',
+    )
+
+
+@router.get(
+    '/offers',
+    status_code=status.HTTP_200_OK,
+    description="Эндпоинт возвращает аптеки, в которых товар есть в наличии, от самой низкой цены к самой высокой. "
+                "Результаты отдаются страницами, следующую страницу можно получить по continuation_token",
+    responses={
+        status.HTTP_200_OK: {'model': FindOffersForProductResponseSchema},
+        status.HTTP_400_BAD_REQUEST: {'model': ErrorSchema},
+    },
+)
+async def find_offers_for_product(
+    product_oid: str,
+    page_size: int | None = Query(default=None, gt=0),
+    continuation_token: str | None = None,
+    container=Depends(init_container),
+):
+    '''Где купить товар дешевле'''
+    mediator: Mediator = container.resolve(Mediator)
+    config: Config = container.resolve(Config)
+    page_size = resolve_page_size(config, page_size)
+
+    try:
+        offers = await mediator.send(
+            FindOffersForProductCommand(
+                product_oid=product_oid,
+                page_size=page_size,
+                continuation_token=continuation_token,
             ),
         )
     except ApplicationException as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exc.message})
 
-    return FindProductResponseSchema(
-        products=products,
+    return StreamingResponse(
+        stream_search_page(offers, items_key='offers', page_size=page_size, cursor_key=offer_cursor_key),
+        media_type='application/json',
+    )
+
+
+@router.get(
+    '/export',
+    status_code=status.HTTP_200_OK,
+    description="Эндпоинт выгружает весь каталог товаров потоком в формате NDJSON или CSV, "
+                "с gzip=true файл отдается сжатым",
+)
+async def export_products(
+    export_format: ExportFormat = Query(default='ndjson', alias='format'),
+    gzip: bool = False,
+    container=Depends(init_container),
+):
+    '''Выгрузка каталога товаров'''
+    mediator: Mediator = container.resolve(Mediator)
+    config: Config = container.resolve(Config)
+
+    products = await mediator.send(ExportProductsCommand(batch_size=config.export_batch_size))
+
+    return export_response(
+        encode_products_export(products, export_format, config.export_chunk_size),
+        filename='products',
+        export_format=export_format,
+        gzip=gzip,
     )
@@ -1,11 +1,19 @@
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from ....domain.entities.pharmacy import PharmacyEntity
 from ....domain.entities.product import ProductEntity
 
 
+def as_datetime(value: datetime | str) -> datetime:
+    """
+    Срок годности хранится ISO строкой (ExpiresDate.as_generic_type), а схемы собираются без валидации,
+    которая раньше разбирала эту строку.
+    """
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
 class CreateProductRequestSchema(BaseModel):
     title: str
     description: str
@@ -26,16 +34,61 @@ class CreateProductResponseSchema(BaseModel):
 
     @classmethod
     def from_entity(cls, product: ProductEntity) -> 'CreateProductResponseSchema':
-        return CreateProductResponseSchema(
+        """
+        Поля сущности уже проверены value objects, поэтому схема собирается без повторной валидации.
+        """
+        return cls.model_construct(
             product_oid=product.oid,
             title=product.title.as_generic_type(),
             description=product.description.as_generic_type(),
-            expiry_date=product.expiry_date.as_generic_type(),
+            expiry_date=product.expiry_date.value,
             image_url=product.image_url.as_generic_type(),
             ingredients=product.ingredients.as_generic_type(),
             manufacturer=product.manufacturer.as_generic_type(),
         )
 
+    @classmethod
+    def from_stored_entity(cls, product: ProductEntity) -> 'CreateProductResponseSchema':
+        """
+        Товар, прочитанный из репозитория, хранит поля простыми значениями, а не value objects.
+        """
+        return cls.model_construct(
+            product_oid=product.oid,
+            title=product.title,
+            description=product.description,
+            expiry_date=as_datetime(product.expiry_date),
+            image_url=product.image_url,
+            ingredients=product.ingredients,
+            manufacturer=product.manufacturer,
+        )
+
+
+class PartialProductResponseSchema(BaseModel):
+    product_oid: str | None = None
+    title: str | None = None
+    description: str | None = None
+    expiry_date: datetime | None = None
+    image_url: str | None = None
+    ingredients: str | None = None
+    manufacturer: str | None = None
+    created_at: datetime | None = None
+    version: int | None = None
+
+    @staticmethod
+    def document_fields(fields: tuple[str, ...]) -> tuple[str, ...]:
+        return tuple('oid' if field == 'product_oid' else field for field in fields)
+
+    @classmethod
+    def from_document(cls, document: dict) -> 'PartialProductResponseSchema':
+        if 'oid' in document:
+            document = {**document, 'product_oid': document['oid']}
+            del document['oid']
+
+        if 'expiry_date' in document:
+            document = {**document, 'expiry_date': as_datetime(document['expiry_date'])}
+
+        return cls.model_construct(**document)
+
 
 class AddProductToPharmacyResponseSchema(BaseModel):
     oid: str
@@ -45,7 +98,7 @@ class AddProductToPharmacyResponseSchema(BaseModel):
 
     @classmethod
     def from_entity(cls, pharmacy: PharmacyEntity) -> 'AddProductToPharmacyResponseSchema':
-        return cls(
+        return cls.model_construct(
             oid=pharmacy.oid,
             title=pharmacy.title,
             description=pharmacy.description,
@@ -75,7 +128,41 @@ class DeleteProductRequestSchema(BaseModel):
 
 class FindProductRequestSchema(BaseModel):
     product_title: str
+    page_size: int | None = Field(default=None, gt=0)
+    continuation_token: str | None = None
 
 
 class FindProductResponseSchema(BaseModel):
     products: list
+    continuation_token: str | None = None
+
+
+class ImportProductErrorSchema(BaseModel):
+    line: int
+    error: str
+
+
+class ImportProductsResponseSchema(BaseModel):
+    imported: int
+    errors: list[ImportProductErrorSchema]
+
+
+class ProductOfferSchema(BaseModel):
+    pharmacy_oid: str
+    title: str
+    price: float
+    count: int
+
+
+class FindOffersForProductResponseSchema(BaseModel):
+    offers: list[ProductOfferSchema]
+    continuation_token: str | None = None
+
+
+class GetProductsRequestSchema(BaseModel):
+    product_oids: list[str] = Field(min_length=1, max_length=1000)
+
+
+class GetProductsResponseSchema(BaseModel):
+    products: list[CreateProductResponseSchema]
+    not_found: list[str]
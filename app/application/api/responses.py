@@ -0,0 +1,32 @@
+import orjson
+from fastapi import status
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+def render_model(
+    model: BaseModel,
+    status_code: int = status.HTTP_200_OK,
+    exclude_unset: bool = False,
+) -> Response:
+    """
+    Ответ из схемы, собранной через model_construct из уже проверенной сущности. JSON сразу пишет
+    сериализатор pydantic-core, скомпилированный один раз для класса схемы, а готовый Response
+    FastAPI отдает как есть: без повторной проверки по response_model и без jsonable_encoder.
+    """
+    return Response(
+        content=model.__pydantic_serializer__.to_json(model, exclude_unset=exclude_unset),
+        status_code=status_code,
+        media_type='application/json',
+    )
+
+
+def render_json(content: dict | list, status_code: int = status.HTTP_200_OK) -> Response:
+    """
+    Ответ из готовых данных без схемы (счетчики, снимки состояния): JSON пишет orjson.
+    """
+    return Response(
+        content=orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS),
+        status_code=status_code,
+        media_type='application/json',
+    )
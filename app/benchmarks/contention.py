@@ -0,0 +1,124 @@
+"""
+Конкурентные записи в одну аптеку: python -m app.benchmarks.contention [записей на писателя, 50] [задержка, мс, 0.5]
+
+Репозиторий в памяти с искусственной задержкой на каждое обращение, как у запроса к MongoDB: без нее корутины
+не переключаются между чтением версии и записью и конфликтов не бывает. Каждый писатель меняет цену своего товара.
+atomic - ChangeProductPriceHandler без версии: одна атомарная запись позиции. if-match - клиент читает версию
+и пишет с ней (If-Match), при конфликте повторяет с jitter. lock - запись под asyncio.Lock на аптеку,
+между процессами и репликами такая блокировка не работает. Во всех режимах проверяется, что версия аптеки
+выросла ровно на число записей, то есть ни одна не потерялась.
+"""
+import asyncio
+import sys
+import time
+from collections import defaultdict
+
+from ..domain.entities.pharmacy import PharmacyEntity
+from ..domain.values.product import Price, Text, Title
+from ..infra.repositories.memory import MemoryPharmacyRepo
+from ..logic.commands.pharmacy import (ChangeProductPriceCommand,
+                                       ChangeProductPriceHandler)
+from ..logic.concurrency import ConflictRetry
+
+WRITERS = (1, 4, 16, 64)
+
+
+class LatencyPharmacyRepo(MemoryPharmacyRepo):
+    latency_seconds: float = 0.0005
+
+    async def get_pharmacy_version(self, oid: str) -> int:
+        await asyncio.sleep(self.latency_seconds)
+        return await super().get_pharmacy_version(oid)
+
+    async def update_product_price_in_pharmacy(self, *args, **kwargs):
+        await asyncio.sleep(self.latency_seconds)
+        return await super().update_product_price_in_pharmacy(*args, **kwargs)
+
+
+async def seed(writers: int, latency_seconds: float) -> tuple[LatencyPharmacyRepo, str]:
+    repository = LatencyPharmacyRepo()
+    repository.latency_seconds = 0
+    pharmacy = PharmacyEntity(title=Title('Аптека'), description=Text('Описание'))
+    await repository.add_pharmacy(pharmacy)
+
+    for writer in range(writers):
+        await repository.add_product_to_pharmacy(pharmacy.oid, f'product-{writer}', Price(100.0), count=1)
+
+    repository.latency_seconds = latency_seconds
+    return repository, pharmacy.oid
+
+
+async def run_handler(
+    writers: int,
+    writes: int,
+    latency_seconds: float,
+    if_match: bool,
+) -> tuple[float, ConflictRetry]:
+    repository, pharmacy_oid = await seed(writers, latency_seconds)
+    conflict_retry = ConflictRetry(attempts=1000)
+    handler = ChangeProductPriceHandler(pharmacy_repository=repository)
+    initial_version = await repository.get_pharmacy_version(pharmacy_oid)
+
+    async def change_price(index: int, price: float):
+        expected_version = await repository.get_pharmacy_version(pharmacy_oid) if if_match else None
+        await handler.handle(ChangeProductPriceCommand(
+            pharmacy_oid=pharmacy_oid,
+            product_oid=f'product-{index}',
+            price=price,
+            expected_version=expected_version,
+        ))
+
+    async def writer(index: int):
+        for write in range(writes):
+            await conflict_retry.run(lambda: change_price(index, write))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(index) for index in range(writers)))
+    elapsed = time.perf_counter() - started
+
+    assert await repository.get_pharmacy_version(pharmacy_oid) == initial_version + writers * writes
+    return writers * writes / elapsed, conflict_retry
+
+
+async def run_lock(writers: int, writes: int, latency_seconds: float) -> float:
+    repository, pharmacy_oid = await seed(writers, latency_seconds)
+    locks = defaultdict(asyncio.Lock)
+    initial_version = await repository.get_pharmacy_version(pharmacy_oid)
+
+    async def writer(index: int):
+        for write in range(writes):
+            async with locks[pharmacy_oid]:
+                await repository.update_product_price_in_pharmacy(pharmacy_oid, f'product-{index}', Price(write))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(index) for index in range(writers)))
+    elapsed = time.perf_counter() - started
+
+    assert await repository.get_pharmacy_version(pharmacy_oid) == initial_version + writers * writes
+    return writers * writes / elapsed
+
+
+async def run_benchmark(writes: int, latency_seconds: float) -> list[tuple[int, float, float, float, int]]:
+    results = []
+
+    for writers in WRITERS:
+        atomic_rate, _ = await run_handler(writers, writes, latency_seconds, if_match=False)
+        if_match_rate, conflict_retry = await run_handler(writers, writes, latency_seconds, if_match=True)
+        lock_rate = await run_lock(writers, writes, latency_seconds)
+        results.append((writers, atomic_rate, if_match_rate, lock_rate, conflict_retry.stats.conflicts))
+
+    return results
+
+
+if __name__ == '__main__':
+    writes = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latency_seconds = (float(sys.argv[2]) if len(sys.argv) > 2 else 0.5) / 1000
+
+    print(f'{"writers":>8}{"atomic, w/s":>14}{"if-match, w/s":>16}{"lock, w/s":>12}{"conflicts/write":>18}')  # noqa
+    results = asyncio.run(run_benchmark(writes, latency_seconds))
+
+    for writers, atomic_rate, if_match_rate, lock_rate, conflicts in results:
+        print(  # noqa
+            f'{writers:>8}{atomic_rate:>14.0f}{if_match_rate:>16.0f}{lock_rate:>12.0f}'
+            f'{conflicts / (writers * writes):>18.2f}',
+        )
@@ -0,0 +1,81 @@
+"""
+Стоимость декодирования документа аптеки: python -m app.benchmarks.documents [позиций в большой аптеке, 10 000]
+
+Документ кодируется в BSON один раз, дальше каждая итерация повторяет путь чтения из репозитория:
+eager - bson.decode всего документа и копия позиций (документ загрузчика общий для читателей),
+lazy - разбор верхнего уровня RawBSONDocument без массива позиций. Для каждого режима меряются
+чтение без обращения к позициям (только title) и чтение с позициями.
+"""
+import sys
+import time
+from datetime import datetime
+from typing import Callable
+
+import bson
+
+from ..infra.repositories.converters import (convert_document_to_pharmacy,
+                                             copy_pharmacy_document)
+from ..infra.repositories.lazy import (convert_raw_document_to_pharmacy,
+                                       split_pharmacy_document)
+
+SMALL_PHARMACY_PRODUCTS = 20
+TOTAL_DECODED_PRODUCTS = 2_000_000
+
+
+def build_pharmacy_bson(products_count: int) -> bytes:
+    return bson.encode({
+        '_id': bson.ObjectId(),
+        'oid': f'{products_count:032x}',
+        'title': f'Аптека {products_count}',
+        'description': 'Описание',
+        'products': [
+            {'product_oid': f'{index:032x}', 'price': float(index % 1000), 'count': index % 50}
+            for index in range(products_count)
+        ],
+        'created_at': datetime.now(),
+    })
+
+
+def load_eager(raw: bytes):
+    return convert_document_to_pharmacy(copy_pharmacy_document(bson.decode(raw)))
+
+
+def load_lazy(raw: bytes):
+    return convert_raw_document_to_pharmacy(split_pharmacy_document(raw))
+
+
+def measure(load: Callable[[bytes], object], raw: bytes, touch_products: bool, repeats: int) -> float:
+    started = time.perf_counter()
+
+    for _ in range(repeats):
+        pharmacy = load(raw)
+        if touch_products:
+            pharmacy.products
+        else:
+            pharmacy.title
+
+    return (time.perf_counter() - started) / repeats
+
+
+def run_benchmark(large_products_count: int) -> dict[tuple[int, str], tuple[float, float]]:
+    results = {}
+
+    for products_count in (SMALL_PHARMACY_PRODUCTS, large_products_count):
+        raw = build_pharmacy_bson(products_count)
+        repeats = max(1, TOTAL_DECODED_PRODUCTS // products_count)
+
+        for name, load in (('eager', load_eager), ('lazy', load_lazy)):
+            results[products_count, name] = (
+                measure(load, raw, touch_products=False, repeats=repeats),
+                measure(load, raw, touch_products=True, repeats=repeats),
+            )
+
+    return results
+
+
+if __name__ == '__main__':
+    large_products_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+    print(f'{"products":>10}{"mode":>8}{"title only, us":>18}{"with products, us":>20}')  # noqa
+    for (products_count, name), (title_only, with_products) in run_benchmark(large_products_count).items():
+        print(f'{products_count:>10}{name:>8}{title_only * 1e6:>18.1f}{with_products * 1e6:>20.1f}')  # noqa
@@ -0,0 +1,101 @@
+"""
+Память и время создания товаров: python -m app.benchmarks.entities [количество товаров, по умолчанию 1 000 000]
+
+Товары собираются из документов так же, как при чтении из хранилища. Документ создается заново для каждого
+товара и сразу отбрасывается, как после декодирования BSON, поэтому в памяти остаются только сущности
+и строки, на которые они ссылаются. Прежняя модель (dataclass с __dict__ и своим списком событий
+у каждой сущности) воспроизведена здесь же для сравнения.
+"""
+import sys
+import time
+import tracemalloc
+from abc import ABC
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable
+from uuid import uuid4
+
+from ..domain.entities.product import ProductEntity
+from ..infra.repositories.converters import convert_document_to_product
+
+MANUFACTURERS = ('Bayer', 'Pfizer', 'Novartis', 'Sanofi', 'Teva', 'Отисифарм', 'Фармстандарт', 'Гедеон Рихтер')
+
+
+@dataclass
+class LegacyBaseEntity(ABC):
+    oid: str = field(default_factory=lambda: str(uuid4()), kw_only=True)
+    created_at: datetime = field(default_factory=lambda: datetime.now(), kw_only=True)
+    _events: list = field(default_factory=list, kw_only=True)
+
+
+@dataclass
+class LegacyProductEntity(LegacyBaseEntity):
+    title: str
+    description: str
+    expiry_date: datetime
+    image_url: str
+    ingredients: str
+    manufacturer: str
+
+
+def convert_document_to_legacy_product(document: dict) -> LegacyProductEntity:
+    return LegacyProductEntity(
+        oid=document['oid'],
+        title=document['title'],
+        description=document['description'],
+        manufacturer=document['manufacturer'],
+        image_url=document['image_url'],
+        ingredients=document['ingredients'],
+        expiry_date=document['expiry_date'],
+        created_at=document['created_at'],
+    )
+
+
+def build_document(index: int, now: datetime, expiry_date: datetime) -> dict:
+    return {
+        'oid': f'{index:032x}',
+        'title': f'Товар {index}',
+        'description': 'Описание',
+        # Новая строка на каждый документ, как после декодирования
+        'manufacturer': ''.join(MANUFACTURERS[index % len(MANUFACTURERS)]),
+        'image_url': '',
+        'ingredients': '',
+        'expiry_date': expiry_date,
+        'created_at': now,
+    }
+
+
+def build_products(convert: Callable[[dict], object], count: int) -> list:
+    now = datetime.now()
+    expiry_date = now + timedelta(days=365)
+    return [convert(build_document(index, now, expiry_date)) for index in range(count)]
+
+
+def measure(convert: Callable[[dict], object], count: int) -> tuple[float, float]:
+    started = time.perf_counter()
+    products = build_products(convert, count)
+    elapsed = time.perf_counter() - started
+    del products
+
+    tracemalloc.start()
+    products = build_products(convert, count)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del products
+
+    return allocated / count, elapsed
+
+
+def run_benchmark(count: int) -> dict[str, tuple[float, float]]:
+    return {
+        'legacy dataclass': measure(convert_document_to_legacy_product, count),
+        'slotted entity': measure(convert_document_to_product, count),
+    }
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    print(f'{count} products, entity size {sys.getsizeof(ProductEntity.__new__(ProductEntity))} bytes')  # noqa
+    for name, (bytes_per_entity, elapsed) in run_benchmark(count).items():
+        print(f'{name:<20}{bytes_per_entity:>8.0f} bytes/product{elapsed:>8.2f} s')  # noqa
@@ -0,0 +1,84 @@
+"""
+Накладные расходы диспетчеризации медиатора: python -m app.benchmarks.mediator
+
+Сравнивает прежнюю диспетчеризацию (поиск списка обработчиков в events_map и сборка списка результатов)
+с send и handle_command по собранной таблице. Из каждого замера вычитается прямой вызов обработчика,
+поэтому в таблице только стоимость самой диспетчеризации в наносекундах на команду.
+"""
+import asyncio
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from ..logic.commands.base import BaseCommand, CommandHandler
+from ..logic.mediator import Mediator
+from ..logic.singleflight import SingleFlight
+
+ITERATIONS = 200_000
+REPEATS = 5
+
+
+@dataclass(frozen=True)
+class NoopCommand(BaseCommand):
+    value: int = 0
+
+
+@dataclass(frozen=True)
+class NoopHandler(CommandHandler[NoopCommand, int]):
+    async def handle(self, command: NoopCommand) -> int:
+        return command.value
+
+
+@dataclass(eq=False)
+class LegacyMediator:
+    events_map: dict = field(default_factory=lambda: defaultdict(list))
+
+    def register_command(self, command, command_handlers):
+        self.events_map[command].extend(command_handlers)
+
+    async def handle_command(self, command):
+        handlers = self.events_map.get(command.__class__)
+
+        if not handlers:
+            raise LookupError(command.__class__)
+
+        return [await handler.handle(command) for handler in handlers]
+
+
+async def measure(dispatch, command: BaseCommand) -> float:
+    best = float('inf')
+
+    for _ in range(REPEATS):
+        started = time.perf_counter_ns()
+
+        for _ in range(ITERATIONS):
+            await dispatch(command)
+
+        best = min(best, (time.perf_counter_ns() - started) / ITERATIONS)
+
+    return best
+
+
+async def run_benchmark() -> dict[str, float]:
+    handler = NoopHandler()
+    command = NoopCommand(value=1)
+
+    legacy = LegacyMediator()
+    legacy.register_command(NoopCommand, [handler])
+
+    mediator = Mediator(singleflight=SingleFlight())
+    mediator.register_command(NoopCommand, [handler])
+    mediator.compile()
+
+    baseline = await measure(handler.handle, command)
+
+    return {
+        'legacy handle_command': await measure(legacy.handle_command, command) - baseline,
+        'handle_command': await measure(mediator.handle_command, command) - baseline,
+        'send': await measure(mediator.send, command) - baseline,
+    }
+
+
+if __name__ == '__main__':
+    for name, overhead in asyncio.run(run_benchmark()).items():
+        print(f'{name:<24}{overhead:>8.0f} ns')  # noqa
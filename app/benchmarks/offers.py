@@ -0,0 +1,119 @@
+"""
+Страницы предложений товара в MongoDB: python -m app.benchmarks.offers [аптек с товаром, 20000] [страниц, 50]
+
+Нужен MongoDB из MONGO_DB_CONNECTION_URI, данные пишутся во временную базу, которая удаляется после замера.
+Одни и те же аптеки (товар плюс позиции других товаров) заливаются в оба режима хранения: embedded -
+массив products в документе аптеки, collection - коллекция позиций после migrate_inventory. Выдача
+проходится страницами по SEARCH_PAGE_SIZE, меряется время первой, средней и последней страницы.
+В embedded каждая страница сортирует все оставшиеся аптеки с товаром, в collection читает limit позиций из индекса.
+"""
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime
+
+from ..infra.connections.mongo import MongoConnectionManager
+from ..infra.repositories.base import BasePharmacyRepo
+from ..infra.repositories.inventory import MongoDBInventoryPharmacyRepo
+from ..infra.repositories.mongo import MongoDBPharmacyRepo
+from ..settings.config import Config
+
+OTHER_PRODUCTS = 50
+INSERT_BATCH_SIZE = 1000
+PRODUCT_OID = 'benchmark-product'
+
+
+def build_pharmacy_document(index: int) -> dict:
+    products = [
+        {'product_oid': f'{other:032x}', 'price': float(random.randint(10, 5000)), 'count': random.randint(0, 50)}
+        for other in range(OTHER_PRODUCTS)
+    ]
+    products.append({'product_oid': PRODUCT_OID, 'price': float(random.randint(10, 5000)), 'count': 1})
+
+    return {
+        'oid': f'{index:032x}',
+        'title': f'Аптека {index}',
+        'description': 'Описание',
+        'products': products,
+        'created_at': datetime.now(),
+        'version': 0,
+    }
+
+
+async def seed(repository: MongoDBPharmacyRepo, pharmacies: int) -> None:
+    await repository.ensure_indexes()
+    collection = repository.mongo_db_client[repository.mongo_db_db_name][repository.mongo_db_collection_name]
+
+    for offset in range(0, pharmacies, INSERT_BATCH_SIZE):
+        await collection.insert_many(
+            [build_pharmacy_document(index) for index in range(offset, min(offset + INSERT_BATCH_SIZE, pharmacies))],
+        )
+
+
+async def walk_pages(repository: BasePharmacyRepo, pages: int, page_size: int) -> list[float]:
+    timings, after = [], None
+
+    for _ in range(pages):
+        started = time.perf_counter()
+        offers = [offer async for offer in repository.find_offers_for_product(PRODUCT_OID, page_size, after)]
+        timings.append(time.perf_counter() - started)
+
+        if len(offers) < page_size:
+            break
+
+        after = offers[-1]['price'], offers[-1]['pharmacy_oid']
+
+    return timings
+
+
+async def run_benchmark(pharmacies: int, pages: int) -> dict[str, dict[str, float]]:
+    config = Config()
+    connection_manager = MongoConnectionManager(config=config)
+    await connection_manager.connect()
+
+    client = connection_manager.client
+    database = f'{config.mongodb_pharmacy_database}-benchmark-offers'
+    repositories = {
+        'embedded': MongoDBPharmacyRepo(
+            mongo_db_client=client,
+            mongo_db_db_name=database,
+            mongo_db_collection_name='embedded_pharmacies',
+        ),
+        'collection': MongoDBInventoryPharmacyRepo(
+            mongo_db_client=client,
+            mongo_db_db_name=database,
+            mongo_db_collection_name='collection_pharmacies',
+            mongo_db_inventory_collection_name='inventory',
+        ),
+    }
+    results = {}
+
+    try:
+        await client.drop_database(database)
+        random.seed(0)
+        await seed(repositories['embedded'], pharmacies)
+        random.seed(0)
+        await seed(repositories['collection'], pharmacies)
+        await repositories['collection'].migrate_inventory(batch_size=config.inventory_migration_batch_size)
+
+        for mode, repository in repositories.items():
+            timings = await walk_pages(repository, pages, config.search_page_size)
+            results[mode] = {
+                'first ms': timings[0] * 1000,
+                'mean ms': sum(timings) / len(timings) * 1000,
+                'last ms': timings[-1] * 1000,
+            }
+    finally:
+        await client.drop_database(database)
+        await connection_manager.close()
+
+    return results
+
+
+if __name__ == '__main__':
+    pharmacies = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    for mode, timings in asyncio.run(run_benchmark(pharmacies, pages)).items():
+        print(f'{mode:<12}' + ''.join(f'{name:>10}{value:>10.2f}' for name, value in timings.items()))  # noqa
@@ -0,0 +1,97 @@
+"""
+Резервы одного товара под нагрузкой: python -m app.benchmarks.reservations [попыток, 20000] [остаток, 5000]
+
+Все попытки резервируют по одной единице одной позиции одной аптеки через ReserveStockHandler, конкурентно
+пачками. Проверяется, что успешных резервов ровно столько, сколько было в остатке, и остаток не ушел в минус.
+Затем половина резервов отменяется, остальные истекают, и после очистки ReservationSweeper остаток
+возвращается к исходному.
+"""
+import asyncio
+import sys
+import time
+
+from ..domain.entities.pharmacy import PharmacyEntity
+from ..domain.values.product import Price, Text, Title
+from ..infra.repositories.memory import (MemoryPharmacyRepo,
+                                         MemoryReservationRepo)
+from ..logic.commands.reservations import (ReleaseReservationCommand,
+                                           ReleaseReservationHandler,
+                                           ReserveStockCommand,
+                                           ReserveStockHandler)
+from ..logic.exceptions.pharmacy import NotEnoughStockException
+from ..logic.reservations import ReservationSweeper
+
+CONCURRENCY = 1000
+TTL_SECONDS = 0.5
+
+
+async def get_count(repository: MemoryPharmacyRepo, pharmacy_oid: str) -> int:
+    pharmacy = await repository.get_pharmacy_by_oid(pharmacy_oid)
+    return pharmacy.products[0]['count']
+
+
+async def run_benchmark(attempts: int, stock: int) -> dict[str, float]:
+    pharmacy_repository = MemoryPharmacyRepo()
+    reservation_repository = MemoryReservationRepo()
+    pharmacy = PharmacyEntity(title=Title('Аптека'), description=Text('Описание'))
+    await pharmacy_repository.add_pharmacy(pharmacy)
+    await pharmacy_repository.add_product_to_pharmacy(pharmacy.oid, 'product', Price(100.0), count=stock)
+
+    reserve = ReserveStockHandler(
+        pharmacy_repository=pharmacy_repository,
+        reservation_repository=reservation_repository,
+    )
+    release = ReleaseReservationHandler(
+        pharmacy_repository=pharmacy_repository,
+        reservation_repository=reservation_repository,
+    )
+    sweeper = ReservationSweeper(reservation_repository=reservation_repository, pharmacy_repository=pharmacy_repository)
+    command = ReserveStockCommand(pharmacy_oid=pharmacy.oid, product_oid='product', quantity=1, ttl_seconds=TTL_SECONDS)
+
+    reservations, rejected = [], 0
+    started = time.perf_counter()
+
+    for offset in range(0, attempts, CONCURRENCY):
+        results = await asyncio.gather(
+            *(reserve.handle(command) for _ in range(min(CONCURRENCY, attempts - offset))),
+            return_exceptions=True,
+        )
+
+        for result in results:
+            if isinstance(result, NotEnoughStockException):
+                rejected += 1
+            elif isinstance(result, Exception):
+                raise result
+            else:
+                reservations.append(result)
+
+    elapsed = time.perf_counter() - started
+
+    assert len(reservations) == min(attempts, stock), len(reservations)
+    assert await get_count(pharmacy_repository, pharmacy.oid) == stock - len(reservations)
+
+    await asyncio.gather(*(
+        release.handle(ReleaseReservationCommand(reservation_oid=reservation.oid))
+        for reservation in reservations[::2]
+    ))
+    await asyncio.sleep(TTL_SECONDS)
+    while await sweeper.sweep():
+        pass
+
+    assert sweeper.stats.expired == len(reservations) - len(reservations[::2])
+    assert await get_count(pharmacy_repository, pharmacy.oid) == stock
+
+    return {
+        'attempts/s': attempts / elapsed,
+        'reserved': len(reservations),
+        'rejected': rejected,
+        'expired': sweeper.stats.expired,
+    }
+
+
+if __name__ == '__main__':
+    attempts = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    stock = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    for name, value in asyncio.run(run_benchmark(attempts, stock)).items():
+        print(f'{name:<12}{value:>12.0f}')  # noqa
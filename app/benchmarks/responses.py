@@ -0,0 +1,186 @@
+"""
+Запросов в секунду на чтении и поиске: python -m app.benchmarks.responses [запросов на эндпоинт, 2000]
+
+Приложение работает в памяти (REPOSITORY_BACKEND=memory), запросы идут через ASGI без сети, поэтому
+в замере только обработчик, медиатор и сериализация. Прежний путь ответа (схема с валидацией, повторная
+проверка по response_model, jsonable_encoder и json.dumps) воспроизведен здесь же на тех же командах.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator
+
+import httpx
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from ..application.api.dependecies.base import get_fields
+from ..application.api.main import create_app
+from ..application.api.pharmacy.schemas import (CreatePharmacyResponseSchema,
+                                                PartialPharmacyResponseSchema)
+from ..application.api.products.schemas import (CreateProductResponseSchema,
+                                                FindProductRequestSchema,
+                                                PartialProductResponseSchema)
+from ..logic.commands.pharmacy import GetPharmacyByOidCommand
+from ..logic.commands.products import (FindProductCommand,
+                                       GetProductByOidCommand)
+from ..logic.containers.init import init_container
+from ..logic.mediator import Mediator
+from ..logic.pagination import encode_continuation_token
+
+PHARMACY_PRODUCTS = 50
+SEARCH_PAGE_SIZE = 20
+ROUNDS = 3
+
+legacy_router = APIRouter()
+
+
+async def legacy_stream_search_page(items: AsyncIterator[dict], page_size: int) -> AsyncIterator[bytes]:
+    yield b'{"products":['
+
+    count = 0
+    last_key = None
+
+    async for item in items:
+        last_key = item.pop('score', 0.0), item['oid']
+        yield (b',' if count else b'') + json.dumps(item, default=str, ensure_ascii=False).encode()
+        count += 1
+
+    continuation_token = encode_continuation_token(*last_key) if count == page_size else None
+    yield f'],"continuation_token":{json.dumps(continuation_token)}}}'.encode()
+
+
+@legacy_router.get(
+    '/get-pharmacy',
+    response_model=PartialPharmacyResponseSchema,
+    response_model_exclude_unset=True,
+    response_class=JSONResponse,
+)
+async def legacy_get_pharmacy(
+    pharmacy_oid: str,
+    fields: tuple[str, ...] = Depends(get_fields),
+    container=Depends(init_container),
+):
+    pharmacy = await container.resolve(Mediator).send(
+        GetPharmacyByOidCommand(pharmacy_oid=pharmacy_oid, fields=fields),
+    )
+    return CreatePharmacyResponseSchema(
+        oid=pharmacy.oid,
+        title=pharmacy.title,
+        description=pharmacy.description,
+        products=pharmacy.products,
+    )
+
+
+@legacy_router.get(
+    '/get-product',
+    response_model=PartialProductResponseSchema,
+    response_model_exclude_unset=True,
+    response_class=JSONResponse,
+)
+async def legacy_get_product(
+    product_oid: str,
+    fields: tuple[str, ...] = Depends(get_fields),
+    container=Depends(init_container),
+):
+    product = await container.resolve(Mediator).send(
+        GetProductByOidCommand(product_oid=product_oid, fields=PartialProductResponseSchema.document_fields(fields)),
+    )
+    return CreateProductResponseSchema(
+        product_oid=product.oid,
+        title=product.title,
+        description=product.description,
+        expiry_date=product.expiry_date,
+        image_url=product.image_url,
+        manufacturer=product.manufacturer,
+        ingredients=product.ingredients,
+    )
+
+
+@legacy_router.post('/search-product')
+async def legacy_search_product(schema: FindProductRequestSchema, container=Depends(init_container)):
+    products = await container.resolve(Mediator).send(
+        FindProductCommand(product_title=schema.product_title, page_size=SEARCH_PAGE_SIZE),
+    )
+    return StreamingResponse(
+        legacy_stream_search_page(products, page_size=SEARCH_PAGE_SIZE),
+        media_type='application/json',
+    )
+
+
+async def seed(client) -> tuple[str, str]:
+    response = await client.post('/pharmacy/', json={'title': 'Аптека', 'description': 'Описание'})
+    pharmacy_oid = response.json()['oid']
+    expiry_date = (datetime.now() + timedelta(days=365)).isoformat()
+    product_oid = None
+
+    for index in range(PHARMACY_PRODUCTS):
+        response = await client.post('/products/create-product', json={
+            'title': f'Аспирин {index}',
+            'description': 'Описание',
+            'expiry_date': expiry_date,
+            'image_url': 'https://example.com/image.png',
+            'ingredients': 'Ацетилсалициловая кислота',
+            'manufacturer': 'Bayer',
+        })
+        product_oid = response.json()['product_oid']
+        await client.post('/products/add-product', json={
+            'product_oid': product_oid,
+            'pharmacy_oid': pharmacy_oid,
+            'price': 100.0 + index,
+            'count': index,
+        })
+
+    return pharmacy_oid, product_oid
+
+
+async def measure(client, requests: int, method: str, url: str, **kwargs) -> float:
+    started = time.perf_counter()
+
+    for _ in range(requests):
+        response = await client.request(method, url, **kwargs)
+        assert response.status_code == 200, response.text
+
+    return requests / (time.perf_counter() - started)
+
+
+async def run_benchmark(requests: int) -> dict[str, tuple[float, float]]:
+    app = create_app()
+    app.include_router(legacy_router, prefix='/legacy')
+    transport = httpx.ASGITransport(app=app)
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+            pharmacy_oid, product_oid = await seed(client)
+            endpoints = {
+                'get-pharmacy': ('GET', '/get-pharmacy', {'params': {'pharmacy_oid': pharmacy_oid}}),
+                'get-product': ('GET', '/get-product', {'params': {'product_oid': product_oid}}),
+                'search-product': (
+                    'POST', '/search-product', {'json': {'product_title': 'Аспирин', 'page_size': SEARCH_PAGE_SIZE}},
+                ),
+            }
+            prefixes = {'get-pharmacy': '/pharmacy', 'get-product': '/products', 'search-product': '/products'}
+
+            results = {}
+            for name, (method, path, kwargs) in endpoints.items():
+                # Замеры чередуются, из раундов берется лучший, чтобы шум не решал, какой путь быстрее
+                before, after = 0.0, 0.0
+                for _ in range(ROUNDS):
+                    before = max(before, await measure(client, requests, method, '/legacy' + path, **kwargs))
+                    after = max(after, await measure(client, requests, method, prefixes[name] + path, **kwargs))
+                results[name] = (before, after)
+
+    return results
+
+
+if __name__ == '__main__':
+    # Контейнер читает конфиг при первом запросе, поэтому переменную достаточно выставить до запуска
+    os.environ.setdefault('REPOSITORY_BACKEND', 'memory')
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    print(f'{"endpoint":<16}{"before, rps":>14}{"after, rps":>14}')  # noqa
+    for name, (before, after) in asyncio.run(run_benchmark(requests)).items():
+        print(f'{name:<16}{before:>14.0f}{after:>14.0f}')  # noqa
@@ -1,5 +1,4 @@
 from abc import ABC
-from copy import copy
 from dataclasses import dataclass, field
 from datetime import datetime
 from uuid import uuid4
@@ -7,8 +6,13 @@ from uuid import uuid4
 from ...domain.events.base import BaseEvent
 
 
-@dataclass
+@dataclass(slots=True)
 class BaseEntity(ABC):
+    """
+    Сущности без __dict__, список событий создается только при регистрации первого события:
+    у прочитанных из хранилища сущностей событий нет. version - номер ревизии документа, каждая запись
+    в хранилище увеличивает его на единицу.
+    """
     oid: str = field(
         default_factory=lambda: str(uuid4()),
         kw_only=True,
@@ -17,15 +21,28 @@ class BaseEntity(ABC):
         default_factory=lambda: datetime.now(),
         kw_only=True,
     )
-    _events: list[BaseEvent] = field(
-        default_factory=list,
+    version: int = field(
+        default=0,
         kw_only=True,
+        compare=False,
+    )
+    _events: list[BaseEvent] | None = field(
+        default=None,
+        kw_only=True,
+        repr=False,
+        compare=False,
     )
 
+    @property
+    def events(self) -> tuple[BaseEvent, ...]:
+        return tuple(self._events) if self._events else ()
+
     def register_event(self, event: BaseEvent) -> None:
+        if self._events is None:
+            self._events = []
+
         self._events.append(event)
 
     def pull_events(self) -> list[BaseEvent]:
-        registered_events = copy(self._events)
-        self._events.clear()
+        registered_events, self._events = self._events or [], None
         return registered_events
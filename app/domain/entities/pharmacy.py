@@ -8,17 +8,18 @@ from .base import BaseEntity
 from .product import ProductEntity
 
 
-@dataclass
+@dataclass(slots=True)
 class PharmacyEntity(BaseEntity):
     title: Title
     description: Text
     products: List[dict] = field(default_factory=list, kw_only=True)
 
-    def add_product_with_price(self, product: ProductEntity, price: float):
+    def add_product_with_price(self, product: ProductEntity, price: float, count: int = 0):
         """
         Добавление продукта в аптеку с указанием цены.
+        Позиция хранится в том же виде, что и в документе аптеки.
         """
-        self.products.append({product: price})
+        self.products.append({'product_oid': product.oid, 'price': price, 'count': count})
 
         self.register_event(
             ProductAddedToPharmacyEvent(
@@ -4,7 +4,7 @@ from ...domain.entities.base import BaseEntity
 from ...domain.values.product import Price
 
 
-@dataclass
+@dataclass(slots=True)
 class PriceEntity(BaseEntity):
     product: 'ProductEntity' # noqa
     pharmacy: 'PharmacyEntity' # noqa
@@ -5,7 +5,7 @@ from ..values.product import ExpiresDate, Text, Title
 from .base import BaseEntity
 
 
-@dataclass
+@dataclass(slots=True)
 class ProductEntity(BaseEntity):
     title: Title
     description: Text
@@ -0,0 +1,30 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from .base import BaseEntity
+
+
+@dataclass(slots=True)
+class ReservationEntity(BaseEntity):
+    """
+    Удержание quantity единиц товара аптеки до expires_at. Остаток позиции уменьшается сразу при резерве:
+    commit делает списание окончательным, release и истечение срока возвращают единицы в остаток.
+    """
+    pharmacy_oid: str
+    product_oid: str
+    quantity: int
+    expires_at: datetime
+
+    @classmethod
+    def create_reservation(cls, pharmacy_oid: str, product_oid: str, quantity: int, ttl_seconds: float):
+        now = datetime.now()
+        return cls(
+            pharmacy_oid=pharmacy_oid,
+            product_oid=product_oid,
+            quantity=quantity,
+            expires_at=now + timedelta(seconds=ttl_seconds),
+            created_at=now,
+        )
+
+    def is_expired(self, now: datetime) -> bool:
+        return self.expires_at <= now
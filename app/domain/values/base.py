@@ -5,13 +5,22 @@ from typing import Any, Generic, TypeVar
 VT = TypeVar('VT', bound=Any)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class BaseValueObject(ABC, Generic[VT]):
     value: VT
 
     def __post_init__(self):
         self.validate()
 
+    @classmethod
+    def from_validated(cls, value: VT) -> 'BaseValueObject[VT]':
+        """
+        Создает value object без validate(): значение уже проверено пакетной проверкой колонки.
+        """
+        value_object = object.__new__(cls)
+        object.__setattr__(value_object, 'value', value)
+        return value_object
+
     @abstractmethod
     def validate(self):
         ...
@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import Iterable, Sequence
+
+from ..exceptions.base import ApplicationException
+from ..exceptions.product import (EmptyTextException, ExpiresDateException,
+                                  TitleTooLongException)
+from .product import TITLE_MAX_LENGTH
+
+RowErrors = list[ApplicationException | None]
+
+
+def validate_texts(values: Sequence[str]) -> RowErrors:
+    return [None if value else EmptyTextException() for value in values]
+
+
+def validate_titles(values: Sequence[str]) -> RowErrors:
+    return [
+        EmptyTextException() if not value
+        else TitleTooLongException(value) if len(value) > TITLE_MAX_LENGTH
+        else None
+        for value in values
+    ]
+
+
+def validate_expiry_dates(values: Sequence[datetime], now: datetime) -> RowErrors:
+    """
+    Все даты сравниваются с одним now, а не с datetime.now() на каждое значение, как в ExpiresDate.validate.
+    """
+    return [ExpiresDateException() if value < now else None for value in values]
+
+
+def merge_row_errors(columns: Iterable[RowErrors]) -> RowErrors:
+    """
+    Первая ошибка строки в порядке колонок, как если бы value objects строки создавались по очереди.
+    """
+    return [next((error for error in row if error is not None), None) for row in zip(*columns)]
@@ -6,8 +6,10 @@ from ..exceptions.product import (EmptyTextException, ExpiresDateException,
                                   TitleTooLongException)
 from .base import VT, BaseValueObject
 
+TITLE_MAX_LENGTH = 255
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class Text(BaseValueObject):
     value: str
 
@@ -19,7 +21,7 @@ class Text(BaseValueObject):
         return str(self.value)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Title(BaseValueObject):
     value: str
 
@@ -27,14 +29,14 @@ class Title(BaseValueObject):
         if not self.value:
             raise EmptyTextException()
 
-        if len(str(self.value)) > 255:
+        if len(str(self.value)) > TITLE_MAX_LENGTH:
             raise TitleTooLongException(self.value)
 
     def as_generic_type(self) -> VT:
         return str(self.value)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ExpiresDate(BaseValueObject):
     value: datetime
 
@@ -46,7 +48,7 @@ class ExpiresDate(BaseValueObject):
         return self.value.isoformat()
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Price(BaseValueObject):
     value: float
 
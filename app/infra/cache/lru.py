@@ -0,0 +1,104 @@
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Generic, Hashable, TypeVar
+
+KT = TypeVar('KT', bound=Hashable)
+VT = TypeVar('VT')
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+
+@dataclass(eq=False)
+class LRUCache(Generic[KT, VT]):
+    """
+    LRU кэш с TTL на каждую запись и ограничением по суммарному весу записей.
+    Вес записи считает weigher, по умолчанию каждая запись весит 1.
+    """
+    max_size: int
+    ttl_seconds: float
+    weigher: Callable[[VT], int] = lambda value: 1
+    clock: Callable[[], float] = time.monotonic
+    stats: CacheStats = field(default_factory=CacheStats)
+
+    _entries: OrderedDict = field(default_factory=OrderedDict, init=False, repr=False)
+    _size: int = field(default=0, init=False, repr=False)
+    _generation: int = field(default=0, init=False, repr=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def generation(self) -> int:
+        """
+        Меняется при каждой инвалидации. Читатель запоминает его до запроса в хранилище и передает в put,
+        чтобы не положить в кэш значение, прочитанное до конкурентной записи.
+        """
+        return self._generation
+
+    def get(self, key: KT) -> VT | None:
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        expires_at, weight, value = entry
+
+        if expires_at <= self.clock():
+            self._pop(key)
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def put(self, key: KT, value: VT, generation: int | None = None) -> None:
+        if generation is not None and generation != self._generation:
+            return
+
+        weight = self.weigher(value)
+        self._pop(key)
+
+        if weight > self.max_size:
+            return
+
+        self._entries[key] = (self.clock() + self.ttl_seconds, weight, value)
+        self._size += weight
+
+        while self._size > self.max_size:
+            evicted_key = next(iter(self._entries))
+            self._pop(evicted_key)
+            self.stats.evictions += 1
+
+    def invalidate(self, key: KT) -> None:
+        self._generation += 1
+        self.stats.invalidations += 1
+        self._pop(key)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+        self._size = 0
+
+    def snapshot(self) -> dict:
+        return {**asdict(self.stats), 'entries': len(self._entries), 'size': self._size}
+
+    def _pop(self, key: KT) -> None:
+        entry = self._entries.pop(key, None)
+
+        if entry is not None:
+            self._size -= entry[1]
@@ -0,0 +1,128 @@
+import asyncio
+from dataclasses import asdict, dataclass, field
+from threading import Lock
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+from ...settings.config import Config
+
+
+@dataclass
+class MongoPoolStats:
+    connections_created: int = 0
+    connections_closed: int = 0
+    connections_checked_out: int = 0
+    checkouts: int = 0
+    checkout_failures: int = 0
+    checkout_wait_total_seconds: float = 0.0
+    checkout_wait_max_seconds: float = 0.0
+    pools_cleared: int = 0
+
+
+@dataclass(eq=False)
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Счетчики пула соединений, которые pymongo обновляет через свои события.
+    События приходят в том числе из фоновых потоков драйвера, поэтому обновления идут под блокировкой.
+    """
+    stats: MongoPoolStats = field(default_factory=MongoPoolStats)
+    _lock: Lock = field(default_factory=Lock, init=False, repr=False)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = asdict(self.stats)
+
+        stats['checkout_wait_avg_seconds'] = (
+            stats['checkout_wait_total_seconds'] / stats['checkouts'] if stats['checkouts'] else 0.0
+        )
+        return stats
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        ...
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        ...
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        with self._lock:
+            self.stats.pools_cleared += 1
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        ...
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        with self._lock:
+            self.stats.connections_created += 1
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        ...
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        with self._lock:
+            self.stats.connections_closed += 1
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        ...
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        with self._lock:
+            self.stats.checkout_failures += 1
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        duration = event.duration or 0.0
+
+        with self._lock:
+            self.stats.checkouts += 1
+            self.stats.connections_checked_out += 1
+            self.stats.checkout_wait_total_seconds += duration
+            self.stats.checkout_wait_max_seconds = max(self.stats.checkout_wait_max_seconds, duration)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        with self._lock:
+            self.stats.connections_checked_out -= 1
+
+
+@dataclass(eq=False)
+class MongoConnectionManager:
+    """
+    Единственный клиент MongoDB на процесс, общий для всех репозиториев.
+    """
+    config: Config
+    pool_metrics: MongoPoolMetrics = field(default_factory=MongoPoolMetrics)
+    _client: AsyncIOMotorClient | None = field(default=None, init=False, repr=False)
+
+    @property
+    def client(self) -> AsyncIOMotorClient:
+        if self._client is None:
+            self._client = self._create_client()
+
+        return self._client
+
+    def _create_client(self) -> AsyncIOMotorClient:
+        options = {
+            'maxPoolSize': self.config.mongodb_max_pool_size,
+            'minPoolSize': self.config.mongodb_min_pool_size,
+            'maxIdleTimeMS': self.config.mongodb_max_idle_time_ms,
+            'waitQueueTimeoutMS': self.config.mongodb_wait_queue_timeout_ms,
+            'serverSelectionTimeoutMS': self.config.mongodb_server_selection_timeout_ms,
+            'event_listeners': [self.pool_metrics],
+        }
+        if self.config.mongodb_compressors:
+            options['compressors'] = self.config.mongodb_compressors
+
+        return AsyncIOMotorClient(self.config.mongodb_connection_uri, **options)
+
+    async def connect(self) -> None:
+        """
+        Открывает пул и заранее прогревает minPoolSize соединений, чтобы первые запросы не ждали handshake.
+        """
+        client = self.client
+        await client.admin.command('ping')
+
+        warm_up_size = max(self.config.mongodb_min_pool_size - 1, 0)
+        await asyncio.gather(*(client.admin.command('ping') for _ in range(warm_up_size)))
+
+    async def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
@@ -0,0 +1,68 @@
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterable
+
+from app.domain.events.base import BaseEvent
+
+
+@dataclass
+class BaseOutbox(ABC):
+    """
+    Хранилище событий, записанных вместе с изменением состояния, до их доставки.
+    Запись в outbox claim забирает пачкой под аренду (lease): если ее не подтвердили через complete
+    или не вернули через release до конца аренды, ее снова заберет следующий claim.
+    """
+    async def check_storage(self) -> None:
+        """
+        Проверяет при старте, что хранилище дает гарантии, на которые рассчитан outbox.
+        """
+        ...
+
+    async def ensure_indexes(self) -> None:
+        ...
+
+    @asynccontextmanager
+    async def write(self, events: Iterable[BaseEvent]) -> AsyncIterator[Any]:
+        """
+        Оборачивает запись состояния: отдает сессию, в которой нужно выполнить запись,
+        и сохраняет события, только если запись прошла без ошибки.
+        """
+        yield None
+        await self.add(events)
+
+    @abstractmethod
+    async def add(self, events: Iterable[BaseEvent], session: Any = None) -> None:
+        ...
+
+    @abstractmethod
+    async def claim(self, batch_size: int, lease_seconds: float) -> list[dict]:
+        """
+        Записи пачки помечены одним claim_id, по нему complete, release и bury узнают свою аренду.
+        """
+        ...
+
+    @abstractmethod
+    async def complete(self, claim_id: str, event_ids: list[str]) -> None:
+        ...
+
+    @abstractmethod
+    async def release(self, claim_id: str, event_ids: list[str], retry_delay_seconds: float) -> None:
+        ...
+
+    @abstractmethod
+    async def bury(self, claim_id: str, event_ids: list[str]) -> None:
+        """
+        Убирает записи, которые не удалось доставить за отведенное число попыток, из очереди на доставку.
+        """
+        ...
+
+
+@asynccontextmanager
+async def write_with_events(outbox: BaseOutbox | None, events: Iterable[BaseEvent]) -> AsyncIterator[Any]:
+    if outbox is None:
+        yield None
+        return
+
+    async with outbox.write(events) as session:
+        yield session
@@ -0,0 +1,47 @@
+from dataclasses import fields
+from datetime import datetime
+from uuid import UUID
+
+from ...domain.events.base import BaseEvent
+from ...domain.events.pharmacy import NewPharmacyCreatedEvent
+from ...domain.events.product import (NewProductReceivedEvent,
+                                      ProductAddedToPharmacyEvent)
+from ...domain.values.base import BaseValueObject
+
+EVENT_TYPES: dict[str, type[BaseEvent]] = {
+    event_type.__name__: event_type
+    for event_type in (NewPharmacyCreatedEvent, NewProductReceivedEvent, ProductAddedToPharmacyEvent)
+}
+
+OUTBOX_PENDING = 'pending'
+OUTBOX_DONE = 'done'
+OUTBOX_FAILED = 'failed'
+
+
+def convert_event_to_document(event: BaseEvent, now: datetime) -> dict:
+    payload = {}
+
+    for event_field in fields(event):
+        if event_field.name == 'event_id':
+            continue
+
+        value = getattr(event, event_field.name)
+        payload[event_field.name] = value.as_generic_type() if isinstance(value, BaseValueObject) else value
+
+    return {
+        '_id': str(event.event_id),
+        'event_type': type(event).__name__,
+        'payload': payload,
+        'status': OUTBOX_PENDING,
+        'attempts': 0,
+        'created_at': now,
+        'available_at': now,
+    }
+
+
+def convert_document_to_event(document: dict) -> BaseEvent:
+    """
+    Событие из outbox хранит поля простыми значениями, а не value objects, как и сущности из репозиториев.
+    """
+    event_type = EVENT_TYPES[document['event_type']]
+    return event_type(event_id=UUID(document['_id']), **document['payload'])
@@ -0,0 +1,158 @@
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, ClassVar, Iterable
+from uuid import uuid4
+
+from motor.core import AgnosticClient
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
+
+from ...domain.events.base import BaseEvent
+from ..repositories.indexes import (IndexSpec, ascending, explain_queries,
+                                    reconcile_indexes)
+from .base import BaseOutbox
+from .converters import (OUTBOX_DONE, OUTBOX_FAILED, OUTBOX_PENDING,
+                         convert_event_to_document)
+
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+
+@dataclass
+class MongoDBOutbox(BaseOutbox):
+    """
+    Outbox в отдельной коллекции MongoDB, _id записи - event_id события, повторная запись того же события
+    ничего не меняет.
+
+    События пишутся в одной транзакции с изменением состояния, для этого нужен replica set или шардированный
+    кластер: check_storage при старте останавливает сервис на одиночном сервере. use_transactions=False
+    отключает транзакции явно: события пишутся сразу после изменения состояния, и если процесс упадет
+    между двумя записями, события этого изменения потеряются.
+
+    complete, release и bury меняют только записи, которые все еще помечены claim_id пачки: если аренда
+    истекла и записи забрал другой релей, результат опоздавшего релея их не трогает.
+    """
+    mongo_db_client: AgnosticClient
+    mongo_db_db_name: str
+    mongo_db_collection_name: str = 'outbox_collection'
+    use_transactions: bool = True
+    done_ttl_seconds: int = 86400
+
+    queries: ClassVar[tuple[dict, ...]] = (
+        {'status': OUTBOX_PENDING, 'available_at': {'$lte': datetime.min}},
+        {'claim_id': ''},
+    )
+
+    @property
+    def indexes(self) -> tuple[IndexSpec, ...]:
+        return (
+            IndexSpec(name='status_available_at', keys=ascending('status', 'available_at')),
+            IndexSpec(name='claim_id', keys=ascending('claim_id')),
+            IndexSpec(
+                name='processed_at_ttl',
+                keys=ascending('processed_at'),
+                expire_after_seconds=self.done_ttl_seconds,
+            ),
+        )
+
+    def _get_outbox_collection(self):
+        return self.mongo_db_client[self.mongo_db_db_name][self.mongo_db_collection_name]
+
+    async def check_storage(self) -> None:
+        if not self.use_transactions:
+            return
+
+        hello = await self.mongo_db_client.admin.command('hello')
+
+        if 'setName' not in hello and hello.get('msg') != 'isdbgrid':
+            raise RuntimeError(
+                'Outbox пишет события в транзакции, а MongoDB запущена одиночным сервером без replica set. '
+                'Запустите MongoDB как replica set или отключите транзакции явно: OUTBOX_USE_TRANSACTIONS=false',
+            )
+
+    async def ensure_indexes(self) -> None:
+        await reconcile_indexes(self._get_outbox_collection(), self.indexes)
+
+    async def explain_queries(self) -> list[dict]:
+        return await explain_queries(self._get_outbox_collection(), self.queries)
+
+    @asynccontextmanager
+    async def write(self, events: Iterable[BaseEvent]) -> AsyncIterator[Any]:
+        events = list(events)
+
+        if not events:
+            yield None
+            return
+
+        if not self.use_transactions:
+            yield None
+            await self.add(events)
+            return
+
+        async with await self.mongo_db_client.start_session() as session:
+            async with session.start_transaction():
+                yield session
+                await self.add(events, session=session)
+
+    async def add(self, events: Iterable[BaseEvent], session: Any = None) -> None:
+        now = datetime.now()
+        documents = [convert_event_to_document(event, now) for event in events]
+
+        if not documents:
+            return
+
+        try:
+            await self._get_outbox_collection().insert_many(documents, ordered=False, session=session)
+        except BulkWriteError as exc:
+            if any(error['code'] != DUPLICATE_KEY_ERROR_CODE for error in exc.details['writeErrors']):
+                raise
+
+    async def claim(self, batch_size: int, lease_seconds: float) -> list[dict]:
+        """
+        Три запроса на пачку независимо от ее размера: найти готовые записи, пометить их своим claim_id
+        с продлением available_at на срок аренды и прочитать то, что удалось пометить.
+        """
+        collection = self._get_outbox_collection()
+        now = datetime.now()
+        ready_filter = {'status': OUTBOX_PENDING, 'available_at': {'$lte': now}}
+
+        cursor = collection.find(ready_filter, {'_id': 1}).sort('available_at', ASCENDING).limit(batch_size)
+        event_ids = [document['_id'] async for document in cursor]
+
+        if not event_ids:
+            return []
+
+        claim_id = str(uuid4())
+        await collection.update_many(
+            {**ready_filter, '_id': {'$in': event_ids}},
+            {
+                '$set': {'claim_id': claim_id, 'available_at': now + timedelta(seconds=lease_seconds)},
+                '$inc': {'attempts': 1},
+            },
+        )
+
+        return [document async for document in collection.find({'claim_id': claim_id})]
+
+    async def complete(self, claim_id: str, event_ids: list[str]) -> None:
+        if event_ids:
+            await self._get_outbox_collection().update_many(
+                {'_id': {'$in': event_ids}, 'claim_id': claim_id},
+                {'$set': {'status': OUTBOX_DONE, 'processed_at': datetime.now()}, '$unset': {'claim_id': ''}},
+            )
+
+    async def release(self, claim_id: str, event_ids: list[str], retry_delay_seconds: float) -> None:
+        if event_ids:
+            await self._get_outbox_collection().update_many(
+                {'_id': {'$in': event_ids}, 'claim_id': claim_id},
+                {
+                    '$set': {'available_at': datetime.now() + timedelta(seconds=retry_delay_seconds)},
+                    '$unset': {'claim_id': ''},
+                },
+            )
+
+    async def bury(self, claim_id: str, event_ids: list[str]) -> None:
+        if event_ids:
+            await self._get_outbox_collection().update_many(
+                {'_id': {'$in': event_ids}, 'claim_id': claim_id},
+                {'$set': {'status': OUTBOX_FAILED}, '$unset': {'claim_id': ''}},
+            )
@@ -1,13 +1,36 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Iterable
 
 from app.domain.entities.pharmacy import PharmacyEntity
 from app.domain.entities.product import ProductEntity
+from app.domain.entities.reservation import ReservationEntity
+from app.domain.events.base import BaseEvent
 from app.domain.values.product import ExpiresDate, Price, Text, Title
+from app.logic.exceptions.base import LogicException
+from app.logic.exceptions.pharmacy import PharmacyVersionConflictException
+
+from .bulk import InventoryOperation
+
+
+def check_expected_version(pharmacy_oid: str, version: int, expected_version: int | None) -> None:
+    if expected_version is not None and version != expected_version:
+        raise PharmacyVersionConflictException(
+            pharmacy_oid=pharmacy_oid,
+            expected_version=expected_version,
+            actual_version=version,
+        )
 
 
 @dataclass
 class BaseProductRepo(ABC):
+    async def ensure_indexes(self) -> None:
+        ...
+
+    async def build_search_index(self) -> None:
+        ...
+
     @abstractmethod
     async def check_product_exists_by_title(self, title: str):
         ...
@@ -16,10 +39,39 @@ class BaseProductRepo(ABC):
     async def add_product(self, product: ProductEntity):
         ...
 
+    @abstractmethod
+    async def get_existing_titles(self, titles: list[str]) -> set[str]:
+        ...
+
+    @abstractmethod
+    async def add_products_bulk(self, products: list[ProductEntity]) -> dict[int, LogicException]:
+        """
+        Пакетное добавление товаров, возвращает ошибки по индексу товаров, которые не удалось сохранить.
+        """
+        ...
+
     @abstractmethod
     async def get_product_by_oid(self, oid: str) -> ProductEntity:
         ...
 
+    @abstractmethod
+    async def get_products_by_oids(self, oids: list[str]) -> list[ProductEntity]:
+        """
+        Найденные товары в порядке oids, повторы схлопываются, отсутствующие пропускаются.
+        """
+        ...
+
+    @abstractmethod
+    async def get_partial_product_by_oid(self, oid: str, fields: tuple[str, ...]) -> dict:
+        ...
+
+    @abstractmethod
+    async def get_product_version(self, oid: str) -> int:
+        """
+        Только номер ревизии товара, без чтения и сборки остальных полей: его хватает для ответа 304.
+        """
+        ...
+
     @abstractmethod
     async def update_product(
             self,
@@ -30,7 +82,7 @@ class BaseProductRepo(ABC):
             image_url: Text,
             ingredients: Text,
             manufacturer: Title,
-    ):
+    ) -> ProductEntity:
         ...
 
     @abstractmethod
@@ -41,12 +93,35 @@ class BaseProductRepo(ABC):
         ...
 
     @abstractmethod
-    async def search_product(self, query: str):
+    def search_product(
+            self,
+            query: str,
+            limit: int,
+            after: tuple[float, str] | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Документы отсортированы по убыванию score, при равном score по oid.
+        after - пара (score, oid) последнего документа предыдущей страницы.
+        """
+        ...
+
+    @abstractmethod
+    def iter_products(self, batch_size: int) -> AsyncIterator[dict]:
+        """
+        Все товары документами с полями PRODUCT_DOCUMENT_FIELDS для выгрузки каталога.
+        Хранилище читается пачками по batch_size, в памяти держится только текущая пачка.
+        """
         ...
 
 
 @dataclass
 class BasePharmacyRepo(ABC):
+    async def ensure_indexes(self) -> None:
+        ...
+
+    async def build_search_index(self) -> None:
+        ...
+
     @abstractmethod
     async def check_pharmacy_exists_by_title(self, title: str):
         ...
@@ -60,20 +135,53 @@ class BasePharmacyRepo(ABC):
         ...
 
     @abstractmethod
-    async def update_pharmacy(self, oid: str, title: Title, description: Text):
+    async def get_pharmacies_by_oids(self, oids: list[str]) -> list[PharmacyEntity]:
+        """
+        Найденные аптеки в порядке oids, повторы схлопываются, отсутствующие пропускаются.
+        """
         ...
 
     @abstractmethod
-    async def add_product_to_pharmacy(self, pharmacy_oid: str, product_oid: str, price: Price, count: int):
+    async def get_partial_pharmacy_by_oid(self, oid: str, fields: tuple[str, ...]) -> dict:
         ...
 
     @abstractmethod
-    async def update_product_price_in_pharmacy(
+    async def get_pharmacy_version(self, oid: str) -> int:
+        """
+        Только номер ревизии аптеки, без чтения позиций: его хватает для ответа 304.
+        """
+        ...
+
+    @abstractmethod
+    async def update_pharmacy(self, oid: str, title: Title, description: Text) -> PharmacyEntity:
+        ...
+
+    @abstractmethod
+    async def add_product_to_pharmacy(
             self,
             pharmacy_oid: str,
             product_oid: str,
             price: Price,
+            count: int,
+            events: Iterable[BaseEvent] = (),
+            expected_version: int | None = None,
     ):
+        """
+        events - события аптеки об этом изменении, репозиторий с outbox сохраняет их вместе с позицией.
+
+        Методы, меняющие позиции, с expected_version пишут только если версия аптеки не изменилась,
+        иначе поднимают PharmacyVersionConflictException и ничего не меняют.
+        """
+        ...
+
+    @abstractmethod
+    async def update_product_price_in_pharmacy(
+            self,
+            pharmacy_oid: str,
+            product_oid: str,
+            price: Price,
+            expected_version: int | None = None,
+    ) -> PharmacyEntity:
         ...
 
     @abstractmethod
@@ -81,9 +189,36 @@ class BasePharmacyRepo(ABC):
             self,
             pharmacy_oid: str,
             product_oid: str,
+            expected_version: int | None = None,
     ):
         ...
 
+    @abstractmethod
+    async def take_stock(self, pharmacy_oid: str, product_oid: str, quantity: int) -> None:
+        """
+        Атомарно уменьшает остаток позиции на quantity, только если в остатке не меньше quantity,
+        иначе поднимает NotEnoughStockException и ничего не меняет. Остаток не уходит в минус
+        при любом числе одновременных вызовов.
+        """
+        ...
+
+    @abstractmethod
+    async def return_stock(self, pharmacy_oid: str, product_oid: str, quantity: int) -> None:
+        """
+        Возвращает quantity в остаток позиции. Если позицию или аптеку уже удалили, возвращать некуда,
+        это не ошибка.
+        """
+        ...
+
+    @abstractmethod
+    async def apply_inventory_operations(self, operations: list[InventoryOperation]) -> dict[int, LogicException]:
+        """
+        Пакетное изменение цен, остатков и удаление позиций в нескольких аптеках. Результат тот же,
+        что у выполнения операций по одной в порядке списка. Возвращает ошибки по индексу операции,
+        операции с ошибкой ничего не меняют, остальные применяются.
+        """
+        ...
+
     @abstractmethod
     async def delete_pharmacy(
             self,
@@ -92,8 +227,97 @@ class BasePharmacyRepo(ABC):
         ...
 
     @abstractmethod
-    async def find_pharmacy(
+    def find_pharmacy(
         self,
         pharmacy_title: str,
-    ):
+        limit: int,
+        after: tuple[float, str] | None = None,
+    ) -> AsyncIterator[dict]:
+        ...
+
+    @abstractmethod
+    def get_pharmacy_inventory(
+        self,
+        pharmacy_oid: str,
+        limit: int,
+        after: str | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Товары аптеки страницами, отсортированные по product_oid.
+        after - product_oid последней позиции предыдущей страницы.
+        """
+        ...
+
+    @abstractmethod
+    def find_offers_for_product(
+        self,
+        product_oid: str,
+        limit: int,
+        after: tuple[float, str] | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Предложения аптек с товаром в наличии (count > 0), отсортированные по цене, при равной цене по pharmacy_oid.
+        after - пара (price, pharmacy_oid) последнего предложения предыдущей страницы.
+        """
+        ...
+
+    @abstractmethod
+    def iter_pharmacies(self, batch_size: int) -> AsyncIterator[dict]:
+        """
+        Все аптеки документами с полями PHARMACY_DOCUMENT_FIELDS, products - все позиции аптеки.
+        Хранилище читается пачками по batch_size, в памяти держится только текущая пачка и позиции одной аптеки.
+        """
+        ...
+
+
+@dataclass
+class BaseReservationRepo(ABC):
+    """
+    Действующие резервы остатков. Подтверждение забирает резерв вместе с удалением. Отмена и очистка
+    истекших резервов сначала берут резерв в аренду на время возврата единиц в остаток и удаляют его
+    только после возврата: резерв, возврат которого не прошел, после аренды снова заберет очистка.
+    Аренда не дает двум возвратам идти одновременно, единицы не теряются, но при сбое между возвратом
+    и удалением могут вернуться повторно (доставка не реже одного раза).
+    """
+    async def ensure_indexes(self) -> None:
+        ...
+
+    @abstractmethod
+    async def add_reservation(self, reservation: ReservationEntity) -> None:
+        ...
+
+    @abstractmethod
+    async def pop_reservation(self, oid: str, active_at: datetime) -> ReservationEntity | None:
+        """
+        Забирает резерв, только если он еще не истек на момент active_at.
+        """
+        ...
+
+    @abstractmethod
+    async def lease_reservation(self, oid: str, now: datetime) -> ReservationEntity | None:
+        """
+        Берет резерв в аренду для возврата и делает его истекшим: подтвердить его уже нельзя,
+        а если возврат не пройдет, резерв заберет очистка. None - резерва нет или его уже возвращают.
+        """
+        ...
+
+    @abstractmethod
+    async def lease_expired_reservations(self, now: datetime, limit: int) -> list[ReservationEntity]:
+        """
+        Берет в аренду до limit истекших резервов, которые никто не возвращает.
+        """
+        ...
+
+    @abstractmethod
+    async def delete_reservation(self, oid: str) -> None:
+        """
+        Удаляет резерв, единицы которого уже вернулись в остаток.
+        """
+        ...
+
+    @abstractmethod
+    async def release_leases(self, oids: list[str]) -> None:
+        """
+        Снимает аренду с резервов, возврат которых не прошел, чтобы следующая очистка забрала их сразу.
+        """
         ...
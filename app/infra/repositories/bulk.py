@@ -0,0 +1,120 @@
+from dataclasses import dataclass, field
+from typing import Iterable, Literal
+
+from motor.core import AgnosticCollection
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from ...domain.values.product import Price
+from ...logic.exceptions.base import LogicException
+from ...logic.exceptions.pharmacy import (InventoryOperationNotSavedException,
+                                          PharmacyNotFoundException)
+from ...logic.exceptions.products import ProductNotFoundException
+
+InventoryOp = Literal['set_price', 'set_count', 'remove']
+
+
+@dataclass(frozen=True, slots=True)
+class InventoryOperation:
+    pharmacy_oid: str
+    product_oid: str
+    op: InventoryOp
+    price: Price | None = None
+    count: int | None = None
+
+
+@dataclass
+class PharmacyInventoryChanges:
+    """
+    Итог операций пачки над одной аптекой: новые цены и остатки позиций и удаляемые позиции.
+    Удаляемые позиции не пересекаются с изменяемыми, поэтому записи можно выполнять в любом порядке.
+    operation_indexes - индексы операций пачки по товару, ошибка записи возвращается каждой операции, вошедшей в нее.
+    """
+    prices: dict[str, float] = field(default_factory=dict)
+    counts: dict[str, int] = field(default_factory=dict)
+    removals: list[str] = field(default_factory=list)
+    operation_indexes: dict[str, list[int]] = field(default_factory=dict)
+
+    @property
+    def changed_product_oids(self) -> list[str]:
+        return list(dict.fromkeys([*self.prices, *self.counts]))
+
+    def indexes_of(self, product_oids: Iterable[str]) -> list[int]:
+        return [index for product_oid in product_oids for index in self.operation_indexes[product_oid]]
+
+
+def plan_inventory_operations(
+    operations: list[InventoryOperation],
+    positions: dict[str, set[str]],
+) -> tuple[dict[str, PharmacyInventoryChanges], dict[int, LogicException]]:
+    """
+    Сводит операции к изменениям по аптекам так, как если бы они выполнялись по одной в порядке запроса.
+    positions - товары каждой найденной аптеки, аптеки, которой нет в positions, не существует.
+    Возвращает изменения и ошибки по индексу операции, операции с ошибкой ничего не меняют.
+    """
+    positions = {pharmacy_oid: set(product_oids) for pharmacy_oid, product_oids in positions.items()}
+    changes: dict[str, PharmacyInventoryChanges] = {}
+    errors: dict[int, LogicException] = {}
+
+    for index, operation in enumerate(operations):
+        product_oids = positions.get(operation.pharmacy_oid)
+
+        if product_oids is None:
+            errors[index] = PharmacyNotFoundException()
+            continue
+
+        if operation.product_oid not in product_oids:
+            errors[index] = ProductNotFoundException()
+            continue
+
+        pharmacy_changes = changes.setdefault(operation.pharmacy_oid, PharmacyInventoryChanges())
+        pharmacy_changes.operation_indexes.setdefault(operation.product_oid, []).append(index)
+
+        if operation.op == 'remove':
+            product_oids.discard(operation.product_oid)
+            pharmacy_changes.prices.pop(operation.product_oid, None)
+            pharmacy_changes.counts.pop(operation.product_oid, None)
+            pharmacy_changes.removals.append(operation.product_oid)
+        elif operation.op == 'set_price':
+            pharmacy_changes.prices[operation.product_oid] = operation.price.as_generic_type()
+        else:
+            pharmacy_changes.counts[operation.product_oid] = operation.count
+
+    return changes, errors
+
+
+def map_write_errors(write_operations: list[list[int]], write_errors: list[dict]) -> dict[int, LogicException]:
+    """
+    Ошибки неупорядоченного bulk_write по индексу операции: write_operations[i] - операции, вошедшие в запись i.
+    """
+    return {
+        index: InventoryOperationNotSavedException(reason=error.get('errmsg', ''))
+        for error in write_errors
+        for index in write_operations[error['index']]
+    }
+
+
+async def bulk_write_inventory(
+    collection: AgnosticCollection,
+    writes: list,
+    write_operations: list[list[int]],
+) -> dict[int, LogicException]:
+    """
+    Неупорядоченная запись пачки: упавшая запись не останавливает остальные, ее операции получают ошибку.
+    Если MongoDB не сообщила, какие записи не прошли (сеть, таймаут), исход неизвестен
+    и ошибку получают все операции пачки.
+    """
+    if not writes:
+        return {}
+
+    try:
+        await collection.bulk_write(writes, ordered=False)
+    except BulkWriteError as exc:
+        return map_write_errors(write_operations, exc.details['writeErrors'])
+    except PyMongoError as exc:
+        return {
+            index: InventoryOperationNotSavedException(reason=str(exc))
+            for indexes in write_operations
+            for index in indexes
+        }
+
+    return {}
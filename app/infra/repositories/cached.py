@@ -0,0 +1,322 @@
+from dataclasses import dataclass, replace
+from typing import AsyncIterator, Iterable
+
+from ...domain.entities.pharmacy import PharmacyEntity
+from ...domain.entities.product import ProductEntity
+from ...domain.events.base import BaseEvent
+from ...domain.values.product import ExpiresDate, Price, Text, Title
+from ...logic.exceptions.base import LogicException
+from ..cache.lru import LRUCache
+from .base import BasePharmacyRepo, BaseProductRepo
+from .bulk import InventoryOperation
+from .lazy import LazyPharmacyEntity
+
+
+def copy_product(product: ProductEntity) -> ProductEntity:
+    return replace(product, _events=None)
+
+
+def copy_pharmacy(pharmacy: PharmacyEntity) -> PharmacyEntity:
+    """
+    Обработчики меняют полученную аптеку (add_product_with_price), поэтому из кэша всегда отдается копия.
+    Ленивая аптека копируется без декодирования позиций: копия ссылается на те же неизменяемые байты.
+    """
+    if isinstance(pharmacy, LazyPharmacyEntity):
+        return pharmacy.copy()
+
+    return replace(pharmacy, products=[dict(product) for product in pharmacy.products], _events=None)
+
+
+def read_many_from_cache(cache: LRUCache, oids: list[str]) -> tuple[dict, list[str]]:
+    found = {}
+    missing = []
+
+    for oid in dict.fromkeys(oids):
+        value = cache.get(oid)
+
+        if value is None:
+            missing.append(oid)
+        else:
+            found[oid] = value
+
+    return found, missing
+
+
+def weigh_pharmacy(pharmacy: PharmacyEntity) -> int:
+    if isinstance(pharmacy, LazyPharmacyEntity):
+        return 1 + pharmacy.products_count
+
+    return 1 + len(pharmacy.products)
+
+
+@dataclass
+class CachedProductRepo(BaseProductRepo):
+    """
+    Read-through кэш поверх репозитория. Записи сбрасывают запись кэша после завершения,
+    а generation не дает положить в кэш значение, прочитанное до конкурентной записи.
+    """
+    repository: BaseProductRepo
+    cache: LRUCache[str, ProductEntity]
+
+    async def ensure_indexes(self) -> None:
+        await self.repository.ensure_indexes()
+
+    async def build_search_index(self) -> None:
+        await self.repository.build_search_index()
+
+    async def check_product_exists_by_title(self, title: str):
+        return await self.repository.check_product_exists_by_title(title)
+
+    async def add_product(self, product: ProductEntity):
+        await self.repository.add_product(product)
+
+    async def get_existing_titles(self, titles: list[str]) -> set[str]:
+        return await self.repository.get_existing_titles(titles)
+
+    async def add_products_bulk(self, products: list[ProductEntity]) -> dict[int, LogicException]:
+        return await self.repository.add_products_bulk(products)
+
+    async def get_product_by_oid(self, oid: str) -> ProductEntity:
+        product = self.cache.get(oid)
+
+        if product is None:
+            generation = self.cache.generation
+            product = await self.repository.get_product_by_oid(oid)
+            self.cache.put(oid, product, generation=generation)
+
+        return copy_product(product)
+
+    async def get_products_by_oids(self, oids: list[str]) -> list[ProductEntity]:
+        found, missing = read_many_from_cache(self.cache, oids)
+
+        if missing:
+            generation = self.cache.generation
+
+            for product in await self.repository.get_products_by_oids(missing):
+                self.cache.put(product.oid, product, generation=generation)
+                found[product.oid] = product
+
+        return [copy_product(found[oid]) for oid in dict.fromkeys(oids) if oid in found]
+
+    async def get_partial_product_by_oid(self, oid: str, fields: tuple[str, ...]) -> dict:
+        return await self.repository.get_partial_product_by_oid(oid, fields)
+
+    async def get_product_version(self, oid: str) -> int:
+        product = self.cache.get(oid)
+
+        if product is not None:
+            return product.version
+
+        return await self.repository.get_product_version(oid)
+
+    async def update_product(
+            self,
+            oid: str,
+            title: Title,
+            description: Text,
+            expiry_date: ExpiresDate,
+            image_url: Text,
+            ingredients: Text,
+            manufacturer: Title,
+    ) -> ProductEntity:
+        try:
+            return await self.repository.update_product(
+                oid=oid,
+                title=title,
+                description=description,
+                expiry_date=expiry_date,
+                image_url=image_url,
+                ingredients=ingredients,
+                manufacturer=manufacturer,
+            )
+        finally:
+            self.cache.invalidate(oid)
+
+    async def delete_product(
+            self,
+            product_oid: str,
+    ):
+        try:
+            await self.repository.delete_product(product_oid)
+        finally:
+            self.cache.invalidate(product_oid)
+
+    def search_product(
+            self,
+            query: str,
+            limit: int,
+            after: tuple[float, str] | None = None,
+    ) -> AsyncIterator[dict]:
+        return self.repository.search_product(query=query, limit=limit, after=after)
+
+    def iter_products(self, batch_size: int) -> AsyncIterator[dict]:
+        return self.repository.iter_products(batch_size=batch_size)
+
+
+@dataclass
+class CachedPharmacyRepo(BasePharmacyRepo):
+    repository: BasePharmacyRepo
+    cache: LRUCache[str, PharmacyEntity]
+
+    async def ensure_indexes(self) -> None:
+        await self.repository.ensure_indexes()
+
+    async def build_search_index(self) -> None:
+        await self.repository.build_search_index()
+
+    async def check_pharmacy_exists_by_title(self, title: str):
+        return await self.repository.check_pharmacy_exists_by_title(title)
+
+    async def add_pharmacy(self, pharmacy: PharmacyEntity):
+        await self.repository.add_pharmacy(pharmacy)
+
+    async def get_pharmacy_by_oid(self, oid: str) -> PharmacyEntity:
+        pharmacy = self.cache.get(oid)
+
+        if pharmacy is None:
+            generation = self.cache.generation
+            pharmacy = await self.repository.get_pharmacy_by_oid(oid)
+            self.cache.put(oid, pharmacy, generation=generation)
+
+        return copy_pharmacy(pharmacy)
+
+    async def get_pharmacies_by_oids(self, oids: list[str]) -> list[PharmacyEntity]:
+        found, missing = read_many_from_cache(self.cache, oids)
+
+        if missing:
+            generation = self.cache.generation
+
+            for pharmacy in await self.repository.get_pharmacies_by_oids(missing):
+                self.cache.put(pharmacy.oid, pharmacy, generation=generation)
+                found[pharmacy.oid] = pharmacy
+
+        return [copy_pharmacy(found[oid]) for oid in dict.fromkeys(oids) if oid in found]
+
+    async def get_partial_pharmacy_by_oid(self, oid: str, fields: tuple[str, ...]) -> dict:
+        return await self.repository.get_partial_pharmacy_by_oid(oid, fields)
+
+    async def get_pharmacy_version(self, oid: str) -> int:
+        """
+        Запись сбрасывает аптеку из кэша, поэтому версия закэшированной аптеки актуальна
+        и отдается без копии и без декодирования позиций ленивой аптеки.
+        """
+        pharmacy = self.cache.get(oid)
+
+        if pharmacy is not None:
+            return pharmacy.version
+
+        return await self.repository.get_pharmacy_version(oid)
+
+    async def update_pharmacy(self, oid: str, title: Title, description: Text) -> PharmacyEntity:
+        try:
+            return await self.repository.update_pharmacy(oid=oid, title=title, description=description)
+        finally:
+            self.cache.invalidate(oid)
+
+    async def add_product_to_pharmacy(
+            self,
+            pharmacy_oid: str,
+            product_oid: str,
+            price: Price,
+            count: int,
+            events: Iterable[BaseEvent] = (),
+            expected_version: int | None = None,
+    ):
+        try:
+            await self.repository.add_product_to_pharmacy(
+                pharmacy_oid=pharmacy_oid,
+                product_oid=product_oid,
+                price=price,
+                count=count,
+                events=events,
+                expected_version=expected_version,
+            )
+        finally:
+            self.cache.invalidate(pharmacy_oid)
+
+    async def update_product_price_in_pharmacy(
+            self,
+            pharmacy_oid: str,
+            product_oid: str,
+            price: Price,
+            expected_version: int | None = None,
+    ) -> PharmacyEntity:
+        try:
+            return await self.repository.update_product_price_in_pharmacy(
+                pharmacy_oid=pharmacy_oid,
+                product_oid=product_oid,
+                price=price,
+                expected_version=expected_version,
+            )
+        finally:
+            self.cache.invalidate(pharmacy_oid)
+
+    async def delete_product_in_pharmacy(
+            self,
+            pharmacy_oid: str,
+            product_oid: str,
+            expected_version: int | None = None,
+    ):
+        try:
+            await self.repository.delete_product_in_pharmacy(
+                pharmacy_oid=pharmacy_oid,
+                product_oid=product_oid,
+                expected_version=expected_version,
+            )
+        finally:
+            self.cache.invalidate(pharmacy_oid)
+
+    async def take_stock(self, pharmacy_oid: str, product_oid: str, quantity: int) -> None:
+        try:
+            await self.repository.take_stock(pharmacy_oid=pharmacy_oid, product_oid=product_oid, quantity=quantity)
+        finally:
+            self.cache.invalidate(pharmacy_oid)
+
+    async def return_stock(self, pharmacy_oid: str, product_oid: str, quantity: int) -> None:
+        try:
+            await self.repository.return_stock(pharmacy_oid=pharmacy_oid, product_oid=product_oid, quantity=quantity)
+        finally:
+            self.cache.invalidate(pharmacy_oid)
+
+    async def apply_inventory_operations(self, operations: list[InventoryOperation]) -> dict[int, LogicException]:
+        try:
+            return await self.repository.apply_inventory_operations(operations)
+        finally:
+            for pharmacy_oid in {operation.pharmacy_oid for operation in operations}:
+                self.cache.invalidate(pharmacy_oid)
+
+    async def delete_pharmacy(
+            self,
+            pharmacy_oid: str,
+    ):
+        try:
+            await self.repository.delete_pharmacy(pharmacy_oid)
+        finally:
+            self.cache.invalidate(pharmacy_oid)
+
+    def find_pharmacy(
+        self,
+        pharmacy_title: str,
+        limit: int,
+        after: tuple[float, str] | None = None,
+    ) -> AsyncIterator[dict]:
+        return self.repository.find_pharmacy(pharmacy_title=pharmacy_title, limit=limit, after=after)
+
+    def get_pharmacy_inventory(
+        self,
+        pharmacy_oid: str,
+        limit: int,
+        after: str | None = None,
+    ) -> AsyncIterator[dict]:
+        return self.repository.get_pharmacy_inventory(pharmacy_oid=pharmacy_oid, limit=limit, after=after)
+
+    def find_offers_for_product(
+        self,
+        product_oid: str,
+        limit: int,
+        after: tuple[float, str] | None = None,
+    ) -> AsyncIterator[dict]:
+        return self.repository.find_offers_for_product(product_oid=product_oid, limit=limit, after=after)
+
+    def iter_pharmacies(self, batch_size: int) -> AsyncIterator[dict]:
+        return self.repository.iter_pharmacies(batch_size=batch_size)
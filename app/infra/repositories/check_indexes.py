@@ -0,0 +1,53 @@
+"""
+Проверка индексов на локальном mongod: python -m app.infra.repositories.check_indexes
+
+Создает объявленные индексы и выполняет explain() для каждого запроса репозиториев,
+код возврата 1, если хотя бы один план запроса использует COLLSCAN.
+"""
+import asyncio
+import sys
+
+from ...settings.config import Config
+from ..connections.mongo import MongoConnectionManager
+from ..outbox.mongo import MongoDBOutbox
+from .inventory import create_mongodb_pharmacy_repository
+from .mongo import MongoDBProductRepo
+
+
+async def check_indexes() -> int:
+    config = Config()
+    connection_manager = MongoConnectionManager(config=config)
+    await connection_manager.connect()
+
+    repositories = (
+        create_mongodb_pharmacy_repository(config, connection_manager.client),
+        MongoDBProductRepo(
+            mongo_db_client=connection_manager.client,
+            mongo_db_db_name=config.mongodb_pharmacy_database,
+            mongo_db_collection_name=config.mongodb_product_collection,
+        ),
+        MongoDBOutbox(
+            mongo_db_client=connection_manager.client,
+            mongo_db_db_name=config.mongodb_pharmacy_database,
+            mongo_db_collection_name=config.mongodb_outbox_collection,
+            done_ttl_seconds=config.outbox_done_ttl_seconds,
+        ),
+    )
+
+    exit_code = 0
+
+    try:
+        for repository in repositories:
+            await repository.ensure_indexes()
+
+            for query in await repository.explain_queries():
+                print(f'COLLSCAN in {repository.mongo_db_collection_name}: {query}')  # noqa
+                exit_code = 1
+    finally:
+        await connection_manager.close()
+
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(check_indexes()))
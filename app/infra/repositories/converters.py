@@ -1,5 +1,38 @@
+import sys
+
 from ...domain.entities.pharmacy import PharmacyEntity
 from ...domain.entities.product import ProductEntity
+from ...domain.entities.reservation import ReservationEntity
+from ...logic.exceptions.fields import UnknownFieldsException
+
+INTERN_MAX_LENGTH = 64
+
+PHARMACY_DOCUMENT_FIELDS = ('oid', 'title', 'description', 'products', 'created_at', 'version')
+PRODUCT_DOCUMENT_FIELDS = (
+    'oid', 'title', 'description', 'manufacturer', 'ingredients', 'expiry_date', 'image_url', 'created_at', 'version',
+)
+
+# Проекция для проверки If-None-Match: с сервера приходит только номер ревизии, без позиций аптеки
+VERSION_PROJECTION = {'_id': 0, 'version': 1}
+
+
+def intern_short_string(value: str) -> str:
+    """
+    Короткие повторяющиеся строки (производители) в загруженных сущностях хранятся одним объектом на процесс.
+    """
+    if isinstance(value, str) and len(value) <= INTERN_MAX_LENGTH:
+        return sys.intern(value)
+
+    return value
+
+
+def build_projection(fields: tuple[str, ...], document_fields: tuple[str, ...]) -> dict:
+    unknown_fields = tuple(field for field in fields if field not in document_fields)
+
+    if unknown_fields:
+        raise UnknownFieldsException(fields=unknown_fields)
+
+    return {'_id': 0, **{field: 1 for field in fields}}
 
 
 def convert_product_to_document(product: ProductEntity) -> dict:
@@ -12,6 +45,7 @@ def convert_product_to_document(product: ProductEntity) -> dict:
         'expiry_date': product.expiry_date.as_generic_type(),
         'image_url': product.image_url.as_generic_type(),
         'created_at': product.created_at,
+        'version': product.version,
     }
 
 
@@ -22,6 +56,7 @@ def convert_pharmacy_to_document(pharmacy: PharmacyEntity) -> dict:
         'description': pharmacy.description.as_generic_type(),
         'products': pharmacy.products,
         'created_at': pharmacy.created_at,
+        'version': pharmacy.version,
     }
 
 
@@ -32,16 +67,25 @@ def convert_pharmacy_to_document_without_generic_type(pharmacy: PharmacyEntity)
         'description': pharmacy.description,
         'products': pharmacy.products,
         'created_at': pharmacy.created_at,
+        'version': pharmacy.version,
     }
 
 
+def copy_pharmacy_document(document: dict) -> dict:
+    """
+    Копия документа аптеки со своим списком позиций: документ может быть общим для нескольких читателей.
+    """
+    return {**document, 'products': [dict(product) for product in document.get('products', [])]}
+
+
 def convert_document_to_pharmacy(document: dict) -> PharmacyEntity:
     return PharmacyEntity(
         oid=document['oid'],
         title=document['title'],
         description=document['description'],
-        products=document['products'],
+        products=document.get('products', []),
         created_at=document['created_at'],
+        version=document.get('version', 0),
     )
 
 
@@ -50,9 +94,49 @@ def convert_document_to_product(document: dict) -> ProductEntity:
         oid=document['oid'],
         title=document['title'],
         description=document['description'],
-        manufacturer=document['manufacturer'],
+        manufacturer=intern_short_string(document['manufacturer']),
         image_url=document['image_url'],
         ingredients=document['ingredients'],
         expiry_date=document['expiry_date'],
         created_at=document['created_at'],
+        version=document.get('version', 0),
+    )
+
+
+def convert_inventory_document_to_position(document: dict) -> dict:
+    return {
+        'product_oid': document['product_oid'],
+        'price': document['price'],
+        'count': document['count'],
+        'updated_at': document['updated_at'],
+    }
+
+
+def convert_document_to_partial_pharmacy(document: dict) -> dict:
+    return {field: document[field] for field in PHARMACY_DOCUMENT_FIELDS if field in document}
+
+
+def convert_document_to_partial_product(document: dict) -> dict:
+    return {field: document[field] for field in PRODUCT_DOCUMENT_FIELDS if field in document}
+
+
+def convert_reservation_to_document(reservation: ReservationEntity) -> dict:
+    return {
+        'oid': reservation.oid,
+        'pharmacy_oid': reservation.pharmacy_oid,
+        'product_oid': reservation.product_oid,
+        'quantity': reservation.quantity,
+        'expires_at': reservation.expires_at,
+        'created_at': reservation.created_at,
+    }
+
+
+def convert_document_to_reservation(document: dict) -> ReservationEntity:
+    return ReservationEntity(
+        oid=document['oid'],
+        pharmacy_oid=document['pharmacy_oid'],
+        product_oid=document['product_oid'],
+        quantity=document['quantity'],
+        expires_at=document['expires_at'],
+        created_at=document['created_at'],
     )
@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+
+from motor.core import AgnosticCollection
+from pymongo import ASCENDING, IndexModel
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    name: str
+    keys: tuple[tuple[str, int], ...]
+    unique: bool = False
+    expire_after_seconds: int | None = None
+
+    def as_index_model(self) -> IndexModel:
+        options = {'name': self.name, 'unique': self.unique}
+        if self.expire_after_seconds is not None:
+            options['expireAfterSeconds'] = self.expire_after_seconds
+
+        return IndexModel(list(self.keys), **options)
+
+    def matches(self, index_information: dict) -> bool:
+        return (
+            tuple(index_information['key']) == self.keys
+            and index_information.get('unique', False) == self.unique
+            and index_information.get('expireAfterSeconds') == self.expire_after_seconds
+        )
+
+
+def ascending(*fields: str) -> tuple[tuple[str, int], ...]:
+    return tuple((field_name, ASCENDING) for field_name in fields)
+
+
+async def reconcile_indexes(collection: AgnosticCollection, specs: tuple[IndexSpec, ...]) -> None:
+    """
+    Приводит индексы коллекции к объявленным в репозитории: создает недостающие
+    и пересоздает индексы с тем же именем, но другими ключами, уникальностью или сроком жизни.
+    Индексы, которые репозиторий не объявлял, не трогаются.
+    """
+    existing_indexes = await collection.index_information()
+    missing_specs = []
+
+    for spec in specs:
+        index_information = existing_indexes.get(spec.name)
+
+        if index_information is None:
+            missing_specs.append(spec)
+        elif not spec.matches(index_information):
+            await collection.drop_index(spec.name)
+            missing_specs.append(spec)
+
+    if missing_specs:
+        await collection.create_indexes([spec.as_index_model() for spec in missing_specs])
+
+
+def find_collection_scans(plan: dict) -> list[dict]:
+    stages = []
+
+    if plan.get('stage') == 'COLLSCAN':
+        stages.append(plan)
+
+    for child_key in ('inputStage', 'queryPlan'):
+        if child_key in plan:
+            stages.extend(find_collection_scans(plan[child_key]))
+
+    for child_plan in plan.get('inputStages', []):
+        stages.extend(find_collection_scans(child_plan))
+
+    return stages
+
+
+async def explain_queries(collection: AgnosticCollection, queries: tuple[dict, ...]) -> list[dict]:
+    """
+    Выполняет explain() для каждого запроса репозитория и возвращает запросы, план которых содержит COLLSCAN.
+    """
+    failed_queries = []
+
+    for query in queries:
+        explanation = await collection.find(query).explain()
+        winning_plan = explanation['queryPlanner']['winningPlan']
+
+        if find_collection_scans(winning_plan):
+            failed_queries.append(query)
+
+    return failed_queries
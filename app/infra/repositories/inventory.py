@@ -0,0 +1,538 @@
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, ClassVar, Iterable
+
+from motor.core import AgnosticClient
+from pymongo import ASCENDING, DeleteOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from ...domain.entities.pharmacy import PharmacyEntity
+from ...domain.events.base import BaseEvent
+from ...domain.values.product import Price
+from ...infra.repositories.converters import (
+    PHARMACY_DOCUMENT_FIELDS, build_projection, convert_document_to_pharmacy,
+    convert_inventory_document_to_position)
+from ...logic.exceptions.base import LogicException
+from ...logic.exceptions.pharmacy import (NotEnoughStockException,
+                                          PharmacyNotFoundException,
+                                          ProductAlreadyInPharmacyException)
+from ...logic.exceptions.products import ProductNotFoundException
+from ...settings.config import Config
+from ..outbox.base import BaseOutbox, write_with_events
+from .bulk import (InventoryOperation, PharmacyInventoryChanges,
+                   bulk_write_inventory)
+from .indexes import IndexSpec, ascending, explain_queries, reconcile_indexes
+from .mongo import MongoDBPharmacyRepo, with_expected_version
+
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+
+@dataclass
+class MongoDBInventoryPharmacyRepo(MongoDBPharmacyRepo):
+    """
+    Хранение товаров аптеки отдельной коллекцией: один документ на пару (pharmacy_oid, product_oid).
+    Изменение цены - одна запись в документ позиции, размер аптеки на нее не влияет.
+
+    Аптека отдается без встроенного списка товаров, товары читаются постранично через get_pharmacy_inventory
+    или целиком при частичном чтении с полем products, а методы, меняющие позицию, возвращают аптеку
+    только с этой позицией.
+
+    Позиция - отдельный документ, поэтому версию аптеки каждая запись в позиции поднимает отдельной записью
+    в документ аптеки после себя: ETag меняется, а прочитанная между двумя записями старая версия с новыми
+    позициями при следующей проверке просто не совпадет. С expected_version версия поднимается условно
+    (compare-and-set) до записи в позицию и только один раз, при другой версии позиция не меняется,
+    а если запись в позицию не прошла, версия возвращается назад.
+
+    Миграция со встроенного массива products идет онлайн: migrate_inventory переносит аптеки пачками,
+    а аптека, которой миграция еще не коснулась, переносится при первом обращении к ее товарам.
+    """
+    mongo_db_inventory_collection_name: str = 'inventory_collection'
+
+    pharmacy_projection: ClassVar[dict | None] = {'products': 0}
+
+    inventory_indexes: ClassVar[tuple[IndexSpec, ...]] = (
+        IndexSpec(name='pharmacy_product_unique', keys=ascending('pharmacy_oid', 'product_oid'), unique=True),
+        IndexSpec(name='product_price_pharmacy', keys=ascending('product_oid', 'price', 'pharmacy_oid')),
+    )
+    inventory_queries: ClassVar[tuple[dict, ...]] = (
+        {'pharmacy_oid': '', 'product_oid': ''},
+        {'pharmacy_oid': '', 'product_oid': {'$gt': ''}},
+        {'pharmacy_oid': ''},
+        {'product_oid': '', 'count': {'$gt': 0}},
+    )
+
+    def _get_inventory_collection(self):
+        return self.mongo_db_client[self.mongo_db_db_name][self.mongo_db_inventory_collection_name]
+
+    async def ensure_indexes(self) -> None:
+        await super().ensure_indexes()
+        await reconcile_indexes(self._get_inventory_collection(), self.inventory_indexes)
+
+    async def explain_queries(self) -> list[dict]:
+        return [
+            *await super().explain_queries(),
+            *await explain_queries(self._get_inventory_collection(), self.inventory_queries),
+        ]
+
+    async def _move_embedded_products(self, pharmacy_document: dict) -> int:
+        """
+        Переносит встроенные позиции аптеки в коллекцию товаров и убирает из массива только перенесенные.
+        $setOnInsert не перезаписывает позицию, которую уже успели изменить через коллекцию.
+        """
+        positions = [position for position in pharmacy_document['products'] if 'product_oid' in position]
+
+        if positions:
+            now = datetime.now()
+            try:
+                await self._get_inventory_collection().bulk_write(
+                    [
+                        UpdateOne(
+                            {'pharmacy_oid': pharmacy_document['oid'], 'product_oid': position['product_oid']},
+                            {
+                                '$setOnInsert': {
+                                    'price': position['price'],
+                                    'count': position.get('count', 0),
+                                    'updated_at': now,
+                                },
+                            },
+                            upsert=True,
+                        )
+                        for position in positions
+                    ],
+                    ordered=False,
+                )
+            except BulkWriteError as exc:
+                if any(error['code'] != DUPLICATE_KEY_ERROR_CODE for error in exc.details['writeErrors']):
+                    raise
+
+        await self._get_pharmacy_collection().update_one(
+            {'oid': pharmacy_document['oid']},
+            {'$pull': {'products': {'product_oid': {'$in': [position['product_oid'] for position in positions]}}}},
+        )
+
+        return len(positions)
+
+    async def _load_pharmacy(self, pharmacy_oid: str) -> None:
+        """
+        Проверяет, что аптека существует, и переносит ее встроенные товары, если миграция до нее еще не дошла.
+        """
+        pharmacy_document = await self._get_pharmacy_collection().find_one(
+            {'oid': pharmacy_oid},
+            {'_id': 0, 'oid': 1, 'products': 1},
+        )
+
+        if pharmacy_document is None:
+            raise PharmacyNotFoundException
+
+        if pharmacy_document.get('products'):
+            await self._move_embedded_products(pharmacy_document)
+
+    async def migrate_inventory(self, batch_size: int) -> int:
+        """
+        Переносит встроенные товары всех аптек, возвращает количество перенесенных позиций.
+        Можно запускать на работающем сервисе и повторно.
+        """
+        migrated = 0
+        cursor = self._get_pharmacy_collection().find(
+            {'products.0': {'$exists': True}},
+            {'_id': 0, 'oid': 1, 'products': 1},
+            batch_size=batch_size,
+        )
+
+        async for pharmacy_document in cursor:
+            migrated += await self._move_embedded_products(pharmacy_document)
+
+        return migrated
+
+    async def _bump_pharmacy_version(self, pharmacy_filter: dict) -> dict | None:
+        """
+        Поднимает версию одной аптеки и возвращает ее документ после подъема без products:
+        ответ на запись в позицию собирается из него, отдельное чтение аптеки не нужно.
+        """
+        return await self._get_pharmacy_collection().find_one_and_update(
+            pharmacy_filter,
+            {'$inc': {'version': 1}},
+            projection={'products': 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    @asynccontextmanager
+    async def _claim_pharmacy_version(
+            self,
+            pharmacy_oid: str,
+            expected_version: int | None,
+    ) -> AsyncIterator[dict | None]:
+        """
+        Поднимает версию аптеки до записи в позицию (compare-and-set) и отдает документ аптеки после подъема,
+        без If-Match отдает None: тогда версия поднимается после записи. Если запись в блоке не прошла,
+        версия возвращается назад, пока ее никто не поднял снова, иначе клиенты с верным If-Match
+        получали бы 412 на неизменную аптеку.
+        """
+        if expected_version is None:
+            yield None
+            return
+
+        pharmacy_document = await self._bump_pharmacy_version(
+            with_expected_version({'oid': pharmacy_oid}, expected_version),
+        )
+
+        if pharmacy_document is None:
+            await self._check_pharmacy_after_miss(pharmacy_oid, expected_version)
+
+        try:
+            yield pharmacy_document
+        except BaseException:
+            if pharmacy_document is not None:
+                await self._get_pharmacy_collection().update_one(
+                    {'oid': pharmacy_oid, 'version': expected_version + 1},
+                    {'$inc': {'version': -1}},
+                )
+            raise
+
+    async def _bump_pharmacy_versions(self, pharmacy_oids: list[str], session=None) -> None:
+        await self._get_pharmacy_collection().update_many(
+            {'oid': {'$in': pharmacy_oids}},
+            {'$inc': {'version': 1}},
+            session=session,
+        )
+
+    async def add_product_to_pharmacy(
+            self,
+            pharmacy_oid: str,
+            product_oid: str,
+            price: Price,
+            count: int,
+            events: Iterable[BaseEvent] = (),
+            expected_version: int | None = None,
+    ):
+        await self._load_pharmacy(pharmacy_oid)
+
+        try:
+            async with (
+                self._claim_pharmacy_version(pharmacy_oid, expected_version) as pharmacy_document,
+                write_with_events(self.outbox, events) as session,
+            ):
+                await self._get_inventory_collection().insert_one(
+                    {
+                        'pharmacy_oid': pharmacy_oid,
+                        'product_oid': product_oid,
+                        'price': price.as_generic_type(),
+                        'count': count,
+                        'updated_at': datetime.now(),
+                    },
+                    session=session,
+                )
+
+                if pharmacy_document is None:
+                    await self._bump_pharmacy_versions([pharmacy_oid], session=session)
+        except DuplicateKeyError:
+            raise ProductAlreadyInPharmacyException(product_oid=product_oid)
+
+    async def update_product_price_in_pharmacy(
+            self,
+            pharmacy_oid: str,
+            product_oid: str,
+            price: Price,
+            expected_version: int | None = None,
+    ) -> PharmacyEntity:
+        collection = self._get_inventory_collection()
+
+        async def update_position():
+            return await collection.find_one_and_update(
+                {'pharmacy_oid': pharmacy_oid, 'product_oid': product_oid},
+                {'$set': {'price': price.as_generic_type(), 'updated_at': datetime.now()}},
+                projection={'_id': 0},
+                return_document=ReturnDocument.AFTER,
+            )
+
+        async with self._claim_pharmacy_version(pharmacy_oid, expected_version) as pharmacy_document:
+            position_document = await update_position()
+
+            if position_document is None:
+                await self._load_pharmacy(pharmacy_oid)
+                position_document = await update_position()
+
+            if position_document is None:
+                raise ProductNotFoundException
+
+        if pharmacy_document is None:
+            pharmacy_document = await self._bump_pharmacy_version({'oid': pharmacy_oid})
+
+        if pharmacy_document is None:
+            raise PharmacyNotFoundException
+
+        return convert_document_to_pharmacy(
+            {**pharmacy_document, 'products': [convert_inventory_document_to_position(position_document)]},
+        )
+
+    async def delete_product_in_pharmacy(
+            self,
+            pharmacy_oid: str,
+            product_oid: str,
+            expected_version: int | None = None,
+    ):
+        collection = self._get_inventory_collection()
+        position_filter = {'pharmacy_oid': pharmacy_oid, 'product_oid': product_oid}
+
+        async with self._claim_pharmacy_version(pharmacy_oid, expected_version) as pharmacy_document:
+            result = await collection.delete_one(position_filter)
+
+            if not result.deleted_count:
+                await self._load_pharmacy(pharmacy_oid)
+                result = await collection.delete_one(position_filter)
+
+            if not result.deleted_count:
+                raise ProductNotFoundException
+
+        if pharmacy_document is None:
+            await self._bump_pharmacy_versions([pharmacy_oid])
+
+    async def take_stock(self, pharmacy_oid: str, product_oid: str, quantity: int) -> None:
+        collection = self._get_inventory_collection()
+
+        async def take_position_stock():
+            return await collection.update_one(
+                {'pharmacy_oid': pharmacy_oid, 'product_oid': product_oid, 'count': {'$gte': quantity}},
+                {'$inc': {'count': -quantity}, '$set': {'updated_at': datetime.now()}},
+            )
+
+        result = await take_position_stock()
+
+        if not result.matched_count:
+            await self._load_pharmacy(pharmacy_oid)
+            result = await take_position_stock()
+
+        if not result.matched_count:
+            position_filter = {'pharmacy_oid': pharmacy_oid, 'product_oid': product_oid}
+
+            if not await collection.count_documents(position_filter, limit=1):
+                raise ProductNotFoundException
+
+            raise NotEnoughStockException(product_oid=product_oid, quantity=quantity)
+
+        await self._bump_pharmacy_versions([pharmacy_oid])
+
+    async def return_stock(self, pharmacy_oid: str, product_oid: str, quantity: int) -> None:
+        result = await self._get_inventory_collection().update_one(
+            {'pharmacy_oid': pharmacy_oid, 'product_oid': product_oid},
+            {'$inc': {'count': quantity}, '$set': {'updated_at': datetime.now()}},
+        )
+
+        if result.matched_count:
+            await self._bump_pharmacy_versions([pharmacy_oid])
+
+    async def _find_pharmacy_positions(self, operations: list[InventoryOperation]) -> dict[str, set[str]]:
+        """
+        Встроенные товары аптек, до которых миграция еще не дошла, сначала переносятся в коллекцию.
+        Читаются только позиции с товарами из операций, а не все позиции аптек.
+        """
+        positions = {}
+        pharmacies = self._get_pharmacy_collection().find(
+            {'oid': {'$in': list({operation.pharmacy_oid for operation in operations})}},
+            {'_id': 0, 'oid': 1, 'products': 1},
+        )
+
+        async for pharmacy_document in pharmacies:
+            if pharmacy_document.get('products'):
+                await self._move_embedded_products(pharmacy_document)
+
+            positions[pharmacy_document['oid']] = set()
+
+        if positions:
+            cursor = self._get_inventory_collection().find(
+                {
+                    'pharmacy_oid': {'$in': list(positions)},
+                    'product_oid': {'$in': list({operation.product_oid for operation in operations})},
+                },
+                {'_id': 0, 'pharmacy_oid': 1, 'product_oid': 1},
+            )
+
+            async for position_document in cursor:
+                positions[position_document['pharmacy_oid']].add(position_document['product_oid'])
+
+        return positions
+
+    async def _write_inventory_changes(self, changes: dict[str, PharmacyInventoryChanges]) -> dict[int, LogicException]:
+        """
+        Позиция - отдельный документ: одна запись на изменяемую позицию и одно удаление на удаляемую.
+        Версия поднимается у всех затронутых аптек, даже если часть записей не прошла.
+        """
+        now = datetime.now()
+        writes, write_operations = [], []
+
+        for pharmacy_oid, pharmacy_changes in changes.items():
+            for product_oid in pharmacy_changes.changed_product_oids:
+                fields = {'updated_at': now}
+
+                if product_oid in pharmacy_changes.prices:
+                    fields['price'] = pharmacy_changes.prices[product_oid]
+
+                if product_oid in pharmacy_changes.counts:
+                    fields['count'] = pharmacy_changes.counts[product_oid]
+
+                writes.append(UpdateOne({'pharmacy_oid': pharmacy_oid, 'product_oid': product_oid}, {'$set': fields}))
+                write_operations.append(pharmacy_changes.operation_indexes[product_oid])
+
+            for product_oid in pharmacy_changes.removals:
+                writes.append(DeleteOne({'pharmacy_oid': pharmacy_oid, 'product_oid': product_oid}))
+                write_operations.append(pharmacy_changes.operation_indexes[product_oid])
+
+        errors = await bulk_write_inventory(self._get_inventory_collection(), writes, write_operations)
+
+        if writes:
+            await self._bump_pharmacy_versions(list(changes))
+
+        return errors
+
+    async def delete_pharmacy(
+            self,
+            pharmacy_oid: str,
+    ):
+        await super().delete_pharmacy(pharmacy_oid)
+        await self._get_inventory_collection().delete_many({'pharmacy_oid': pharmacy_oid})
+
+    async def get_partial_pharmacy_by_oid(self, oid: str, fields: tuple[str, ...]) -> dict:
+        """
+        Поле products собирается из коллекции товаров: встроенный массив после переноса пуст.
+        Документ аптеки читается раньше позиций, поэтому версия в ответе не новее позиций.
+        """
+        if 'products' not in fields:
+            return await super().get_partial_pharmacy_by_oid(oid, fields)
+
+        await self._load_pharmacy(oid)
+        pharmacy_document = await super().get_partial_pharmacy_by_oid(oid, fields)
+
+        cursor = self._get_inventory_collection().find({'pharmacy_oid': oid}, {'_id': 0}).sort(
+            'product_oid',
+            ASCENDING,
+        )
+        pharmacy_document['products'] = [
+            convert_inventory_document_to_position(position_document) async for position_document in cursor
+        ]
+
+        return pharmacy_document
+
+    async def get_pharmacy_inventory(
+        self,
+        pharmacy_oid: str,
+        limit: int,
+        after: str | None = None,
+    ) -> AsyncIterator[dict]:
+        await self._load_pharmacy(pharmacy_oid)
+
+        position_filter = {'pharmacy_oid': pharmacy_oid}
+        if after is not None:
+            position_filter['product_oid'] = {'$gt': after}
+
+        cursor = self._get_inventory_collection().find(
+            position_filter,
+            {'_id': 0},
+        ).sort('product_oid', ASCENDING).limit(limit)
+
+        async for position_document in cursor:
+            yield convert_inventory_document_to_position(position_document)
+
+    async def find_offers_for_product(
+        self,
+        product_oid: str,
+        limit: int,
+        after: tuple[float, str] | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Страница читается по индексу (product_oid, price, pharmacy_oid) уже в нужном порядке,
+        названия аптек догружаются одним запросом по $in.
+        """
+        offer_filter = {'product_oid': product_oid, 'count': {'$gt': 0}}
+
+        if after is not None:
+            price, pharmacy_oid = after
+            offer_filter['$or'] = [
+                {'price': {'$gt': price}},
+                {'price': price, 'pharmacy_oid': {'$gt': pharmacy_oid}},
+            ]
+
+        cursor = self._get_inventory_collection().find(
+            offer_filter,
+            {'_id': 0, 'pharmacy_oid': 1, 'price': 1, 'count': 1},
+        ).sort([('price', ASCENDING), ('pharmacy_oid', ASCENDING)]).limit(limit)
+        offers = [offer async for offer in cursor]
+
+        if not offers:
+            return
+
+        titles = {
+            pharmacy_document['oid']: pharmacy_document['title']
+            async for pharmacy_document in self._get_pharmacy_collection().find(
+                {'oid': {'$in': [offer['pharmacy_oid'] for offer in offers]}},
+                {'_id': 0, 'oid': 1, 'title': 1},
+            )
+        }
+
+        for offer in offers:
+            title = titles.get(offer['pharmacy_oid'])
+
+            if title is not None:
+                yield {**offer, 'title': title}
+
+    async def iter_pharmacies(self, batch_size: int) -> AsyncIterator[dict]:
+        """
+        Слияние двух курсоров: аптеки по oid и позиции по (pharmacy_oid, product_oid) читаются
+        по своим уникальным индексам в одном порядке, без запроса позиций на каждую аптеку.
+        Встроенные позиции аптек, до которых миграция еще не дошла, отдаются вместе с перенесенными.
+        """
+        pharmacies = self._get_pharmacy_collection().find(
+            {},
+            build_projection(PHARMACY_DOCUMENT_FIELDS, PHARMACY_DOCUMENT_FIELDS),
+            batch_size=batch_size,
+        ).sort('oid', ASCENDING)
+        positions = self._get_inventory_collection().find(
+            {},
+            {'_id': 0},
+            batch_size=batch_size,
+        ).sort([('pharmacy_oid', ASCENDING), ('product_oid', ASCENDING)])
+
+        position_document = await anext(positions, None)
+
+        async for pharmacy_document in pharmacies:
+            pharmacy_oid = pharmacy_document['oid']
+            products = {position['product_oid']: position for position in pharmacy_document.get('products', [])}
+
+            while position_document is not None and position_document['pharmacy_oid'] <= pharmacy_oid:
+                if position_document['pharmacy_oid'] == pharmacy_oid:
+                    products[position_document['product_oid']] = convert_inventory_document_to_position(
+                        position_document,
+                    )
+
+                position_document = await anext(positions, None)
+
+            yield {**pharmacy_document, 'products': list(products.values())}
+
+
+def create_mongodb_pharmacy_repository(
+    config: Config,
+    client: AgnosticClient,
+    outbox: BaseOutbox | None = None,
+) -> MongoDBPharmacyRepo:
+    if config.pharmacy_inventory_storage == 'collection':
+        return MongoDBInventoryPharmacyRepo(
+            mongo_db_client=client,
+            mongo_db_db_name=config.mongodb_pharmacy_database,
+            mongo_db_collection_name=config.mongodb_pharmacy_collection,
+            search_index_batch_size=config.search_index_batch_size,
+            load_batch_size=config.repository_load_batch_size,
+            bulk_write_chunk_size=config.mongodb_bulk_write_chunk_size,
+            outbox=outbox,
+            mongo_db_inventory_collection_name=config.mongodb_inventory_collection,
+        )
+
+    return MongoDBPharmacyRepo(
+        mongo_db_client=client,
+        mongo_db_db_name=config.mongodb_pharmacy_database,
+        mongo_db_collection_name=config.mongodb_pharmacy_collection,
+        search_index_batch_size=config.search_index_batch_size,
+        load_batch_size=config.repository_load_batch_size,
+        bulk_write_chunk_size=config.mongodb_bulk_write_chunk_size,
+        outbox=outbox,
+        lazy_documents=config.mongodb_lazy_documents,
+    )
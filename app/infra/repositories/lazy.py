@@ -0,0 +1,175 @@
+import struct
+from dataclasses import dataclass
+
+import bson
+from bson.errors import InvalidBSON
+
+from ...domain.entities.pharmacy import PharmacyEntity
+
+INT32 = struct.Struct('<i')
+
+# Размеры значений BSON фиксированной длины по коду типа
+FIXED_VALUE_SIZES = {
+    0x01: 8, 0x06: 0, 0x07: 12, 0x08: 1, 0x09: 8, 0x0A: 0, 0x10: 4, 0x11: 8, 0x12: 8, 0x13: 16, 0x7F: 0, 0xFF: 0,
+}
+STRING_TYPES = frozenset((0x02, 0x0D, 0x0E))
+DOCUMENT_TYPES = frozenset((0x03, 0x04, 0x0F))
+
+PRODUCT_OID_KEY = b'\x02product_oid\x00'
+
+_PRODUCTS_SLOT = PharmacyEntity.__dict__['products']
+
+
+def get_value_size(raw: bytes, type_code: int, offset: int) -> int:
+    if type_code in FIXED_VALUE_SIZES:
+        return FIXED_VALUE_SIZES[type_code]
+
+    if type_code in STRING_TYPES:
+        return 4 + INT32.unpack_from(raw, offset)[0]
+
+    if type_code in DOCUMENT_TYPES:
+        return INT32.unpack_from(raw, offset)[0]
+
+    if type_code == 0x05:
+        return 5 + INT32.unpack_from(raw, offset)[0]
+
+    if type_code == 0x0B:
+        return raw.index(0, raw.index(0, offset) + 1) + 1 - offset
+
+    if type_code == 0x0C:
+        return 16 + INT32.unpack_from(raw, offset)[0]
+
+    raise InvalidBSON(f'unknown BSON type {type_code:#x}')
+
+
+def split_raw_document(raw: bytes, lazy_field: str) -> tuple[dict, memoryview | None]:
+    """
+    Декодирует документ без одного поля верхнего уровня, значение этого поля остается срезом исходных байт.
+    Пропуск поля - только чтение заголовков элементов, само значение не разбирается и не копируется.
+    """
+    lazy_name = lazy_field.encode()
+    offset, end = 4, len(raw) - 1
+
+    while offset < end:
+        name_end = raw.index(0, offset + 1)
+        value_offset = name_end + 1
+        value_end = value_offset + get_value_size(raw, raw[offset], value_offset)
+
+        if raw[offset + 1:name_end] == lazy_name:
+            rest = INT32.pack(len(raw) - (value_end - offset)) + raw[4:offset] + raw[value_end:]
+            return bson.decode(rest), memoryview(raw)[value_offset:value_end]
+
+        offset = value_end
+
+    return bson.decode(raw), None
+
+
+def decode_raw_array(raw: memoryview | None) -> list:
+    """
+    Массив заворачивается в документ с одним полем: так bson.decode сразу собирает список,
+    не создавая строки ключей '0', '1', ... для каждого элемента.
+    """
+    if raw is None:
+        return []
+
+    return bson.decode(b''.join((INT32.pack(len(raw) + 8), b'\x04a\x00', raw, b'\x00')))['a']
+
+
+def count_raw_positions(raw: memoryview) -> int:
+    # Ключ product_oid есть только у позиций, поэтому считать можно по всему документу, которому принадлежит срез
+    return raw.obj.count(PRODUCT_OID_KEY)
+
+
+@dataclass(frozen=True, slots=True)
+class RawPharmacyDocument:
+    """
+    Документ аптеки, прочитанный как RawBSONDocument: поля верхнего уровня декодированы,
+    массив позиций - срез байт ответа. Неизменяемый, поэтому его можно отдавать нескольким читателям без копии.
+    """
+    fields: dict
+    raw_products: memoryview | None
+
+
+def split_pharmacy_document(raw: bytes) -> RawPharmacyDocument:
+    fields, raw_products = split_raw_document(raw, 'products')
+    return RawPharmacyDocument(fields=fields, raw_products=raw_products)
+
+
+class LazyPharmacyEntity(PharmacyEntity):
+    """
+    Аптека, позиции которой декодируются из BSON при первом обращении к products.
+    До этого копия аптеки (кэш репозитория) переиспользует те же байты, ничего не декодируя.
+    """
+    __slots__ = ('raw_products',)
+
+    @property
+    def products(self) -> list[dict]:
+        try:
+            return _PRODUCTS_SLOT.__get__(self)
+        except AttributeError:
+            products = self.products = decode_raw_array(self.raw_products)
+            return products
+
+    @products.setter
+    def products(self, value: list[dict]) -> None:
+        _PRODUCTS_SLOT.__set__(self, value)
+        self.raw_products = None
+
+    @property
+    def is_hydrated(self) -> bool:
+        return self.raw_products is None
+
+    @property
+    def products_count(self) -> int:
+        return len(self.products) if self.is_hydrated else count_raw_positions(self.raw_products)
+
+    def copy(self) -> PharmacyEntity:
+        if self.is_hydrated:
+            return PharmacyEntity(
+                oid=self.oid,
+                title=self.title,
+                description=self.description,
+                products=[dict(product) for product in self.products],
+                created_at=self.created_at,
+                version=self.version,
+            )
+
+        return build_lazy_pharmacy(
+            oid=self.oid,
+            title=self.title,
+            description=self.description,
+            created_at=self.created_at,
+            version=self.version,
+            raw_products=self.raw_products,
+        )
+
+
+def build_lazy_pharmacy(**values) -> LazyPharmacyEntity:
+    # __init__ сущности присвоил бы products, поэтому слоты заполняются напрямую
+    pharmacy = object.__new__(LazyPharmacyEntity)
+    pharmacy._events = None
+
+    for name, value in values.items():
+        setattr(pharmacy, name, value)
+
+    return pharmacy
+
+
+def convert_raw_document_to_pharmacy(document: RawPharmacyDocument) -> PharmacyEntity:
+    if document.raw_products is None:
+        return PharmacyEntity(
+            oid=document.fields['oid'],
+            title=document.fields['title'],
+            description=document.fields['description'],
+            created_at=document.fields['created_at'],
+            version=document.fields.get('version', 0),
+        )
+
+    return build_lazy_pharmacy(
+        oid=document.fields['oid'],
+        title=document.fields['title'],
+        description=document.fields['description'],
+        created_at=document.fields['created_at'],
+        version=document.fields.get('version', 0),
+        raw_products=document.raw_products,
+    )
@@ -0,0 +1,61 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+from weakref import WeakKeyDictionary
+
+KT = TypeVar('KT', bound=Hashable)
+VT = TypeVar('VT')
+
+
+@dataclass(eq=False)
+class BatchLoader(Generic[KT, VT]):
+    """
+    Склеивает одиночные запросы по ключу, сделанные за один проход event loop, в один вызов batch_load.
+    Одинаковые ключи в одной пачке запрашиваются один раз. Пачки свои у каждого event loop,
+    batch_load возвращает словарь найденных значений, для отсутствующих ключей load возвращает None.
+    """
+    batch_load: Callable[[list[KT]], Awaitable[dict[KT, VT]]]
+    max_batch_size: int = 100
+
+    _batches: WeakKeyDictionary = field(default_factory=WeakKeyDictionary, init=False, repr=False)
+    _tasks: set[asyncio.Task] = field(default_factory=set, init=False, repr=False)
+
+    async def load(self, key: KT) -> VT | None:
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(loop)
+
+        if batch is None:
+            batch = self._batches[loop] = {}
+            loop.call_soon(self._dispatch, loop)
+
+        future = batch.get(key)
+
+        if future is None:
+            future = batch[key] = loop.create_future()
+
+            if len(batch) >= self.max_batch_size:
+                self._dispatch(loop)
+
+        # Один future ждут все, кто запросил этот ключ, отмена одного ожидающего не должна отменять остальных
+        return await asyncio.shield(future)
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop) -> None:
+        batch = self._batches.pop(loop, None)
+
+        if batch:
+            task = loop.create_task(self._load_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _load_batch(self, batch: dict[KT, asyncio.Future]) -> None:
+        try:
+            values = await self.batch_load(list(batch))
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(values.get(key))
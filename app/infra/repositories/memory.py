@@ -1,56 +1,524 @@
-from dataclasses import dataclass, field
-from typing import List
+import asyncio
+import heapq
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Iterable
 
 from ...domain.entities.pharmacy import PharmacyEntity
 from ...domain.entities.product import ProductEntity
-from .base import BasePharmacyRepo, BaseProductRepo
+from ...domain.entities.reservation import ReservationEntity
+from ...domain.events.base import BaseEvent
+from ...domain.values.product import ExpiresDate, Price, Text, Title
+from ...infra.repositories.converters import (
+    PHARMACY_DOCUMENT_FIELDS, PRODUCT_DOCUMENT_FIELDS, build_projection,
+    convert_document_to_partial_pharmacy, convert_document_to_partial_product,
+    convert_document_to_pharmacy, convert_document_to_product,
+    convert_pharmacy_to_document, convert_product_to_document,
+    copy_pharmacy_document)
+from ...logic.exceptions.base import LogicException
+from ...logic.exceptions.pharmacy import (
+    NotEnoughStockException, PharmacyByTitleAlreadyExistsException,
+    PharmacyNotFoundException, ProductAlreadyInPharmacyException)
+from ...logic.exceptions.products import (
+    ProductNotFoundException, ProductWithThatTitleAlreadyExistsException)
+from ..search.index import SearchIndex
+from .base import (BasePharmacyRepo, BaseProductRepo, BaseReservationRepo,
+                   check_expected_version)
+from .bulk import InventoryOperation, plan_inventory_operations
+
+
+def bump_version(document: dict) -> None:
+    # То же, что $inc по version в MongoDB: у документа, записанного до появления версий, ее нет
+    document['version'] = document.get('version', 0) + 1
+
+
+def rank_documents(
+    documents: dict[str, dict],
+    ranked: list[tuple[float, str]],
+    document_fields: tuple[str, ...],
+) -> list[dict]:
+    return [
+        {'score': score, **{field_name: documents[oid][field_name] for field_name in document_fields}}
+        for score, oid in ranked
+        if oid in documents
+    ]
 
 
 @dataclass
 class MemoryPharmacyRepo(BasePharmacyRepo):
+    """
+    Хранилище аптек в памяти процесса с теми же гарантиями, что и у MongoDB репозитория:
+    уникальность oid и названия, условные записи и те же исключения.
+    Аптеки хранятся документами, позиции товаров дополнительно проиндексированы по product_oid,
+    поэтому изменение цены и проверка наличия товара не перебирают список позиций,
+    а поиск предложений по товару перебирает только аптеки, где этот товар есть.
+    """
+
+    _saved_pharmacies: dict[str, dict] = field(default_factory=dict, kw_only=True)
+    _oids_by_title: dict[str, str] = field(default_factory=dict, kw_only=True, repr=False)
+    _products_by_pharmacy: dict[str, dict[str, dict]] = field(default_factory=dict, kw_only=True, repr=False)
+    _pharmacies_by_product: dict[str, set[str]] = field(default_factory=dict, kw_only=True, repr=False)
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock, kw_only=True, repr=False)
+    search_index: SearchIndex = field(default_factory=SearchIndex, kw_only=True, repr=False)
+
+    def _get_document(self, oid: str) -> dict:
+        document = self._saved_pharmacies.get(oid)
+
+        if document is None:
+            raise PharmacyNotFoundException
 
-    _saved_pharmacies: List[PharmacyEntity] = field(
-        default_factory=list,
-        kw_only=True,
-    )
+        return document
+
+    def _get_position(self, pharmacy_oid: str, product_oid: str) -> dict:
+        self._get_document(pharmacy_oid)
+        position = self._products_by_pharmacy[pharmacy_oid].get(product_oid)
+
+        if position is None:
+            raise ProductNotFoundException
+
+        return position
+
+    def _to_entity(self, document: dict) -> PharmacyEntity:
+        return convert_document_to_pharmacy(copy_pharmacy_document(document))
 
     async def check_pharmacy_exists_by_title(self, title: str):
-        try:
-            return bool(
-                next(
-                    pharmacy for pharmacy in self._saved_pharmacies if pharmacy.title.as_generic_type() == title
-                ),
-            )
-        except StopIteration:
-            return False
+        return title in self._oids_by_title
 
     async def add_pharmacy(self, pharmacy: PharmacyEntity):
-        self._saved_pharmacies.append(pharmacy)
+        document = copy_pharmacy_document(convert_pharmacy_to_document(pharmacy))
+
+        async with self._lock:
+            if document['title'] in self._oids_by_title or pharmacy.oid in self._saved_pharmacies:
+                raise PharmacyByTitleAlreadyExistsException(title=document['title'])
+
+            self._saved_pharmacies[pharmacy.oid] = document
+            self._oids_by_title[document['title']] = pharmacy.oid
+            self._products_by_pharmacy[pharmacy.oid] = {
+                position['product_oid']: position for position in document['products']
+            }
+
+            for product_oid in self._products_by_pharmacy[pharmacy.oid]:
+                self._pharmacies_by_product.setdefault(product_oid, set()).add(pharmacy.oid)
+
+        self.search_index.add(pharmacy.oid, document['title'])
 
     async def get_pharmacy_by_oid(self, oid: str) -> PharmacyEntity:
-        for pharmacy in self._saved_pharmacies:
-            if pharmacy.oid == oid:
-                return pharmacy
+        return self._to_entity(self._get_document(oid))
+
+    async def get_pharmacies_by_oids(self, oids: list[str]) -> list[PharmacyEntity]:
+        return [
+            self._to_entity(self._saved_pharmacies[oid])
+            for oid in dict.fromkeys(oids)
+            if oid in self._saved_pharmacies
+        ]
+
+    async def get_partial_pharmacy_by_oid(self, oid: str, fields: tuple[str, ...]) -> dict:
+        build_projection(fields, PHARMACY_DOCUMENT_FIELDS)
+        document = copy_pharmacy_document(self._get_document(oid))
+
+        return convert_document_to_partial_pharmacy({field_name: document[field_name] for field_name in fields})
+
+    async def get_pharmacy_version(self, oid: str) -> int:
+        return self._get_document(oid).get('version', 0)
+
+    async def update_pharmacy(self, oid: str, title: Title, description: Text) -> PharmacyEntity:
+        new_title = title.as_generic_type()
+
+        async with self._lock:
+            document = self._get_document(oid)
+
+            if self._oids_by_title.get(new_title, oid) != oid:
+                raise PharmacyByTitleAlreadyExistsException(title=new_title)
+
+            del self._oids_by_title[document['title']]
+            self._oids_by_title[new_title] = oid
+            document['title'] = new_title
+            document['description'] = description.as_generic_type()
+            bump_version(document)
+
+        self.search_index.add(oid, new_title)
+
+        return self._to_entity(document)
+
+    async def add_product_to_pharmacy(
+            self,
+            pharmacy_oid: str,
+            product_oid: str,
+            price: Price,
+            count: int,
+            events: Iterable[BaseEvent] = (),
+            expected_version: int | None = None,
+    ):
+        async with self._lock:
+            document = self._get_document(pharmacy_oid)
+            check_expected_version(pharmacy_oid, document.get('version', 0), expected_version)
+            positions = self._products_by_pharmacy[pharmacy_oid]
+
+            if product_oid in positions:
+                raise ProductAlreadyInPharmacyException(product_oid=product_oid)
+
+            position = {'product_oid': product_oid, 'price': price.as_generic_type(), 'count': count}
+            document['products'].append(position)
+            positions[product_oid] = position
+            self._pharmacies_by_product.setdefault(product_oid, set()).add(pharmacy_oid)
+            bump_version(document)
+
+    async def update_product_price_in_pharmacy(
+            self,
+            pharmacy_oid: str,
+            product_oid: str,
+            price: Price,
+            expected_version: int | None = None,
+    ) -> PharmacyEntity:
+        async with self._lock:
+            check_expected_version(pharmacy_oid, self._get_document(pharmacy_oid).get('version', 0), expected_version)
+            self._get_position(pharmacy_oid, product_oid)['price'] = price.as_generic_type()
+            bump_version(self._saved_pharmacies[pharmacy_oid])
+
+        return self._to_entity(self._saved_pharmacies[pharmacy_oid])
+
+    async def delete_product_in_pharmacy(
+            self,
+            pharmacy_oid: str,
+            product_oid: str,
+            expected_version: int | None = None,
+    ):
+        async with self._lock:
+            check_expected_version(pharmacy_oid, self._get_document(pharmacy_oid).get('version', 0), expected_version)
+            position = self._get_position(pharmacy_oid, product_oid)
+            del self._products_by_pharmacy[pharmacy_oid][product_oid]
+            self._saved_pharmacies[pharmacy_oid]['products'].remove(position)
+            self._pharmacies_by_product[product_oid].discard(pharmacy_oid)
+            bump_version(self._saved_pharmacies[pharmacy_oid])
+
+    async def take_stock(self, pharmacy_oid: str, product_oid: str, quantity: int) -> None:
+        async with self._lock:
+            position = self._get_position(pharmacy_oid, product_oid)
+
+            if position['count'] < quantity:
+                raise NotEnoughStockException(product_oid=product_oid, quantity=quantity)
+
+            position['count'] -= quantity
+            bump_version(self._saved_pharmacies[pharmacy_oid])
+
+    async def return_stock(self, pharmacy_oid: str, product_oid: str, quantity: int) -> None:
+        async with self._lock:
+            position = self._products_by_pharmacy.get(pharmacy_oid, {}).get(product_oid)
+
+            if position is not None:
+                position['count'] += quantity
+                bump_version(self._saved_pharmacies[pharmacy_oid])
+
+    async def apply_inventory_operations(self, operations: list[InventoryOperation]) -> dict[int, LogicException]:
+        async with self._lock:
+            changes, errors = plan_inventory_operations(operations, {
+                pharmacy_oid: set(self._products_by_pharmacy[pharmacy_oid])
+                for pharmacy_oid in {operation.pharmacy_oid for operation in operations}
+                if pharmacy_oid in self._saved_pharmacies
+            })
+
+            for pharmacy_oid, pharmacy_changes in changes.items():
+                document = self._saved_pharmacies[pharmacy_oid]
+                positions = self._products_by_pharmacy[pharmacy_oid]
+
+                # Версия растет на каждую запись в документ, как у MongoDB репозитория
+                if pharmacy_changes.changed_product_oids:
+                    for product_oid, price in pharmacy_changes.prices.items():
+                        positions[product_oid]['price'] = price
+
+                    for product_oid, count in pharmacy_changes.counts.items():
+                        positions[product_oid]['count'] = count
+
+                    bump_version(document)
+
+                if pharmacy_changes.removals:
+                    for product_oid in pharmacy_changes.removals:
+                        del positions[product_oid]
+                        self._pharmacies_by_product[product_oid].discard(pharmacy_oid)
+
+                    removed = set(pharmacy_changes.removals)
+                    document['products'] = [
+                        position for position in document['products'] if position['product_oid'] not in removed
+                    ]
+                    bump_version(document)
+
+        return errors
+
+    async def delete_pharmacy(
+            self,
+            pharmacy_oid: str,
+    ):
+        async with self._lock:
+            document = self._get_document(pharmacy_oid)
+            del self._saved_pharmacies[pharmacy_oid]
+            del self._oids_by_title[document['title']]
+
+            for product_oid in self._products_by_pharmacy.pop(pharmacy_oid):
+                self._pharmacies_by_product[product_oid].discard(pharmacy_oid)
+
+        self.search_index.remove(pharmacy_oid)
+
+    async def find_pharmacy(
+        self,
+        pharmacy_title: str,
+        limit: int,
+        after: tuple[float, str] | None = None,
+    ) -> AsyncIterator[dict]:
+        ranked = self.search_index.search(pharmacy_title, limit=limit, after=after)
+
+        for pharmacy_document in rank_documents(
+            self._saved_pharmacies,
+            ranked,
+            PHARMACY_DOCUMENT_FIELDS,
+        ):
+            yield copy_pharmacy_document(pharmacy_document)
+
+    async def get_pharmacy_inventory(
+        self,
+        pharmacy_oid: str,
+        limit: int,
+        after: str | None = None,
+    ) -> AsyncIterator[dict]:
+        self._get_document(pharmacy_oid)
+        positions = self._products_by_pharmacy[pharmacy_oid]
+        product_oids = sorted(product_oid for product_oid in positions if after is None or product_oid > after)
+
+        for product_oid in product_oids[:limit]:
+            yield dict(positions[product_oid])
+
+    async def find_offers_for_product(
+        self,
+        product_oid: str,
+        limit: int,
+        after: tuple[float, str] | None = None,
+    ) -> AsyncIterator[dict]:
+        offers = []
+
+        for pharmacy_oid in self._pharmacies_by_product.get(product_oid, ()):
+            position = self._products_by_pharmacy[pharmacy_oid][product_oid]
+            offer_key = (position['price'], pharmacy_oid)
+
+            if position['count'] > 0 and (after is None or offer_key > after):
+                offers.append((offer_key, position['count']))
+
+        offers.sort()
+
+        for (price, pharmacy_oid), count in offers[:limit]:
+            yield {
+                'pharmacy_oid': pharmacy_oid,
+                'title': self._saved_pharmacies[pharmacy_oid]['title'],
+                'price': price,
+                'count': count,
+            }
+
+    async def iter_pharmacies(self, batch_size: int) -> AsyncIterator[dict]:
+        for document in list(self._saved_pharmacies.values()):
+            yield convert_document_to_partial_pharmacy(copy_pharmacy_document(document))
 
 
 @dataclass
 class MemoryProductRepo(BaseProductRepo):
-    _saved_products: List[ProductEntity] = field(default_factory=list)
+    """
+    Хранилище товаров в памяти процесса: документы по oid и индекс названий для проверки уникальности.
+    """
+
+    _saved_products: dict[str, dict] = field(default_factory=dict, kw_only=True)
+    _oids_by_title: dict[str, str] = field(default_factory=dict, kw_only=True, repr=False)
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock, kw_only=True, repr=False)
+    search_index: SearchIndex = field(default_factory=SearchIndex, kw_only=True, repr=False)
+
+    def _get_document(self, oid: str) -> dict:
+        document = self._saved_products.get(oid)
+
+        if document is None:
+            raise ProductNotFoundException
+
+        return document
+
+    def _insert(self, document: dict) -> None:
+        self._saved_products[document['oid']] = document
+        self._oids_by_title[document['title']] = document['oid']
+        self.search_index.add(document['oid'], document['title'])
+
+    def _is_duplicate(self, document: dict) -> bool:
+        return document['oid'] in self._saved_products or document['title'] in self._oids_by_title
 
     async def check_product_exists_by_title(self, title: str):
-        try:
-            return bool(
-                next(
-                    product for product in self._saved_products if product.title.as_generic_type() == title
-                ),
-            )
-        except StopIteration:
-            return False
+        return title in self._oids_by_title
 
     async def add_product(self, product: ProductEntity):
-        self._saved_products.append(product)
+        document = convert_product_to_document(product)
+
+        async with self._lock:
+            if self._is_duplicate(document):
+                raise ProductWithThatTitleAlreadyExistsException(title=document['title'])
+
+            self._insert(document)
+
+    async def get_existing_titles(self, titles: list[str]) -> set[str]:
+        return {title for title in titles if title in self._oids_by_title}
+
+    async def add_products_bulk(self, products: list[ProductEntity]) -> dict[int, LogicException]:
+        errors = {}
+
+        async with self._lock:
+            for index, product in enumerate(products):
+                document = convert_product_to_document(product)
+
+                if self._is_duplicate(document):
+                    errors[index] = ProductWithThatTitleAlreadyExistsException(document['title'])
+                    continue
+
+                self._insert(document)
+
+        return errors
 
     async def get_product_by_oid(self, oid: str) -> ProductEntity:
-        for product in self._saved_products:
-            if product.oid == oid:
-                return product
+        return convert_document_to_product(self._get_document(oid))
+
+    async def get_products_by_oids(self, oids: list[str]) -> list[ProductEntity]:
+        return [
+            convert_document_to_product(self._saved_products[oid])
+            for oid in dict.fromkeys(oids)
+            if oid in self._saved_products
+        ]
+
+    async def get_partial_product_by_oid(self, oid: str, fields: tuple[str, ...]) -> dict:
+        build_projection(fields, PRODUCT_DOCUMENT_FIELDS)
+        document = self._get_document(oid)
+
+        return convert_document_to_partial_product({field_name: document[field_name] for field_name in fields})
+
+    async def get_product_version(self, oid: str) -> int:
+        return self._get_document(oid).get('version', 0)
+
+    async def update_product(
+            self,
+            oid: str,
+            title: Title,
+            description: Text,
+            expiry_date: ExpiresDate,
+            image_url: Text,
+            ingredients: Text,
+            manufacturer: Title,
+    ) -> ProductEntity:
+        new_title = title.as_generic_type()
+
+        async with self._lock:
+            document = self._get_document(oid)
+
+            if self._oids_by_title.get(new_title, oid) != oid:
+                raise ProductWithThatTitleAlreadyExistsException(title=new_title)
+
+            del self._oids_by_title[document['title']]
+            self._oids_by_title[new_title] = oid
+            document.update(
+                title=new_title,
+                description=description.as_generic_type(),
+                expiry_date=expiry_date.as_generic_type(),
+                image_url=image_url.as_generic_type(),
+                ingredients=ingredients.as_generic_type(),
+                manufacturer=manufacturer.as_generic_type(),
+            )
+            bump_version(document)
+
+        self.search_index.add(oid, new_title)
+
+        return convert_document_to_product(document)
+
+    async def delete_product(
+            self,
+            product_oid: str,
+    ):
+        async with self._lock:
+            document = self._get_document(product_oid)
+            del self._saved_products[product_oid]
+            del self._oids_by_title[document['title']]
+
+        self.search_index.remove(product_oid)
+
+    async def search_product(
+            self,
+            query: str,
+            limit: int,
+            after: tuple[float, str] | None = None,
+    ) -> AsyncIterator[dict]:
+        ranked = self.search_index.search(query, limit=limit, after=after)
+
+        for product_document in rank_documents(self._saved_products, ranked, PRODUCT_DOCUMENT_FIELDS):
+            yield product_document
+
+    async def iter_products(self, batch_size: int) -> AsyncIterator[dict]:
+        for document in list(self._saved_products.values()):
+            yield convert_document_to_partial_product(document)
+
+
+@dataclass
+class MemoryReservationRepo(BaseReservationRepo):
+    """
+    Резервы в памяти процесса. Моменты, когда резерв можно забрать очисткой (истечение или конец аренды),
+    лежат в куче, очистка снимает их с вершины и не перебирает все резервы. Записи кучи для уже удаленных
+    резервов и для резервов под действующей арендой пропускаются: у арендованного есть своя запись на конец аренды.
+    """
+    return_lease_seconds: float = 30.0
+
+    _reservations: dict[str, ReservationEntity] = field(default_factory=dict, kw_only=True)
+    _leases: dict[str, datetime] = field(default_factory=dict, kw_only=True, repr=False)
+    _expirations: list[tuple[datetime, str]] = field(default_factory=list, kw_only=True, repr=False)
+
+    async def add_reservation(self, reservation: ReservationEntity) -> None:
+        self._reservations[reservation.oid] = reservation
+        heapq.heappush(self._expirations, (reservation.expires_at, reservation.oid))
+
+    async def pop_reservation(self, oid: str, active_at: datetime) -> ReservationEntity | None:
+        reservation = self._reservations.get(oid)
+
+        if reservation is None or reservation.is_expired(active_at):
+            return None
+
+        return self._reservations.pop(oid)
+
+    def _is_leased(self, oid: str, now: datetime) -> bool:
+        return self._leases.get(oid, datetime.min) > now
+
+    def _lease(self, oid: str, now: datetime) -> None:
+        leased_until = now + timedelta(seconds=self.return_lease_seconds)
+        self._leases[oid] = leased_until
+        heapq.heappush(self._expirations, (leased_until, oid))
+
+    async def lease_reservation(self, oid: str, now: datetime) -> ReservationEntity | None:
+        reservation = self._reservations.get(oid)
+
+        if reservation is None or self._is_leased(oid, now):
+            return None
+
+        if not reservation.is_expired(now):
+            reservation = replace(reservation, expires_at=now)
+            self._reservations[oid] = reservation
+
+        self._lease(oid, now)
+        return reservation
+
+    async def lease_expired_reservations(self, now: datetime, limit: int) -> list[ReservationEntity]:
+        expired = []
+
+        while self._expirations and self._expirations[0][0] <= now and len(expired) < limit:
+            _, oid = heapq.heappop(self._expirations)
+            reservation = self._reservations.get(oid)
+
+            if reservation is None or not reservation.is_expired(now) or self._is_leased(oid, now):
+                continue
+
+            self._lease(oid, now)
+            expired.append(reservation)
+
+        return expired
+
+    async def delete_reservation(self, oid: str) -> None:
+        self._reservations.pop(oid, None)
+        self._leases.pop(oid, None)
+
+    async def release_leases(self, oids: list[str]) -> None:
+        for oid in oids:
+            if self._leases.pop(oid, None) is not None:
+                heapq.heappush(self._expirations, (datetime.min, oid))
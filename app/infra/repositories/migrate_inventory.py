@@ -0,0 +1,36 @@
+"""
+Перенос товаров аптек из встроенного массива products в коллекцию товаров:
+python -m app.infra.repositories.migrate_inventory
+
+Переносит аптеки пачками по INVENTORY_MIGRATION_BATCH_SIZE, сервис при этом может работать
+с PHARMACY_INVENTORY_STORAGE=collection. Повторный запуск безопасен.
+"""
+import asyncio
+
+from ...settings.config import Config
+from ..connections.mongo import MongoConnectionManager
+from .inventory import MongoDBInventoryPharmacyRepo
+
+
+async def migrate_inventory() -> None:
+    config = Config()
+    connection_manager = MongoConnectionManager(config=config)
+    await connection_manager.connect()
+
+    repository = MongoDBInventoryPharmacyRepo(
+        mongo_db_client=connection_manager.client,
+        mongo_db_db_name=config.mongodb_pharmacy_database,
+        mongo_db_collection_name=config.mongodb_pharmacy_collection,
+        mongo_db_inventory_collection_name=config.mongodb_inventory_collection,
+    )
+
+    try:
+        await repository.ensure_indexes()
+        migrated = await repository.migrate_inventory(batch_size=config.inventory_migration_batch_size)
+        print(f'Migrated {migrated} inventory positions')  # noqa
+    finally:
+        await connection_manager.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(migrate_inventory())
@@ -1,17 +1,115 @@
-from dataclasses import dataclass
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import AsyncIterator, ClassVar, Iterable
 
-from motor.core import AgnosticClient
+from bson.raw_bson import RawBSONDocument
+from motor.core import AgnosticClient, AgnosticCollection
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 from ...domain.entities.pharmacy import PharmacyEntity
 from ...domain.entities.product import ProductEntity
+from ...domain.entities.reservation import ReservationEntity
+from ...domain.events.base import BaseEvent
 from ...domain.values.product import ExpiresDate, Price, Text, Title
-from ...infra.repositories.converters import (convert_document_to_pharmacy,
-                                              convert_document_to_product,
-                                              convert_pharmacy_to_document,
-                                              convert_product_to_document)
-from ...logic.exceptions.pharmacy import PharmacyNotFoundException
-from ...logic.exceptions.products import ProductNotFoundException
-from .base import BasePharmacyRepo, BaseProductRepo
+from ...infra.repositories.converters import (
+    PHARMACY_DOCUMENT_FIELDS, PRODUCT_DOCUMENT_FIELDS, VERSION_PROJECTION,
+    build_projection, convert_document_to_partial_pharmacy,
+    convert_document_to_partial_product, convert_document_to_pharmacy,
+    convert_document_to_product, convert_document_to_reservation,
+    convert_pharmacy_to_document, convert_product_to_document,
+    convert_reservation_to_document, copy_pharmacy_document)
+from ...logic.exceptions.base import LogicException
+from ...logic.exceptions.pharmacy import (
+    NotEnoughStockException, PharmacyByTitleAlreadyExistsException,
+    PharmacyNotFoundException, ProductAlreadyInPharmacyException)
+from ...logic.exceptions.products import (
+    ProductNotFoundException, ProductNotSavedException,
+    ProductWithThatTitleAlreadyExistsException)
+from ..outbox.base import BaseOutbox, write_with_events
+from ..search.index import SearchIndex
+from .base import (BasePharmacyRepo, BaseProductRepo, BaseReservationRepo,
+                   check_expected_version)
+from .bulk import (InventoryOperation, PharmacyInventoryChanges,
+                   bulk_write_inventory, plan_inventory_operations)
+from .indexes import IndexSpec, ascending, explain_queries, reconcile_indexes
+from .lazy import (RawPharmacyDocument, convert_raw_document_to_pharmacy,
+                   split_pharmacy_document)
+from .loader import BatchLoader
+
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+
+async def fill_search_index(search_index: SearchIndex, collection: AgnosticCollection, batch_size: int) -> None:
+    rebuilt_index = search_index.start_rebuild()
+
+    async for document in collection.find({}, {'_id': 0, 'oid': 1, 'title': 1}, batch_size=batch_size):
+        rebuilt_index.add(document['oid'], document['title'])
+
+    search_index.finish_rebuild()
+
+
+async def iter_ranked_documents(
+    collection: AgnosticCollection,
+    ranked: list[tuple[float, str]],
+    document_fields: tuple[str, ...],
+) -> AsyncIterator[dict]:
+    """
+    Догружает документы страницы поиска одним запросом по $in и отдает их в порядке ранжирования.
+    """
+    if not ranked:
+        return
+
+    cursor = collection.find(
+        {'oid': {'$in': [oid for _, oid in ranked]}},
+        build_projection(document_fields, document_fields),
+    )
+    documents = {document['oid']: document async for document in cursor}
+
+    for score, oid in ranked:
+        document = documents.get(oid)
+
+        if document is not None:
+            yield {'score': score, **document}
+
+
+def map_insert_errors(
+    products: list[ProductEntity],
+    write_errors: list[dict],
+    offset: int = 0,
+) -> dict[int, LogicException]:
+    """
+    Ошибки неупорядоченной вставки по индексу товара. Нарушение уникального индекса названий
+    (код 11000 по ключу title) - товар с таким названием уже есть, любая другая ошибка записи
+    не выдается за дубликат и возвращается с сообщением MongoDB.
+    """
+    errors = {}
+
+    for error in write_errors:
+        product = products[error['index']]
+        title = product.title.as_generic_type()
+
+        if error['code'] == DUPLICATE_KEY_ERROR_CODE and 'title' in error.get('keyPattern', {}):
+            errors[offset + error['index']] = ProductWithThatTitleAlreadyExistsException(title=title)
+        else:
+            errors[offset + error['index']] = ProductNotSavedException(title=title, reason=error.get('errmsg', ''))
+
+    return errors
+
+
+def with_expected_version(query: dict, expected_version: int | None) -> dict:
+    """
+    Условие на версию делает запись compare-and-set: документ другой версии под фильтр не попадает.
+    Документ, записанный до появления версий, поля version не имеет и совпадает с версией 0.
+    """
+    if expected_version is None:
+        return query
+
+    if expected_version == 0:
+        return {**query, "version": {"$in": [0, None]}}
+
+    return {**query, "version": expected_version}
 
 
 @dataclass
@@ -19,145 +117,441 @@ class MongoDBPharmacyRepo(BasePharmacyRepo):
     mongo_db_client: AgnosticClient
     mongo_db_db_name: str
     mongo_db_collection_name: str
+    search_index: SearchIndex = field(default_factory=SearchIndex, repr=False)
+    search_index_batch_size: int = 1000
+    load_batch_size: int = 100
+    bulk_write_chunk_size: int = 1000
+    outbox: BaseOutbox | None = None
+    lazy_documents: bool = False
+    loader: BatchLoader[str, dict | RawPharmacyDocument] = field(init=False, repr=False)
+
+    pharmacy_projection: ClassVar[dict | None] = None
+    indexes: ClassVar[tuple[IndexSpec, ...]] = (
+        IndexSpec(name='oid_unique', keys=ascending('oid'), unique=True),
+        IndexSpec(name='title_unique', keys=ascending('title'), unique=True),
+        IndexSpec(name='products_product_oid_price', keys=ascending('products.product_oid', 'products.price')),
+    )
+    queries: ClassVar[tuple[dict, ...]] = (
+        {'oid': ''},
+        {'oid': {'$in': ['']}},
+        {'title': ''},
+        {'oid': '', 'products.product_oid': ''},
+        {'products.product_oid': ''},
+        {'products': {'$elemMatch': {'product_oid': '', 'count': {'$gt': 0}}}},
+    )
+
+    def __post_init__(self):
+        self.loader = BatchLoader(self._find_pharmacy_documents, max_batch_size=self.load_batch_size)
 
     def _get_pharmacy_collection(self):
         return self.mongo_db_client[self.mongo_db_db_name][self.mongo_db_collection_name]
 
+    def _get_raw_pharmacy_collection(self):
+        collection = self._get_pharmacy_collection()
+        return collection.with_options(codec_options=collection.codec_options.with_options(
+            document_class=RawBSONDocument,
+        ))
+
+    async def ensure_indexes(self) -> None:
+        await reconcile_indexes(self._get_pharmacy_collection(), self.indexes)
+
+    async def explain_queries(self) -> list[dict]:
+        return await explain_queries(self._get_pharmacy_collection(), self.queries)
+
+    async def build_search_index(self) -> None:
+        await fill_search_index(self.search_index, self._get_pharmacy_collection(), self.search_index_batch_size)
+
     async def check_pharmacy_exists_by_title(self, title: str):
         collection = self._get_pharmacy_collection()
         return await collection.find_one(filter={'title': title})
 
     async def add_pharmacy(self, pharmacy: PharmacyEntity):
         collection = self._get_pharmacy_collection()
-        await collection.insert_one(convert_pharmacy_to_document(pharmacy))
 
-    async def get_pharmacy_by_oid(self, oid: str) -> PharmacyEntity:
+        try:
+            async with write_with_events(self.outbox, pharmacy.events) as session:
+                await collection.insert_one(convert_pharmacy_to_document(pharmacy), session=session)
+        except DuplicateKeyError:
+            raise PharmacyByTitleAlreadyExistsException(title=pharmacy.title.as_generic_type())
+
+        self.search_index.add(pharmacy.oid, pharmacy.title.as_generic_type())
+
+    async def _find_pharmacy_documents(self, oids: list[str]) -> dict[str, dict | RawPharmacyDocument]:
+        if self.lazy_documents:
+            return await self._find_raw_pharmacy_documents(oids)
+
         collection = self._get_pharmacy_collection()
+        cursor = collection.find({'oid': {'$in': oids}}, self.pharmacy_projection)
+        return {pharmacy_document['oid']: pharmacy_document async for pharmacy_document in cursor}
+
+    async def _find_raw_pharmacy_documents(self, oids: list[str]) -> dict[str, RawPharmacyDocument]:
+        """
+        Драйвер отдает документы как RawBSONDocument, не разбирая BSON. Массив позиций остается срезом байт
+        до первого обращения к products.
+        """
+        collection = self._get_raw_pharmacy_collection()
+        cursor = collection.find({'oid': {'$in': oids}}, self.pharmacy_projection)
+        pharmacy_documents = [split_pharmacy_document(pharmacy_document.raw) async for pharmacy_document in cursor]
+        return {pharmacy_document.fields['oid']: pharmacy_document for pharmacy_document in pharmacy_documents}
 
-        pharmacy_document = await collection.find_one({"oid": oid})
+    async def get_pharmacy_by_oid(self, oid: str) -> PharmacyEntity:
+        pharmacy_document = await self.loader.load(oid)
 
         if not pharmacy_document:
             raise PharmacyNotFoundException
 
-        pharmacy_entity = convert_document_to_pharmacy(pharmacy_document)
+        if isinstance(pharmacy_document, RawPharmacyDocument):
+            return convert_raw_document_to_pharmacy(pharmacy_document)
+
+        pharmacy_entity = convert_document_to_pharmacy(copy_pharmacy_document(pharmacy_document))
 
         return pharmacy_entity
 
-    async def update_pharmacy(self, oid: str, title: Title, description: Text):
+    async def get_pharmacies_by_oids(self, oids: list[str]) -> list[PharmacyEntity]:
+        oids = list(dict.fromkeys(oids))
+        pharmacy_documents = await self._find_pharmacy_documents(oids)
+        convert = convert_raw_document_to_pharmacy if self.lazy_documents else convert_document_to_pharmacy
+
+        return [convert(pharmacy_documents[oid]) for oid in oids if oid in pharmacy_documents]
+
+    async def get_partial_pharmacy_by_oid(self, oid: str, fields: tuple[str, ...]) -> dict:
         collection = self._get_pharmacy_collection()
 
-        pharmacy_document = await collection.find_one({"oid": oid})
+        pharmacy_document = await collection.find_one(
+            {"oid": oid},
+            projection=build_projection(fields, PHARMACY_DOCUMENT_FIELDS),
+        )
 
-        if not pharmacy_document:
+        if pharmacy_document is None:
             raise PharmacyNotFoundException
 
-        await collection.update_one(
+        return convert_document_to_partial_pharmacy(pharmacy_document)
+
+    async def get_pharmacy_version(self, oid: str) -> int:
+        pharmacy_document = await self._get_pharmacy_collection().find_one({"oid": oid}, VERSION_PROJECTION)
+
+        if pharmacy_document is None:
+            raise PharmacyNotFoundException
+
+        return pharmacy_document.get('version', 0)
+
+    async def _check_pharmacy_after_miss(self, pharmacy_oid: str, expected_version: int | None) -> None:
+        """
+        Вызывается только когда условная запись ничего не изменила, чтобы понять, чего именно не хватило:
+        аптеки нет или ее версия уже не та, что ожидалась.
+        """
+        collection = self._get_pharmacy_collection()
+        pharmacy_document = await collection.find_one({"oid": pharmacy_oid}, VERSION_PROJECTION)
+
+        if pharmacy_document is None:
+            raise PharmacyNotFoundException
+
+        check_expected_version(pharmacy_oid, pharmacy_document.get('version', 0), expected_version)
+
+    async def _raise_pharmacy_or_product_not_found(self, pharmacy_oid: str, expected_version: int | None = None):
+        await self._check_pharmacy_after_miss(pharmacy_oid, expected_version)
+
+        raise ProductNotFoundException
+
+    async def update_pharmacy(self, oid: str, title: Title, description: Text) -> PharmacyEntity:
+        collection = self._get_pharmacy_collection()
+
+        try:
+            pharmacy_document = await collection.find_one_and_update(
                 {"oid": oid},
                 {
                     "$set": {
                         "title": title.as_generic_type(),
                         "description": description.as_generic_type(),
                     },
+                    "$inc": {"version": 1},
                 },
-        )
-
-    async def add_product_to_pharmacy(self, pharmacy_oid: str, product_oid: str, price: Price, count: int):
-        collection = self._get_pharmacy_collection()
-
-        pharmacy_document = await collection.find_one({"oid": pharmacy_oid})
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            raise PharmacyByTitleAlreadyExistsException(title=title.as_generic_type())
 
         if not pharmacy_document:
             raise PharmacyNotFoundException
 
-        products = pharmacy_document.get('products', [])
-        if not isinstance(products, list):
-            raise ValueError("Field 'prices' is not an array in the pharmacy document.")
-
-        if any(p['product_oid'] == product_oid for p in products):
-            raise ProductNotFoundException
+        self.search_index.add(oid, title.as_generic_type())
 
-        await collection.update_one(
-            {"oid": pharmacy_oid},
-            {"$push": {"products": {"product_oid": product_oid, "price": price.as_generic_type(), "count": count}}},
-        )
+        return convert_document_to_pharmacy(pharmacy_document)
 
-    async def update_product_price_in_pharmacy(
+    async def add_product_to_pharmacy(
             self,
             pharmacy_oid: str,
             product_oid: str,
             price: Price,
+            count: int,
+            events: Iterable[BaseEvent] = (),
+            expected_version: int | None = None,
     ):
         collection = self._get_pharmacy_collection()
-        pharmacy_document = await collection.find_one({"oid": pharmacy_oid})
 
-        if not pharmacy_document:
-            raise PharmacyNotFoundException
+        async with write_with_events(self.outbox, events) as session:
+            result = await collection.update_one(
+                with_expected_version(
+                    {"oid": pharmacy_oid, "products.product_oid": {"$ne": product_oid}},
+                    expected_version,
+                ),
+                {
+                    "$push": {
+                        "products": {"product_oid": product_oid, "price": price.as_generic_type(), "count": count},
+                    },
+                    "$inc": {"version": 1},
+                },
+                session=session,
+            )
 
-        product_exists = any(item['product_oid'] == product_oid for item in pharmacy_document['prices'])
-        if not product_exists:
-            raise ProductNotFoundException
+            if not result.matched_count:
+                await self._check_pharmacy_after_miss(pharmacy_oid, expected_version)
+
+                raise ProductAlreadyInPharmacyException(product_oid=product_oid)
 
-        await collection.update_one(
-            {"oid": pharmacy_oid, "prices.product_oid": product_oid},
-            {"$set": {"products.$.price": price.as_generic_type()}},
+    async def update_product_price_in_pharmacy(
+            self,
+            pharmacy_oid: str,
+            product_oid: str,
+            price: Price,
+            expected_version: int | None = None,
+    ) -> PharmacyEntity:
+        collection = self._get_pharmacy_collection()
+
+        pharmacy_document = await collection.find_one_and_update(
+            with_expected_version({"oid": pharmacy_oid, "products.product_oid": product_oid}, expected_version),
+            {"$set": {"products.$.price": price.as_generic_type()}, "$inc": {"version": 1}},
+            return_document=ReturnDocument.AFTER,
         )
 
+        if not pharmacy_document:
+            await self._raise_pharmacy_or_product_not_found(pharmacy_oid, expected_version)
+
+        return convert_document_to_pharmacy(pharmacy_document)
+
     async def delete_product_in_pharmacy(
             self,
             pharmacy_oid: str,
             product_oid: str,
+            expected_version: int | None = None,
     ):
         collection = self._get_pharmacy_collection()
-        pharmacy_document = await collection.find_one({"oid": pharmacy_oid})
 
-        if not pharmacy_document:
-            raise PharmacyNotFoundException
+        result = await collection.update_one(
+            with_expected_version({"oid": pharmacy_oid, "products.product_oid": product_oid}, expected_version),
+            {"$pull": {"products": {"product_oid": product_oid}}, "$inc": {"version": 1}},
+        )
 
-        products_exists = any(item['product_oid'] == product_oid for item in pharmacy_document['products'])
+        if not result.matched_count:
+            await self._raise_pharmacy_or_product_not_found(pharmacy_oid, expected_version)
 
-        if not products_exists:
-            raise ProductNotFoundException
+    async def take_stock(self, pharmacy_oid: str, product_oid: str, quantity: int) -> None:
+        collection = self._get_pharmacy_collection()
 
-        await collection.update_one(
-            {"oid": pharmacy_oid},
-            {"$pull": {"products": {"product_oid": product_oid}}},
+        result = await collection.update_one(
+            {
+                "oid": pharmacy_oid,
+                "products": {"$elemMatch": {"product_oid": product_oid, "count": {"$gte": quantity}}},
+            },
+            {"$inc": {"products.$.count": -quantity, "version": 1}},
         )
 
+        if not result.matched_count:
+            position_filter = {"oid": pharmacy_oid, "products.product_oid": product_oid}
+
+            if not await collection.count_documents(position_filter, limit=1):
+                await self._raise_pharmacy_or_product_not_found(pharmacy_oid)
+
+            raise NotEnoughStockException(product_oid=product_oid, quantity=quantity)
+
+    async def return_stock(self, pharmacy_oid: str, product_oid: str, quantity: int) -> None:
+        await self._get_pharmacy_collection().update_one(
+            {"oid": pharmacy_oid, "products.product_oid": product_oid},
+            {"$inc": {"products.$.count": quantity, "version": 1}},
+        )
+
+    async def _find_pharmacy_positions(self, operations: list[InventoryOperation]) -> dict[str, set[str]]:
+        cursor = self._get_pharmacy_collection().find(
+            {"oid": {"$in": list({operation.pharmacy_oid for operation in operations})}},
+            {"_id": 0, "oid": 1, "products.product_oid": 1},
+        )
+
+        return {
+            pharmacy_document['oid']: {position['product_oid'] for position in pharmacy_document.get('products', [])}
+            async for pharmacy_document in cursor
+        }
+
+    async def _write_inventory_changes(self, changes: dict[str, PharmacyInventoryChanges]) -> dict[int, LogicException]:
+        """
+        Все новые цены и остатки аптеки - одна запись через arrayFilters, все удаления - одна запись через $pull.
+        Возвращает ошибки записи по индексу операции пачки.
+        """
+        writes, write_operations = [], []
+
+        for pharmacy_oid, pharmacy_changes in changes.items():
+            product_oids = pharmacy_changes.changed_product_oids
+
+            if product_oids:
+                fields = {}
+
+                for index, product_oid in enumerate(product_oids):
+                    if product_oid in pharmacy_changes.prices:
+                        fields[f"products.$[p{index}].price"] = pharmacy_changes.prices[product_oid]
+
+                    if product_oid in pharmacy_changes.counts:
+                        fields[f"products.$[p{index}].count"] = pharmacy_changes.counts[product_oid]
+
+                writes.append(UpdateOne(
+                    {"oid": pharmacy_oid},
+                    {"$set": fields, "$inc": {"version": 1}},
+                    array_filters=[
+                        {f"p{index}.product_oid": product_oid} for index, product_oid in enumerate(product_oids)
+                    ],
+                ))
+                write_operations.append(pharmacy_changes.indexes_of(product_oids))
+
+            if pharmacy_changes.removals:
+                writes.append(UpdateOne(
+                    {"oid": pharmacy_oid},
+                    {
+                        "$pull": {"products": {"product_oid": {"$in": pharmacy_changes.removals}}},
+                        "$inc": {"version": 1},
+                    },
+                ))
+                write_operations.append(pharmacy_changes.indexes_of(pharmacy_changes.removals))
+
+        return await bulk_write_inventory(self._get_pharmacy_collection(), writes, write_operations)
+
+    async def apply_inventory_operations(self, operations: list[InventoryOperation]) -> dict[int, LogicException]:
+        """
+        На каждую пачку из bulk_write_chunk_size операций - одно чтение позиций затронутых аптек
+        и один неупорядоченный bulk_write. Ошибка записи возвращается операциям этой записи,
+        остальные записи и следующие пачки выполняются.
+
+        Позиция, удаленная другим запросом между чтением и записью, не попадет под фильтр записи, и операция
+        над ней ничего не изменит: результат тот же, что при выполнении операции до удаления.
+        """
+        errors = {}
+
+        for start in range(0, len(operations), self.bulk_write_chunk_size):
+            chunk = operations[start:start + self.bulk_write_chunk_size]
+            changes, chunk_errors = plan_inventory_operations(chunk, await self._find_pharmacy_positions(chunk))
+            chunk_errors.update(await self._write_inventory_changes(changes))
+            errors.update({start + index: error for index, error in chunk_errors.items()})
+
+        return errors
+
     async def delete_pharmacy(
             self,
             pharmacy_oid: str,
     ):
         collection = self._get_pharmacy_collection()
 
-        pharmacy_exists = collection.find_one({"oid": pharmacy_oid})
+        result = await collection.delete_one(
+            {"oid": pharmacy_oid},
+        )
 
-        if not pharmacy_exists:
+        if not result.deleted_count:
             raise PharmacyNotFoundException
 
-        await collection.delete_one(
-            {"oid": pharmacy_oid},
-        )
+        self.search_index.remove(pharmacy_oid)
 
     async def find_pharmacy(
         self,
         pharmacy_title: str,
-    ):
+        limit: int,
+        after: tuple[float, str] | None = None,
+    ) -> AsyncIterator[dict]:
+        ranked = self.search_index.search(pharmacy_title, limit=limit, after=after)
+
+        async for pharmacy_document in iter_ranked_documents(
+            self._get_pharmacy_collection(),
+            ranked,
+            PHARMACY_DOCUMENT_FIELDS,
+        ):
+            yield pharmacy_document
+
+    async def get_pharmacy_inventory(
+        self,
+        pharmacy_oid: str,
+        limit: int,
+        after: str | None = None,
+    ) -> AsyncIterator[dict]:
         collection = self._get_pharmacy_collection()
 
-        result = collection.aggregate([
-            {
-                "$search": {
-                    "index": "language_search",
-                    "text": {
-                        "query": f'{pharmacy_title}',
-                        "path": "title",
-                        "fuzzy": {},
+        if not await collection.count_documents({'oid': pharmacy_oid}, limit=1):
+            raise PharmacyNotFoundException
+
+        position_filter = {} if after is None else {'product_oid': {'$gt': after}}
+        cursor = collection.aggregate(
+            [
+                {'$match': {'oid': pharmacy_oid}},
+                {'$unwind': '$products'},
+                {'$replaceRoot': {'newRoot': '$products'}},
+                {'$match': position_filter},
+                {'$sort': {'product_oid': 1}},
+                {'$limit': limit},
+            ],
+        )
+
+        async for position in cursor:
+            yield position
+
+    async def find_offers_for_product(
+        self,
+        product_oid: str,
+        limit: int,
+        after: tuple[float, str] | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Индекс (products.product_oid, products.price) отбирает только аптеки с товаром не дешевле цены из токена,
+        но порядок по цене позиции индекс не дает: все отобранные аптеки разворачиваются ($unwind) и сортируются
+        в памяти на каждой странице. Страница стоит O(аптек с товаром после токена), а не O(limit), и первые
+        страницы популярного товара самые дорогие. В PHARMACY_INVENTORY_STORAGE=collection страница читается
+        из индекса уже отсортированной, замер обоих режимов - python -m app.benchmarks.offers.
+        """
+        offer_filter = {'product_oid': product_oid, 'count': {'$gt': 0}}
+        after_filter = {}
+
+        if after is not None:
+            price, pharmacy_oid = after
+            offer_filter['price'] = {'$gte': price}
+            after_filter = {
+                '$or': [{'price': {'$gt': price}}, {'price': price, 'pharmacy_oid': {'$gt': pharmacy_oid}}],
+            }
+
+        cursor = self._get_pharmacy_collection().aggregate(
+            [
+                {'$match': {'products': {'$elemMatch': offer_filter}}},
+                {'$unwind': '$products'},
+                {'$match': {f'products.{key}': value for key, value in offer_filter.items()}},
+                {
+                    '$project': {
+                        '_id': 0,
+                        'pharmacy_oid': '$oid',
+                        'title': 1,
+                        'price': '$products.price',
+                        'count': '$products.count',
                     },
                 },
-            },
-        ])
-        pharmacies = await result.to_list(length=300)
-        return pharmacies
+                {'$match': after_filter},
+                {'$sort': {'price': 1, 'pharmacy_oid': 1}},
+                {'$limit': limit},
+            ],
+        )
+
+        async for offer in cursor:
+            yield offer
+
+    async def iter_pharmacies(self, batch_size: int) -> AsyncIterator[dict]:
+        cursor = self._get_pharmacy_collection().find(
+            {},
+            build_projection(PHARMACY_DOCUMENT_FIELDS, PHARMACY_DOCUMENT_FIELDS),
+            batch_size=batch_size,
+        )
+
+        async for pharmacy_document in cursor:
+            yield pharmacy_document
 
 
 @dataclass
@@ -165,22 +559,91 @@ class MongoDBProductRepo(BaseProductRepo):
     mongo_db_client: AgnosticClient
     mongo_db_db_name: str
     mongo_db_collection_name: str
+    insert_chunk_size: int = 1000
+    search_index: SearchIndex = field(default_factory=SearchIndex, repr=False)
+    search_index_batch_size: int = 1000
+    load_batch_size: int = 100
+    outbox: BaseOutbox | None = None
+    loader: BatchLoader[str, dict] = field(init=False, repr=False)
+
+    indexes: ClassVar[tuple[IndexSpec, ...]] = (
+        IndexSpec(name='oid_unique', keys=ascending('oid'), unique=True),
+        IndexSpec(name='title_unique', keys=ascending('title'), unique=True),
+    )
+    queries: ClassVar[tuple[dict, ...]] = (
+        {'oid': ''},
+        {'oid': {'$in': ['']}},
+        {'title': ''},
+        {'title': {'$in': ['']}},
+    )
+
+    def __post_init__(self):
+        self.loader = BatchLoader(self._find_product_documents, max_batch_size=self.load_batch_size)
 
     def _get_product_collection(self):
         return self.mongo_db_client[self.mongo_db_db_name][self.mongo_db_collection_name]
 
+    async def ensure_indexes(self) -> None:
+        await reconcile_indexes(self._get_product_collection(), self.indexes)
+
+    async def explain_queries(self) -> list[dict]:
+        return await explain_queries(self._get_product_collection(), self.queries)
+
+    async def build_search_index(self) -> None:
+        await fill_search_index(self.search_index, self._get_product_collection(), self.search_index_batch_size)
+
     async def check_product_exists_by_title(self, title: str):
         collection = self._get_product_collection()
         return await collection.find_one(filter={'title': title})
 
     async def add_product(self, product: ProductEntity):
         collection = self._get_product_collection()
-        await collection.insert_one(convert_product_to_document(product))
 
-    async def get_product_by_oid(self, oid: str) -> ProductEntity:
+        try:
+            async with write_with_events(self.outbox, product.events) as session:
+                await collection.insert_one(convert_product_to_document(product), session=session)
+        except DuplicateKeyError:
+            raise ProductWithThatTitleAlreadyExistsException(title=product.title.as_generic_type())
+
+        self.search_index.add(product.oid, product.title.as_generic_type())
+
+    async def get_existing_titles(self, titles: list[str]) -> set[str]:
+        collection = self._get_product_collection()
+        cursor = collection.find({'title': {'$in': titles}}, {'title': 1, '_id': 0})
+        return {document['title'] async for document in cursor}
+
+    async def add_products_bulk(self, products: list[ProductEntity]) -> dict[int, LogicException]:
         collection = self._get_product_collection()
+        errors = {}
 
-        product_document = await collection.find_one({'oid': oid})
+        for start in range(0, len(products), self.insert_chunk_size):
+            chunk = products[start:start + self.insert_chunk_size]
+            try:
+                await collection.insert_many(
+                    [convert_product_to_document(product) for product in chunk],
+                    ordered=False,
+                )
+            except BulkWriteError as exc:
+                errors.update(map_insert_errors(chunk, exc.details['writeErrors'], start))
+
+        saved_products = [product for index, product in enumerate(products) if index not in errors]
+
+        for product in saved_products:
+            self.search_index.add(product.oid, product.title.as_generic_type())
+
+        if self.outbox is not None:
+            # Пачка вставляется без транзакции, события пишутся после нее и только для сохраненных товаров
+            await self.outbox.add(event for product in saved_products for event in product.events)
+
+        return errors
+
+    async def _find_product_documents(self, oids: list[str]) -> dict[str, dict]:
+        collection = self._get_product_collection()
+        cursor = collection.find({'oid': {'$in': oids}})
+        return {product_document['oid']: product_document async for product_document in cursor}
+
+    async def get_product_by_oid(self, oid: str) -> ProductEntity:
+        product_document = await self.loader.load(oid)
 
         if not product_document:
             raise ProductNotFoundException
@@ -189,24 +652,47 @@ class MongoDBProductRepo(BaseProductRepo):
 
         return product_entity
 
-    async def search_product(self, query: str):
+    async def get_products_by_oids(self, oids: list[str]) -> list[ProductEntity]:
+        oids = list(dict.fromkeys(oids))
+        product_documents = await self._find_product_documents(oids)
+
+        return [convert_document_to_product(product_documents[oid]) for oid in oids if oid in product_documents]
+
+    async def get_partial_product_by_oid(self, oid: str, fields: tuple[str, ...]) -> dict:
         collection = self._get_product_collection()
-        result = collection.aggregate([
-            {
-                "$search": {
-                    "index": "product_search",
-                    "text": {
-                        "query": f'{query}',
-                        "path": "title",
-                        "fuzzy": {},
-                    },
-                },
-            },
-        ])
 
-        results = await result.to_list(length=300)
+        product_document = await collection.find_one(
+            {'oid': oid},
+            projection=build_projection(fields, PRODUCT_DOCUMENT_FIELDS),
+        )
+
+        if product_document is None:
+            raise ProductNotFoundException
+
+        return convert_document_to_partial_product(product_document)
+
+    async def get_product_version(self, oid: str) -> int:
+        product_document = await self._get_product_collection().find_one({"oid": oid}, VERSION_PROJECTION)
+
+        if product_document is None:
+            raise ProductNotFoundException
+
+        return product_document.get('version', 0)
 
-        return results
+    async def search_product(
+            self,
+            query: str,
+            limit: int,
+            after: tuple[float, str] | None = None,
+    ) -> AsyncIterator[dict]:
+        ranked = self.search_index.search(query, limit=limit, after=after)
+
+        async for product_document in iter_ranked_documents(
+            self._get_product_collection(),
+            ranked,
+            PRODUCT_DOCUMENT_FIELDS,
+        ):
+            yield product_document
 
     async def update_product(
             self,
@@ -217,26 +703,34 @@ class MongoDBProductRepo(BaseProductRepo):
             image_url: Text,
             ingredients: Text,
             manufacturer: Title,
-    ):
+    ) -> ProductEntity:
         collection = self._get_product_collection()
 
-        product_document = await collection.find_one({"oid": oid})
+        try:
+            product_document = await collection.find_one_and_update(
+                {"oid": oid},
+                {
+                    "$set": {
+                        "title": title.as_generic_type(),
+                        "description": description.as_generic_type(),
+                        "expiry_date": expiry_date.as_generic_type(),
+                        "image_url": image_url.as_generic_type(),
+                        "ingredients": ingredients.as_generic_type(),
+                        "manufacturer": manufacturer.as_generic_type(),
+                    },
+                    "$inc": {"version": 1},
+                },
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            raise ProductWithThatTitleAlreadyExistsException(title=title.as_generic_type())
+
         if not product_document:
             raise ProductNotFoundException
 
-        await collection.update_one(
-            {"oid": oid},
-            {
-                "$set": {
-                    "title": title.as_generic_type(),
-                    "description": description.as_generic_type(),
-                    "expiry_date": expiry_date.as_generic_type(),
-                    "image_url": image_url.as_generic_type(),
-                    "ingredients": ingredients.as_generic_type(),
-                    "manufacturer": manufacturer.as_generic_type(),
-                },
-            },
-        )
+        self.search_index.add(oid, title.as_generic_type())
+
+        return convert_document_to_product(product_document)
 
     async def delete_product(
             self,
@@ -244,11 +738,120 @@ class MongoDBProductRepo(BaseProductRepo):
     ):
         collection = self._get_product_collection()
 
-        product_document = await collection.find_one({"oid": product_oid})
+        result = await collection.delete_one(
+            {"oid": product_oid},
+        )
 
-        if not product_document:
+        if not result.deleted_count:
             raise ProductNotFoundException
 
-        await collection.delete_one(
-            {"oid": product_oid},
+        self.search_index.remove(product_oid)
+
+    async def iter_products(self, batch_size: int) -> AsyncIterator[dict]:
+        cursor = self._get_product_collection().find(
+            {},
+            build_projection(PRODUCT_DOCUMENT_FIELDS, PRODUCT_DOCUMENT_FIELDS),
+            batch_size=batch_size,
+        )
+
+        async for product_document in cursor:
+            yield product_document
+
+
+@dataclass
+class MongoDBReservationRepo(BaseReservationRepo):
+    """
+    Резервы в отдельной коллекции. TTL-индекс по expires_at удаляет резервы только через purge_after_seconds
+    после истечения: до этого их забирает очистка и возвращает единицы в остаток, а индекс лишь не дает
+    коллекции расти, если очистка долго не работала (единицы таких резервов в остаток не вернутся).
+    Аренда возврата - поле returning_until, резерв с прошедшей арендой снова доступен очистке.
+    """
+    mongo_db_client: AgnosticClient
+    mongo_db_db_name: str
+    mongo_db_collection_name: str = 'reservations_collection'
+    purge_after_seconds: int = 86400
+    return_lease_seconds: float = 30.0
+
+    queries: ClassVar[tuple[dict, ...]] = (
+        {'oid': ''},
+        {'oid': '', 'expires_at': {'$gt': datetime.min}},
+        {'expires_at': {'$lte': datetime.min}, 'returning_until': {'$not': {'$gt': datetime.min}}},
+    )
+
+    @property
+    def indexes(self) -> tuple[IndexSpec, ...]:
+        return (
+            IndexSpec(name='oid_unique', keys=ascending('oid'), unique=True),
+            IndexSpec(
+                name='expires_at_ttl',
+                keys=ascending('expires_at'),
+                expire_after_seconds=self.purge_after_seconds,
+            ),
+        )
+
+    def _get_reservation_collection(self):
+        return self.mongo_db_client[self.mongo_db_db_name][self.mongo_db_collection_name]
+
+    async def ensure_indexes(self) -> None:
+        await reconcile_indexes(self._get_reservation_collection(), self.indexes)
+
+    async def explain_queries(self) -> list[dict]:
+        return await explain_queries(self._get_reservation_collection(), self.queries)
+
+    async def add_reservation(self, reservation: ReservationEntity) -> None:
+        await self._get_reservation_collection().insert_one(convert_reservation_to_document(reservation))
+
+    async def pop_reservation(self, oid: str, active_at: datetime) -> ReservationEntity | None:
+        document = await self._get_reservation_collection().find_one_and_delete(
+            {'oid': oid, 'expires_at': {'$gt': active_at}},
+            projection={'_id': 0},
+        )
+
+        return None if document is None else convert_document_to_reservation(document)
+
+    def _lease_update(self, now: datetime) -> dict:
+        return {
+            '$min': {'expires_at': now},
+            '$set': {'returning_until': now + timedelta(seconds=self.return_lease_seconds)},
+        }
+
+    async def lease_reservation(self, oid: str, now: datetime) -> ReservationEntity | None:
+        document = await self._get_reservation_collection().find_one_and_update(
+            {'oid': oid, 'returning_until': {'$not': {'$gt': now}}},
+            self._lease_update(now),
+            projection={'_id': 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+        return None if document is None else convert_document_to_reservation(document)
+
+    async def lease_expired_reservations(self, now: datetime, limit: int) -> list[ReservationEntity]:
+        """
+        Кандидаты читаются одним запросом, каждый берется в аренду отдельным find_one_and_update:
+        резерв, который между чтением и арендой успели подтвердить или взять в аренду, просто пропускается.
+        """
+        collection = self._get_reservation_collection()
+        expired_filter = {'expires_at': {'$lte': now}, 'returning_until': {'$not': {'$gt': now}}}
+        cursor = collection.find(expired_filter, {'_id': 0, 'oid': 1}).sort('expires_at', 1).limit(limit)
+        oids = [document['oid'] async for document in cursor]
+
+        documents = await asyncio.gather(*(
+            collection.find_one_and_update(
+                {'oid': oid, **expired_filter},
+                self._lease_update(now),
+                projection={'_id': 0},
+                return_document=ReturnDocument.AFTER,
+            )
+            for oid in oids
+        ))
+
+        return [convert_document_to_reservation(document) for document in documents if document is not None]
+
+    async def delete_reservation(self, oid: str) -> None:
+        await self._get_reservation_collection().delete_one({'oid': oid})
+
+    async def release_leases(self, oids: list[str]) -> None:
+        await self._get_reservation_collection().update_many(
+            {'oid': {'$in': oids}},
+            {'$unset': {'returning_until': ''}},
         )
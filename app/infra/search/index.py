@@ -0,0 +1,144 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+from .text import tokenize, trigrams
+
+
+@dataclass(eq=False)
+class SearchIndex:
+    """
+    Инвертированный индекс по заголовкам документов с ранжированием BM25.
+    Термины запроса, которых нет в словаре, расширяются до похожих терминов по триграммам.
+    """
+    k1: float = 1.2
+    b: float = 0.75
+    min_similarity: float = 0.3
+    max_expansions: int = 10
+
+    _postings: dict[str, dict[str, int]] = field(default_factory=lambda: defaultdict(dict), init=False, repr=False)
+    _trigrams: dict[str, set[str]] = field(default_factory=lambda: defaultdict(set), init=False, repr=False)
+    _document_terms: dict[str, Counter] = field(default_factory=dict, init=False, repr=False)
+    _document_lengths: dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    _total_length: int = field(default=0, init=False, repr=False)
+    _next: 'SearchIndex | None' = field(default=None, init=False, repr=False)
+
+    def __len__(self) -> int:
+        return len(self._document_terms)
+
+    def add(self, oid: str, text: str) -> None:
+        if self._next is not None:
+            self._next.add(oid, text)
+
+        self._remove(oid)
+
+        terms = Counter(tokenize(text))
+        self._document_terms[oid] = terms
+        self._document_lengths[oid] = sum(terms.values())
+        self._total_length += self._document_lengths[oid]
+
+        for term, frequency in terms.items():
+            if term not in self._postings:
+                for trigram in trigrams(term):
+                    self._trigrams[trigram].add(term)
+
+            self._postings[term][oid] = frequency
+
+    def remove(self, oid: str) -> None:
+        if self._next is not None:
+            self._next.remove(oid)
+
+        self._remove(oid)
+
+    def _remove(self, oid: str) -> None:
+        terms = self._document_terms.pop(oid, None)
+        if terms is None:
+            return
+
+        self._total_length -= self._document_lengths.pop(oid)
+
+        for term in terms:
+            postings = self._postings[term]
+            del postings[oid]
+
+            if not postings:
+                del self._postings[term]
+                for trigram in trigrams(term):
+                    self._trigrams[trigram].discard(term)
+                    if not self._trigrams[trigram]:
+                        del self._trigrams[trigram]
+
+    def start_rebuild(self) -> 'SearchIndex':
+        """
+        Возвращает пустой индекс для перестроения, все изменения до finish_rebuild попадают в оба индекса.
+        """
+        self._next = SearchIndex(
+            k1=self.k1,
+            b=self.b,
+            min_similarity=self.min_similarity,
+            max_expansions=self.max_expansions,
+        )
+        return self._next
+
+    def finish_rebuild(self) -> None:
+        rebuilt, self._next = self._next, None
+
+        self._postings = rebuilt._postings
+        self._trigrams = rebuilt._trigrams
+        self._document_terms = rebuilt._document_terms
+        self._document_lengths = rebuilt._document_lengths
+        self._total_length = rebuilt._total_length
+
+    def _expand(self, term: str) -> list[tuple[str, float]]:
+        if term in self._postings:
+            return [(term, 1.0)]
+
+        term_trigrams = trigrams(term)
+        overlaps = Counter()
+
+        for trigram in term_trigrams:
+            overlaps.update(self._trigrams.get(trigram, ()))
+
+        similar_terms = []
+        for candidate, overlap in overlaps.items():
+            similarity = overlap / (len(term_trigrams) + len(trigrams(candidate)) - overlap)
+            if similarity >= self.min_similarity:
+                similar_terms.append((candidate, similarity))
+
+        return heapq.nlargest(self.max_expansions, similar_terms, key=lambda item: item[1])
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        after: tuple[float, str] | None = None,
+    ) -> list[tuple[float, str]]:
+        """
+        Возвращает до limit пар (score, oid) по убыванию score, при равном score по oid.
+        after - последняя пара предыдущей страницы.
+        """
+        documents_count = len(self._document_terms)
+        if not documents_count:
+            return []
+
+        average_length = self._total_length / documents_count
+        scores = defaultdict(float)
+
+        for query_term in set(tokenize(query)):
+            for term, similarity in self._expand(query_term):
+                postings = self._postings[term]
+                idf = math.log(1 + (documents_count - len(postings) + 0.5) / (len(postings) + 0.5))
+
+                for oid, frequency in postings.items():
+                    length = self._document_lengths[oid]
+                    norm = frequency + self.k1 * (1 - self.b + self.b * length / average_length)
+                    scores[oid] += similarity * idf * frequency * (self.k1 + 1) / norm
+
+        ranked = ((-round(score, 6), oid) for oid, score in scores.items())
+
+        if after is not None:
+            after_key = (-after[0], after[1])
+            ranked = (key for key in ranked if key > after_key)
+
+        return [(-negative_score, oid) for negative_score, oid in heapq.nsmallest(limit, ranked)]
@@ -0,0 +1,20 @@
+import re
+import unicodedata
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def normalize(text: str) -> str:
+    """
+    Приводит текст к виду для поиска: NFKC, нижний регистр, ё -> е.
+    """
+    return unicodedata.normalize('NFKC', text).casefold().replace('ё', 'е')
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(normalize(text))
+
+
+def trigrams(term: str) -> set[str]:
+    padded = f'${term}$'
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Any, Generic, TypeVar
+from typing import Any, ClassVar, Generic, TypeVar
 
 
 @dataclass(frozen=True)
@@ -8,6 +8,16 @@ class BaseCommand(ABC):
     ...
 
 
+@dataclass(frozen=True)
+class BaseReadCommand(BaseCommand):
+    """
+    Команда только читает данные: одновременные одинаковые команды медиатор может выполнить один раз.
+    collapsible = False у команд с ленивой выдачей (AsyncIterator): ее нельзя отдать нескольким читателям,
+    не дочитав целиком, поэтому такие команды всегда выполняются отдельно.
+    """
+    collapsible: ClassVar[bool] = True
+
+
 CT = TypeVar("CT", bound=BaseCommand)
 CR = TypeVar("CR", bound=Any)
 
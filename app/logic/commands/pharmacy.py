@@ -1,13 +1,19 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import AsyncIterator
 
 from app.domain.entities.pharmacy import PharmacyEntity
+from app.domain.exceptions.base import ApplicationException
 from app.domain.values.product import Price, Text, Title
 from app.infra.repositories.base import BasePharmacyRepo, BaseProductRepo
-from app.logic.commands.base import BaseCommand, CommandHandler
+from app.infra.repositories.bulk import InventoryOp, InventoryOperation
+from app.logic.commands.base import (BaseCommand, BaseReadCommand,
+                                     CommandHandler)
+from app.logic.concurrency import ConflictRetry
 from app.logic.exceptions.pharmacy import (
-    PharmacyByTitleAlreadyExistsException, PharmacyNotFoundException,
+    InventoryOperationValueMissingException, PharmacyNotFoundException,
     PharmacyNotFoundWithThisQuery)
 from app.logic.exceptions.products import ProductNotFoundException
+from app.logic.pagination import decode_continuation_token, prepend
 
 
 @dataclass(frozen=True)
@@ -29,9 +35,6 @@ class PharmacyHandler(CommandHandler[CreatePharmacyCommand, PharmacyEntity]):
     pharmacy_repository: BasePharmacyRepo
 
     async def handle(self, command: CreatePharmacyCommand) -> PharmacyEntity:
-        if await self.pharmacy_repository.check_pharmacy_exists_by_title(title=command.title.as_generic_type()):
-            raise PharmacyByTitleAlreadyExistsException(title=command.title.as_generic_type())
-
         new_pharmacy = PharmacyEntity.create_pharmacy(
             title=command.title,
             description=command.description,
@@ -43,19 +46,49 @@ class PharmacyHandler(CommandHandler[CreatePharmacyCommand, PharmacyEntity]):
 
 
 @dataclass(frozen=True)
-class GetPharmacyByOidCommand(BaseCommand):
+class GetPharmacyByOidCommand(BaseReadCommand):
     pharmacy_oid: str
+    fields: tuple[str, ...] = ()
 
 
 @dataclass(frozen=True)
-class GetPharmacyByOidHandler(CommandHandler[GetPharmacyByOidCommand, PharmacyEntity]):
+class GetPharmacyByOidHandler(CommandHandler[GetPharmacyByOidCommand, PharmacyEntity | dict]):
     pharmacy_repository: BasePharmacyRepo
 
-    async def handle(self, command: GetPharmacyByOidCommand) -> PharmacyEntity:
+    async def handle(self, command: GetPharmacyByOidCommand) -> PharmacyEntity | dict:
+        if command.fields:
+            return await self.pharmacy_repository.get_partial_pharmacy_by_oid(command.pharmacy_oid, command.fields)
+
         pharmacy = await self.pharmacy_repository.get_pharmacy_by_oid(command.pharmacy_oid)
         return pharmacy
 
 
+@dataclass(frozen=True)
+class GetPharmacyVersionCommand(BaseReadCommand):
+    pharmacy_oid: str
+
+
+@dataclass(frozen=True)
+class GetPharmacyVersionHandler(CommandHandler[GetPharmacyVersionCommand, int]):
+    pharmacy_repository: BasePharmacyRepo
+
+    async def handle(self, command: GetPharmacyVersionCommand) -> int:
+        return await self.pharmacy_repository.get_pharmacy_version(command.pharmacy_oid)
+
+
+@dataclass(frozen=True)
+class GetPharmaciesByOidsCommand(BaseReadCommand):
+    pharmacy_oids: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class GetPharmaciesByOidsHandler(CommandHandler[GetPharmaciesByOidsCommand, list[PharmacyEntity]]):
+    pharmacy_repository: BasePharmacyRepo
+
+    async def handle(self, command: GetPharmaciesByOidsCommand) -> list[PharmacyEntity]:
+        return await self.pharmacy_repository.get_pharmacies_by_oids(list(command.pharmacy_oids))
+
+
 @dataclass(frozen=True)
 class UpdatePharmacyCommand(BaseCommand):
     pharmacy_oid: str
@@ -68,12 +101,11 @@ class UpdatePharmacyHandler(CommandHandler[UpdatePharmacyCommand, PharmacyEntity
     pharmacy_repository: BasePharmacyRepo
 
     async def handle(self, command: UpdatePharmacyCommand) -> PharmacyEntity:
-        await self.pharmacy_repository.update_pharmacy(
+        pharmacy_entity = await self.pharmacy_repository.update_pharmacy(
             oid=command.pharmacy_oid,
             title=command.title,
             description=command.description,
         )
-        pharmacy_entity = await self.pharmacy_repository.get_pharmacy_by_oid(command.pharmacy_oid)
         return pharmacy_entity
 
 
@@ -82,6 +114,7 @@ class ChangeProductPriceCommand(BaseCommand):
     pharmacy_oid: str
     product_oid: str
     price: float
+    expected_version: int | None = None
 
 
 @dataclass(frozen=True)
@@ -89,46 +122,57 @@ class ChangeProductPriceHandler(CommandHandler[ChangeProductPriceCommand, Pharma
     pharmacy_repository: BasePharmacyRepo
 
     async def handle(self, command: ChangeProductPriceCommand) -> PharmacyEntity:
-        await self.pharmacy_repository.update_product_price_in_pharmacy(
+        """
+        Цена позиции меняется одной атомарной записью, затереть чужую запись она не может, поэтому версия
+        проверяется только если ее передал клиент (If-Match): значит, цену он выбрал по этой версии аптеки.
+        Такой конфликт не повторяется, решение нужно принять заново по свежему состоянию.
+        """
+        return await self.pharmacy_repository.update_product_price_in_pharmacy(
             pharmacy_oid=command.pharmacy_oid,
             product_oid=command.product_oid,
             price=Price(command.price),
+            expected_version=command.expected_version,
         )
-        pharmacy_entity = await self.pharmacy_repository.get_pharmacy_by_oid(command.pharmacy_oid)
-
-        return pharmacy_entity
 
 
 @dataclass(frozen=True)
 class AddProductWithPriceHandler(CommandHandler[AddProductWithPriceCommand, PharmacyEntity]):
     pharmacy_repository: BasePharmacyRepo
     product_repository: BaseProductRepo
+    conflict_retry: ConflictRetry
 
     async def handle(self, command: AddProductWithPriceCommand) -> PharmacyEntity:
-        pharmacy = await self.pharmacy_repository.get_pharmacy_by_oid(command.pharmacy_oid)
-        if not pharmacy:
-            raise PharmacyNotFoundException
+        async def add_product() -> PharmacyEntity:
+            # Аптека перечитывается на каждой попытке: ответ и событие строятся по той версии, которая записана
+            pharmacy = await self.pharmacy_repository.get_pharmacy_by_oid(command.pharmacy_oid)
+            if not pharmacy:
+                raise PharmacyNotFoundException
 
-        product = await self.product_repository.get_product_by_oid(command.product_oid)
-        if not product:
-            raise ProductNotFoundException
+            product = await self.product_repository.get_product_by_oid(command.product_oid)
+            if not product:
+                raise ProductNotFoundException
 
-        pharmacy.add_product_with_price(product=product, price=command.price)
+            pharmacy.add_product_with_price(product=product, price=command.price, count=command.count)
 
-        await self.pharmacy_repository.add_product_to_pharmacy(
-            pharmacy_oid=pharmacy.oid,
-            product_oid=product.oid,
-            price=Price(command.price),
-            count=command.count,
-        )
+            await self.pharmacy_repository.add_product_to_pharmacy(
+                pharmacy_oid=pharmacy.oid,
+                product_oid=product.oid,
+                price=Price(command.price),
+                count=command.count,
+                events=pharmacy.events,
+                expected_version=pharmacy.version,
+            )
 
-        return pharmacy
+            return pharmacy
+
+        return await self.conflict_retry.run(add_product)
 
 
 @dataclass(frozen=True)
 class DeleteProductFromPharmacyCommand(BaseCommand):
     pharmacy_oid: str
     product_oid: str
+    expected_version: int | None = None
 
 
 @dataclass(frozen=True)
@@ -136,12 +180,84 @@ class DeleteProductFromPharmacyHandler(CommandHandler[DeleteProductFromPharmacyC
     pharmacy_repository: BasePharmacyRepo
 
     async def handle(self, command: DeleteProductFromPharmacyCommand) -> None:
+        """
+        Как и смена цены: версия проверяется, только если ее передал клиент.
+        """
         await self.pharmacy_repository.delete_product_in_pharmacy(
             pharmacy_oid=command.pharmacy_oid,
             product_oid=command.product_oid,
+            expected_version=command.expected_version,
         )
 
 
+@dataclass(frozen=True)
+class InventoryOperationRow:
+    pharmacy_oid: str
+    product_oid: str
+    op: InventoryOp
+    price: float | None = None
+    count: int | None = None
+
+
+@dataclass(frozen=True)
+class ChangeInventoryBulkCommand(BaseCommand):
+    operations: tuple[InventoryOperationRow, ...]
+
+
+@dataclass
+class ChangeInventoryBulkResult:
+    applied: int = 0
+    errors: dict[int, str] = field(default_factory=dict)
+
+
+def build_inventory_operation(row: InventoryOperationRow) -> InventoryOperation:
+    if row.op == 'set_price':
+        if row.price is None:
+            raise InventoryOperationValueMissingException(op=row.op, field_name='price')
+
+        return InventoryOperation(row.pharmacy_oid, row.product_oid, row.op, price=Price(row.price))
+
+    if row.op == 'set_count':
+        if row.count is None:
+            raise InventoryOperationValueMissingException(op=row.op, field_name='count')
+
+        return InventoryOperation(row.pharmacy_oid, row.product_oid, row.op, count=row.count)
+
+    return InventoryOperation(row.pharmacy_oid, row.product_oid, row.op)
+
+
+@dataclass(frozen=True)
+class ChangeInventoryBulkHandler(CommandHandler[ChangeInventoryBulkCommand, ChangeInventoryBulkResult]):
+    pharmacy_repository: BasePharmacyRepo
+
+    async def handle(self, command: ChangeInventoryBulkCommand) -> ChangeInventoryBulkResult:
+        """
+        Без expected_version и повторов: каждая операция меняет только свое поле позиции и не затирает
+        чужие записи в ту же аптеку, а версия аптеки все равно растет, и ETag ответов меняется.
+        """
+        result = ChangeInventoryBulkResult()
+        indexes = []
+        operations = []
+
+        for index, row in enumerate(command.operations):
+            try:
+                operations.append(build_inventory_operation(row))
+            except ApplicationException as exception:
+                result.errors[index] = exception.message
+                continue
+
+            indexes.append(index)
+
+        errors = await self.pharmacy_repository.apply_inventory_operations(operations)
+
+        for failed_index, error in errors.items():
+            result.errors[indexes[failed_index]] = error.message
+
+        result.applied = len(operations) - len(errors)
+
+        return result
+
+
 @dataclass(frozen=True)
 class DeletePharmacyCommand(BaseCommand):
     pharmacy_oid: str
@@ -158,21 +274,77 @@ class DeletePharmacyHandler(CommandHandler[DeletePharmacyCommand, None]):
 
 
 @dataclass(frozen=True)
-class FindPharmacyCommand(BaseCommand):
+class FindPharmacyCommand(BaseReadCommand):
+    collapsible = False
     pharmacy_title: str
+    page_size: int
+    continuation_token: str | None = None
+
+
+@dataclass(frozen=True)
+class FindPharmacyHandler(CommandHandler[FindPharmacyCommand, AsyncIterator[dict]]):
+    pharmacy_repository: BasePharmacyRepo
+
+    async def handle(self, command: FindPharmacyCommand) -> AsyncIterator[dict]:
+        after = None
+        if command.continuation_token:
+            after = decode_continuation_token(command.continuation_token)
+
+        pharmacies = self.pharmacy_repository.find_pharmacy(
+            pharmacy_title=command.pharmacy_title,
+            limit=command.page_size,
+            after=after,
+        )
+
+        first_pharmacy = await anext(pharmacies, None)
+        if first_pharmacy is None:
+            if after is None:
+                raise PharmacyNotFoundWithThisQuery
+
+            return pharmacies
+
+        return prepend(first_pharmacy, pharmacies)
 
 
 @dataclass(frozen=True)
-class FindPharmacyHandler(CommandHandler[FindPharmacyCommand, list]):
+class GetPharmacyInventoryCommand(BaseReadCommand):
+    collapsible = False
+    pharmacy_oid: str
+    page_size: int
+    continuation_token: str | None = None
+
+
+@dataclass(frozen=True)
+class GetPharmacyInventoryHandler(CommandHandler[GetPharmacyInventoryCommand, AsyncIterator[dict]]):
     pharmacy_repository: BasePharmacyRepo
 
-    async def handle(self, command: FindPharmacyCommand) -> list:
-        pharmacies = await self.pharmacy_repository.find_pharmacy(command.pharmacy_title)
+    async def handle(self, command: GetPharmacyInventoryCommand) -> AsyncIterator[dict]:
+        after = None
+        if command.continuation_token:
+            _, after = decode_continuation_token(command.continuation_token)
 
-        if pharmacies == []:
-            raise PharmacyNotFoundWithThisQuery
+        positions = self.pharmacy_repository.get_pharmacy_inventory(
+            pharmacy_oid=command.pharmacy_oid,
+            limit=command.page_size,
+            after=after,
+        )
+
+        first_position = await anext(positions, None)
+        if first_position is None:
+            return positions
+
+        return prepend(first_position, positions)
 
-        for pharmacy in pharmacies:
-            del pharmacy['_id']
 
-        return pharmacies
+@dataclass(frozen=True)
+class ExportPharmaciesCommand(BaseReadCommand):
+    collapsible = False
+    batch_size: int
+
+
+@dataclass(frozen=True)
+class ExportPharmaciesHandler(CommandHandler[ExportPharmaciesCommand, AsyncIterator[dict]]):
+    pharmacy_repository: BasePharmacyRepo
+
+    async def handle(self, command: ExportPharmaciesCommand) -> AsyncIterator[dict]:
+        return self.pharmacy_repository.iter_pharmacies(batch_size=command.batch_size)
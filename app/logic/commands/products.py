@@ -1,12 +1,16 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import AsyncIterator
 
 from ...domain.entities.product import ProductEntity
+from ...domain.values.batch import (merge_row_errors, validate_expiry_dates,
+                                    validate_texts, validate_titles)
 from ...domain.values.product import ExpiresDate, Text, Title
-from ...infra.repositories.base import BaseProductRepo
-from ...logic.commands.base import BaseCommand, CommandHandler
+from ...infra.repositories.base import BasePharmacyRepo, BaseProductRepo
+from ...logic.commands.base import BaseCommand, BaseReadCommand, CommandHandler
 from ..exceptions.products import (ProductNotFoundWithThisQuery,
                                    ProductWithThatTitleAlreadyExistsException)
+from ..pagination import decode_continuation_token, prepend
 
 
 @dataclass(frozen=True)
@@ -24,10 +28,6 @@ class CreateProductCommandHandler(CommandHandler[CreateProductCommand, ProductEn
     product_repository: BaseProductRepo
 
     async def handle(self, command: CreateProductCommand) -> ProductEntity:
-
-        if await self.product_repository.check_product_exists_by_title(title=command.title):
-            raise ProductWithThatTitleAlreadyExistsException(command.title)
-
         title = Title(command.title)
         description = Text(command.description)
         expiry_date = ExpiresDate(command.expiry_date)
@@ -49,19 +49,105 @@ class CreateProductCommandHandler(CommandHandler[CreateProductCommand, ProductEn
 
 
 @dataclass(frozen=True)
-class GetProductByOidCommand(BaseCommand):
+class ImportProductsCommand(BaseCommand):
+    rows: tuple[CreateProductCommand, ...]
+
+
+@dataclass
+class ImportProductsResult:
+    imported: int = 0
+    errors: dict[int, str] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class ImportProductsHandler(CommandHandler[ImportProductsCommand, ImportProductsResult]):
+    product_repository: BaseProductRepo
+
+    async def handle(self, command: ImportProductsCommand) -> ImportProductsResult:
+        result = ImportProductsResult()
+        existing_titles = await self.product_repository.get_existing_titles(
+            titles=list({row.title for row in command.rows}),
+        )
+
+        rows = command.rows
+        row_errors = merge_row_errors((
+            validate_titles([row.title for row in rows]),
+            validate_texts([row.description for row in rows]),
+            validate_expiry_dates([row.expiry_date for row in rows], now=datetime.now()),
+            validate_texts([row.image_url for row in rows]),
+            validate_texts([row.ingredients for row in rows]),
+            validate_titles([row.manufacturer for row in rows]),
+        ))
+
+        indexes = []
+        new_products = []
+
+        for index, (row, error) in enumerate(zip(rows, row_errors)):
+            if row.title in existing_titles:
+                result.errors[index] = ProductWithThatTitleAlreadyExistsException(row.title).message
+                continue
+
+            if error is not None:
+                result.errors[index] = error.message
+                continue
+
+            new_product = ProductEntity.create_product(
+                title=Title.from_validated(row.title),
+                description=Text.from_validated(row.description),
+                expiry_date=ExpiresDate.from_validated(row.expiry_date),
+                image_url=Text.from_validated(row.image_url),
+                ingredients=Text.from_validated(row.ingredients),
+                manufacturer=Title.from_validated(row.manufacturer),
+            )
+
+            existing_titles.add(row.title)
+            indexes.append(index)
+            new_products.append(new_product)
+
+        errors = await self.product_repository.add_products_bulk(new_products)
+
+        for failed_index, error in errors.items():
+            result.errors[indexes[failed_index]] = error.message
+
+        result.imported = len(new_products) - len(errors)
+
+        return result
+
+
+@dataclass(frozen=True)
+class GetProductByOidCommand(BaseReadCommand):
     product_oid: str
+    fields: tuple[str, ...] = ()
 
 
 @dataclass(frozen=True)
-class GetProductByOidHandler(CommandHandler[GetProductByOidCommand, ProductEntity]):
+class GetProductByOidHandler(CommandHandler[GetProductByOidCommand, ProductEntity | dict]):
     product_repository: BaseProductRepo
 
-    async def handle(self, command: GetProductByOidCommand) -> ProductEntity:
+    async def handle(self, command: GetProductByOidCommand) -> ProductEntity | dict:
+        if command.fields:
+            return await self.product_repository.get_partial_product_by_oid(
+                oid=command.product_oid,
+                fields=command.fields,
+            )
+
         product = await self.product_repository.get_product_by_oid(oid=command.product_oid)
         return product
 
 
+@dataclass(frozen=True)
+class GetProductVersionCommand(BaseReadCommand):
+    product_oid: str
+
+
+@dataclass(frozen=True)
+class GetProductVersionHandler(CommandHandler[GetProductVersionCommand, int]):
+    product_repository: BaseProductRepo
+
+    async def handle(self, command: GetProductVersionCommand) -> int:
+        return await self.product_repository.get_product_version(oid=command.product_oid)
+
+
 @dataclass(frozen=True)
 class UpdateProductCommand(BaseCommand):
     oid: str
@@ -78,7 +164,7 @@ class UpdateProductHandler(CommandHandler[UpdateProductCommand, ProductEntity]):
     product_repository: BaseProductRepo
 
     async def handle(self, command: UpdateProductCommand) -> ProductEntity:
-        await self.product_repository.update_product(
+        product_entity = await self.product_repository.update_product(
             oid=command.oid,
             title=command.title,
             description=command.description,
@@ -87,7 +173,6 @@ class UpdateProductHandler(CommandHandler[UpdateProductCommand, ProductEntity]):
             expiry_date=command.expiry_date,
             ingredients=command.ingredients,
         )
-        product_entity = await self.product_repository.get_product_by_oid(command.oid)
         return product_entity
 
 
@@ -107,20 +192,84 @@ class DeleteProductHandler(CommandHandler[DeleteProductCommand, None]):
 
 
 @dataclass(frozen=True)
-class FindProductCommand(BaseCommand):
+class FindProductCommand(BaseReadCommand):
+    collapsible = False
     product_title: str
+    page_size: int
+    continuation_token: str | None = None
+
+
+@dataclass(frozen=True)
+class FindProductHandler(CommandHandler[FindProductCommand, AsyncIterator[dict]]):
+    product_repository: BaseProductRepo
+
+    async def handle(self, command: FindProductCommand) -> AsyncIterator[dict]:
+        after = None
+        if command.continuation_token:
+            after = decode_continuation_token(command.continuation_token)
+
+        products = self.product_repository.search_product(
+            query=command.product_title,
+            limit=command.page_size,
+            after=after,
+        )
+
+        first_product = await anext(products, None)
+        if first_product is None:
+            if after is None:
+                raise ProductNotFoundWithThisQuery
+
+            return products
+
+        return prepend(first_product, products)
+
+
+@dataclass(frozen=True)
+class GetProductsByOidsCommand(BaseReadCommand):
+    product_oids: tuple[str, ...]
 
 
 @dataclass(frozen=True)
-class FindProductHandler(CommandHandler[FindProductCommand, list]):
+class GetProductsByOidsHandler(CommandHandler[GetProductsByOidsCommand, list[ProductEntity]]):
     product_repository: BaseProductRepo
 
-    async def handle(self, command: FindProductCommand) -> list:
-        products = await self.product_repository.search_product(command.product_title)
-        if products == []:
-            raise ProductNotFoundWithThisQuery
+    async def handle(self, command: GetProductsByOidsCommand) -> list[ProductEntity]:
+        return await self.product_repository.get_products_by_oids(list(command.product_oids))
 
-        for product in products:
-            del product['_id']
 
-        return products
+@dataclass(frozen=True)
+class FindOffersForProductCommand(BaseReadCommand):
+    collapsible = False
+    product_oid: str
+    page_size: int
+    continuation_token: str | None = None
+
+
+@dataclass(frozen=True)
+class FindOffersForProductHandler(CommandHandler[FindOffersForProductCommand, AsyncIterator[dict]]):
+    pharmacy_repository: BasePharmacyRepo
+
+    async def handle(self, command: FindOffersForProductCommand) -> AsyncIterator[dict]:
+        after = None
+        if command.continuation_token:
+            after = decode_continuation_token(command.continuation_token)
+
+        return self.pharmacy_repository.find_offers_for_product(
+            product_oid=command.product_oid,
+            limit=command.page_size,
+            after=after,
+        )
+
+
+@dataclass(frozen=True)
+class ExportProductsCommand(BaseReadCommand):
+    collapsible = False
+    batch_size: int
+
+
+@dataclass(frozen=True)
+class ExportProductsHandler(CommandHandler[ExportProductsCommand, AsyncIterator[dict]]):
+    product_repository: BaseProductRepo
+
+    async def handle(self, command: ExportProductsCommand) -> AsyncIterator[dict]:
+        return self.product_repository.iter_products(batch_size=command.batch_size)
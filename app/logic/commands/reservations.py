@@ -0,0 +1,110 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+from app.domain.entities.reservation import ReservationEntity
+from app.infra.repositories.base import BasePharmacyRepo, BaseReservationRepo
+from app.logic.commands.base import BaseCommand, CommandHandler
+from app.logic.exceptions.pharmacy import ReservationNotFoundException
+
+
+@dataclass(frozen=True)
+class ReserveStockCommand(BaseCommand):
+    pharmacy_oid: str
+    product_oid: str
+    quantity: int
+    ttl_seconds: float
+
+
+@dataclass(frozen=True)
+class ReserveStockHandler(CommandHandler[ReserveStockCommand, ReservationEntity]):
+    pharmacy_repository: BasePharmacyRepo
+    reservation_repository: BaseReservationRepo
+
+    async def handle(self, command: ReserveStockCommand) -> ReservationEntity:
+        """
+        Сначала списывается остаток, потом сохраняется резерв: если процесс упадет между записями,
+        единицы останутся списанными без резерва (недопродажа), но продать больше остатка нельзя.
+        """
+        reservation = ReservationEntity.create_reservation(
+            pharmacy_oid=command.pharmacy_oid,
+            product_oid=command.product_oid,
+            quantity=command.quantity,
+            ttl_seconds=command.ttl_seconds,
+        )
+
+        await self.pharmacy_repository.take_stock(
+            pharmacy_oid=reservation.pharmacy_oid,
+            product_oid=reservation.product_oid,
+            quantity=reservation.quantity,
+        )
+
+        try:
+            await self.reservation_repository.add_reservation(reservation)
+        except Exception:
+            await self.pharmacy_repository.return_stock(
+                pharmacy_oid=reservation.pharmacy_oid,
+                product_oid=reservation.product_oid,
+                quantity=reservation.quantity,
+            )
+            raise
+
+        return reservation
+
+
+@dataclass(frozen=True)
+class ReleaseReservationCommand(BaseCommand):
+    reservation_oid: str
+
+
+@dataclass(frozen=True)
+class ReleaseReservationHandler(CommandHandler[ReleaseReservationCommand, ReservationEntity]):
+    pharmacy_repository: BasePharmacyRepo
+    reservation_repository: BaseReservationRepo
+
+    async def handle(self, command: ReleaseReservationCommand) -> ReservationEntity:
+        """
+        Резерв удаляется только после возврата единиц. Если возврат не прошел, аренда снимается,
+        и единицы вернет очистка истекших резервов.
+        """
+        reservation = await self.reservation_repository.lease_reservation(command.reservation_oid, datetime.now())
+
+        if reservation is None:
+            raise ReservationNotFoundException
+
+        try:
+            await self.pharmacy_repository.return_stock(
+                pharmacy_oid=reservation.pharmacy_oid,
+                product_oid=reservation.product_oid,
+                quantity=reservation.quantity,
+            )
+        except Exception:
+            await self.reservation_repository.release_leases([reservation.oid])
+            raise
+
+        await self.reservation_repository.delete_reservation(reservation.oid)
+
+        return reservation
+
+
+@dataclass(frozen=True)
+class CommitReservationCommand(BaseCommand):
+    reservation_oid: str
+
+
+@dataclass(frozen=True)
+class CommitReservationHandler(CommandHandler[CommitReservationCommand, ReservationEntity]):
+    reservation_repository: BaseReservationRepo
+
+    async def handle(self, command: CommitReservationCommand) -> ReservationEntity:
+        """
+        Остаток уже списан при резерве, подтверждение только забирает резерв, пока он не истек.
+        """
+        reservation = await self.reservation_repository.pop_reservation(
+            command.reservation_oid,
+            active_at=datetime.now(),
+        )
+
+        if reservation is None:
+            raise ReservationNotFoundException
+
+        return reservation
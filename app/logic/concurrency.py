@@ -0,0 +1,49 @@
+import asyncio
+import random
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, TypeVar
+
+from app.logic.exceptions.pharmacy import PharmacyVersionConflictException
+
+T = TypeVar('T')
+
+
+@dataclass
+class ConflictRetryStats:
+    conflicts: int = 0
+    exhausted: int = 0
+
+
+@dataclass
+class ConflictRetry:
+    """
+    Повтор записи с оптимистичной блокировкой после конфликта версий. Между попытками - пауза
+    со случайной длительностью от нуля до экспоненциально растущего предела (full jitter):
+    проигравшие одну гонку писатели расходятся во времени, а не сталкиваются снова на следующей попытке.
+
+    Версию write читает заново на каждой попытке: версия, увиденная при конфликте, за время паузы
+    обычно успевает устареть, и запись с ней снова проигрывает.
+    """
+    attempts: int = 10
+    base_delay_seconds: float = 0.002
+    max_delay_seconds: float = 0.1
+    stats: ConflictRetryStats = field(default_factory=ConflictRetryStats, repr=False)
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * 2 ** attempt))
+
+    async def run(self, write: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+
+        while True:
+            try:
+                return await write()
+            except PharmacyVersionConflictException:
+                self.stats.conflicts += 1
+
+                if attempt + 1 >= self.attempts:
+                    self.stats.exhausted += 1
+                    raise
+
+            await asyncio.sleep(self.backoff(attempt))
+            attempt += 1
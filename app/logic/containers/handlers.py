@@ -1,29 +1,69 @@
+from punq import Scope
+
 from app.logic.commands.pharmacy import (AddProductWithPriceHandler,
+                                         ChangeInventoryBulkHandler,
                                          ChangeProductPriceHandler,
                                          DeletePharmacyHandler,
                                          DeleteProductFromPharmacyHandler,
+                                         ExportPharmaciesHandler,
                                          FindPharmacyHandler,
+                                         GetPharmaciesByOidsHandler,
                                          GetPharmacyByOidHandler,
+                                         GetPharmacyInventoryHandler,
+                                         GetPharmacyVersionHandler,
                                          PharmacyHandler,
                                          UpdatePharmacyHandler)
 from app.logic.commands.products import (CreateProductCommandHandler,
                                          DeleteProductHandler,
+                                         ExportProductsHandler,
+                                         FindOffersForProductHandler,
                                          FindProductHandler,
                                          GetProductByOidHandler,
+                                         GetProductsByOidsHandler,
+                                         GetProductVersionHandler,
+                                         ImportProductsHandler,
                                          UpdateProductHandler)
+from app.logic.commands.reservations import (CommitReservationHandler,
+                                             ReleaseReservationHandler,
+                                             ReserveStockHandler)
+from app.logic.concurrency import ConflictRetry
+from app.settings.config import Config
 
 
 def init_handler_dependencies(container):
+    def init_conflict_retry():
+        config: Config = container.resolve(Config)
+
+        return ConflictRetry(
+            attempts=config.conflict_retry_attempts,
+            base_delay_seconds=config.conflict_retry_base_delay_seconds,
+            max_delay_seconds=config.conflict_retry_max_delay_seconds,
+        )
+
+    container.register(ConflictRetry, factory=init_conflict_retry, scope=Scope.singleton)
     container.register(CreateProductCommandHandler)
     container.register(PharmacyHandler)
     container.register(GetProductByOidHandler)
     container.register(GetPharmacyByOidHandler)
+    container.register(GetProductVersionHandler)
+    container.register(GetPharmacyVersionHandler)
     container.register(UpdatePharmacyHandler)
     container.register(UpdateProductHandler)
     container.register(ChangeProductPriceHandler)
     container.register(AddProductWithPriceHandler)
     container.register(DeleteProductFromPharmacyHandler)
+    container.register(ChangeInventoryBulkHandler)
     container.register(DeleteProductHandler)
     container.register(DeletePharmacyHandler)
     container.register(FindProductHandler)
     container.register(FindPharmacyHandler)
+    container.register(GetPharmacyInventoryHandler)
+    container.register(FindOffersForProductHandler)
+    container.register(GetProductsByOidsHandler)
+    container.register(GetPharmaciesByOidsHandler)
+    container.register(ImportProductsHandler)
+    container.register(ExportProductsHandler)
+    container.register(ExportPharmaciesHandler)
+    container.register(ReserveStockHandler)
+    container.register(ReleaseReservationHandler)
+    container.register(CommitReservationHandler)
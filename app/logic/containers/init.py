@@ -14,20 +14,43 @@ from app.logic.commands.products import DeleteProductHandler  # noqa
 from app.logic.commands.products import GetProductByOidCommand  # noqa
 from app.logic.containers.handlers import init_handler_dependencies
 from app.logic.containers.mediators import register_mediator_commands
+from app.logic.containers.outbox import init_outbox_dependencies
 from app.logic.containers.repositories import init_repository_dependencies
+from app.logic.containers.reservations import init_reservation_dependencies
+from app.logic.event_bus import EventBus
 from app.logic.mediator import Mediator
+from app.logic.singleflight import SingleFlight
 from app.settings.config import Config
 
 
-def init_base_container() -> Container:
+def init_base_container(config: Config | None = None) -> Container:
     container = Container()
-    container.register(Config, instance=Config(), scope=Scope.singleton)
+    container.register(Config, instance=config or Config(), scope=Scope.singleton)
 
     def init_mediator():
-        mediator = Mediator()
+        config: Config = container.resolve(Config)
+        singleflight = None
+
+        if config.mediator_singleflight_enabled:
+            singleflight = SingleFlight(max_waiters=config.mediator_singleflight_max_waiters)
+
+        mediator = Mediator(
+            singleflight=singleflight,
+            dispatch_by_mro=config.mediator_dispatch_by_mro,
+        )
+
+        # С outbox события пишут репозитории вместе с изменением, шина их бы доставила второй раз
+        if config.event_bus_enabled and not config.outbox_enabled:
+            mediator.event_bus = EventBus(
+                get_handlers=mediator.get_event_handlers,
+                queue_size=config.event_bus_queue_size,
+                workers=config.event_bus_workers,
+                handler_timeout_seconds=config.event_bus_handler_timeout_seconds,
+            )
+
         return mediator
 
-    container.register(Mediator, factory=init_mediator)
+    container.register(Mediator, factory=init_mediator, scope=Scope.singleton)
     return container
 
 
@@ -36,15 +59,19 @@ def init_container():
     return _init_container()
 
 
-def _init_container() -> Container:
-    container = init_base_container()
+def _init_container(config: Config | None = None) -> Container:
+    container = init_base_container(config)
     mediator = container.resolve(Mediator)
-    container.register(Config, instance=Config(), scope=Scope.singleton)
 
     init_handler_dependencies(container)
 
+    if container.resolve(Config).outbox_enabled:
+        init_outbox_dependencies(container)
+
     init_repository_dependencies(container)
+    init_reservation_dependencies(container)
 
     register_mediator_commands(container, mediator)
+    mediator.compile()
 
     return container
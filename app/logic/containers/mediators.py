@@ -1,5 +1,7 @@
 from app.logic.commands.pharmacy import (AddProductWithPriceCommand,
                                          AddProductWithPriceHandler,
+                                         ChangeInventoryBulkCommand,
+                                         ChangeInventoryBulkHandler,
                                          ChangeProductPriceCommand,
                                          ChangeProductPriceHandler,
                                          CreatePharmacyCommand,
@@ -7,10 +9,18 @@ from app.logic.commands.pharmacy import (AddProductWithPriceCommand,
                                          DeletePharmacyHandler,
                                          DeleteProductFromPharmacyCommand,
                                          DeleteProductFromPharmacyHandler,
+                                         ExportPharmaciesCommand,
+                                         ExportPharmaciesHandler,
                                          FindPharmacyCommand,
                                          FindPharmacyHandler,
+                                         GetPharmaciesByOidsCommand,
+                                         GetPharmaciesByOidsHandler,
                                          GetPharmacyByOidCommand,
                                          GetPharmacyByOidHandler,
+                                         GetPharmacyInventoryCommand,
+                                         GetPharmacyInventoryHandler,
+                                         GetPharmacyVersionCommand,
+                                         GetPharmacyVersionHandler,
                                          PharmacyHandler,
                                          UpdatePharmacyCommand,
                                          UpdatePharmacyHandler)
@@ -18,12 +28,28 @@ from app.logic.commands.products import (CreateProductCommand,
                                          CreateProductCommandHandler,
                                          DeleteProductCommand,
                                          DeleteProductHandler,
+                                         ExportProductsCommand,
+                                         ExportProductsHandler,
+                                         FindOffersForProductCommand,
+                                         FindOffersForProductHandler,
                                          FindProductCommand,
                                          FindProductHandler,
                                          GetProductByOidCommand,
                                          GetProductByOidHandler,
+                                         GetProductsByOidsCommand,
+                                         GetProductsByOidsHandler,
+                                         GetProductVersionCommand,
+                                         GetProductVersionHandler,
+                                         ImportProductsCommand,
+                                         ImportProductsHandler,
                                          UpdateProductCommand,
                                          UpdateProductHandler)
+from app.logic.commands.reservations import (CommitReservationCommand,
+                                             CommitReservationHandler,
+                                             ReleaseReservationCommand,
+                                             ReleaseReservationHandler,
+                                             ReserveStockCommand,
+                                             ReserveStockHandler)
 
 
 def register_mediator_commands(container, mediator):
@@ -43,6 +69,14 @@ def register_mediator_commands(container, mediator):
         GetPharmacyByOidCommand,
         [container.resolve(GetPharmacyByOidHandler)],
     )
+    mediator.register_command(
+        GetProductVersionCommand,
+        [container.resolve(GetProductVersionHandler)],
+    )
+    mediator.register_command(
+        GetPharmacyVersionCommand,
+        [container.resolve(GetPharmacyVersionHandler)],
+    )
     mediator.register_command(
         UpdatePharmacyCommand,
         [container.resolve(UpdatePharmacyHandler)],
@@ -63,6 +97,10 @@ def register_mediator_commands(container, mediator):
         DeleteProductFromPharmacyCommand,
         [container.resolve(DeleteProductFromPharmacyHandler)],
     )
+    mediator.register_command(
+        ChangeInventoryBulkCommand,
+        [container.resolve(ChangeInventoryBulkHandler)],
+    )
     mediator.register_command(
         DeleteProductCommand,
         [container.resolve(DeleteProductHandler)],
@@ -79,4 +117,44 @@ def register_mediator_commands(container, mediator):
         FindPharmacyCommand,
         [container.resolve(FindPharmacyHandler)],
     )
+    mediator.register_command(
+        GetPharmacyInventoryCommand,
+        [container.resolve(GetPharmacyInventoryHandler)],
+    )
+    mediator.register_command(
+        FindOffersForProductCommand,
+        [container.resolve(FindOffersForProductHandler)],
+    )
+    mediator.register_command(
+        GetProductsByOidsCommand,
+        [container.resolve(GetProductsByOidsHandler)],
+    )
+    mediator.register_command(
+        GetPharmaciesByOidsCommand,
+        [container.resolve(GetPharmaciesByOidsHandler)],
+    )
+    mediator.register_command(
+        ImportProductsCommand,
+        [container.resolve(ImportProductsHandler)],
+    )
+    mediator.register_command(
+        ExportProductsCommand,
+        [container.resolve(ExportProductsHandler)],
+    )
+    mediator.register_command(
+        ExportPharmaciesCommand,
+        [container.resolve(ExportPharmaciesHandler)],
+    )
+    mediator.register_command(
+        ReserveStockCommand,
+        [container.resolve(ReserveStockHandler)],
+    )
+    mediator.register_command(
+        ReleaseReservationCommand,
+        [container.resolve(ReleaseReservationHandler)],
+    )
+    mediator.register_command(
+        CommitReservationCommand,
+        [container.resolve(CommitReservationHandler)],
+    )
     return mediator
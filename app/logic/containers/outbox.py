@@ -0,0 +1,38 @@
+from punq import Scope
+
+from app.infra.connections.mongo import MongoConnectionManager
+from app.infra.outbox.base import BaseOutbox
+from app.infra.outbox.mongo import MongoDBOutbox
+from app.logic.mediator import Mediator
+from app.logic.outbox import OutboxRelay
+from app.settings.config import Config
+
+
+def init_outbox_dependencies(container):
+    def init_mongodb_outbox():
+        config: Config = container.resolve(Config)
+        connection_manager: MongoConnectionManager = container.resolve(MongoConnectionManager)
+
+        return MongoDBOutbox(
+            mongo_db_client=connection_manager.client,
+            mongo_db_db_name=config.mongodb_pharmacy_database,
+            mongo_db_collection_name=config.mongodb_outbox_collection,
+            use_transactions=config.outbox_use_transactions,
+            done_ttl_seconds=config.outbox_done_ttl_seconds,
+        )
+
+    def init_outbox_relay():
+        config: Config = container.resolve(Config)
+
+        return OutboxRelay(
+            outbox=container.resolve(BaseOutbox),
+            mediator=container.resolve(Mediator),
+            batch_size=config.outbox_batch_size,
+            lease_seconds=config.outbox_lease_seconds,
+            poll_interval_seconds=config.outbox_poll_interval_seconds,
+            retry_delay_seconds=config.outbox_retry_delay_seconds,
+            max_attempts=config.outbox_max_attempts,
+        )
+
+    container.register(BaseOutbox, factory=init_mongodb_outbox, scope=Scope.singleton)
+    container.register(OutboxRelay, factory=init_outbox_relay, scope=Scope.singleton)
@@ -1,30 +1,75 @@
-from motor.motor_asyncio import AsyncIOMotorClient
 from punq import Scope
 
+from app.infra.cache.lru import LRUCache
+from app.infra.connections.mongo import MongoConnectionManager
+from app.infra.outbox.base import BaseOutbox
 from app.infra.repositories.base import BasePharmacyRepo, BaseProductRepo
-from app.infra.repositories.mongo import (MongoDBPharmacyRepo,
-                                          MongoDBProductRepo)
+from app.infra.repositories.cached import (CachedPharmacyRepo,
+                                           CachedProductRepo, weigh_pharmacy)
+from app.infra.repositories.inventory import create_mongodb_pharmacy_repository
+from app.infra.repositories.memory import MemoryPharmacyRepo, MemoryProductRepo
+from app.infra.repositories.mongo import MongoDBProductRepo
 from app.settings.config import Config
 
 
 def init_repository_dependencies(container):
+    def init_mongodb_connection_manager():
+        config: Config = container.resolve(Config)
+        return MongoConnectionManager(config=config)
+
+    def init_outbox() -> BaseOutbox | None:
+        config: Config = container.resolve(Config)
+        return container.resolve(BaseOutbox) if config.outbox_enabled else None
+
     def init_pharmacy_mongodb_repository():
         config: Config = container.resolve(Config)
-        client = AsyncIOMotorClient(config.mongodb_connection_uri, serverSelectionTimeoutMS=3000)
-        return MongoDBPharmacyRepo(
-            mongo_db_client=client,
-            mongo_db_db_name=config.mongodb_pharmacy_database,
-            mongo_db_collection_name=config.mongodb_pharmacy_collection,
+        connection_manager: MongoConnectionManager = container.resolve(MongoConnectionManager)
+        repository = create_mongodb_pharmacy_repository(config, connection_manager.client, init_outbox())
+
+        if not config.repository_cache_enabled:
+            return repository
+
+        return CachedPharmacyRepo(
+            repository=repository,
+            cache=LRUCache(
+                max_size=config.repository_cache_max_size,
+                ttl_seconds=config.repository_cache_ttl_seconds,
+                weigher=weigh_pharmacy,
+            ),
         )
 
     def init_product_mongodb_repository():
         config: Config = container.resolve(Config)
-        client = AsyncIOMotorClient(config.mongodb_connection_uri, serverSelectionTimeoutMS=3000)
-        return MongoDBProductRepo(
-            mongo_db_client=client,
+        connection_manager: MongoConnectionManager = container.resolve(MongoConnectionManager)
+        repository = MongoDBProductRepo(
+            mongo_db_client=connection_manager.client,
             mongo_db_db_name=config.mongodb_pharmacy_database,
             mongo_db_collection_name=config.mongodb_product_collection,
+            insert_chunk_size=config.mongodb_insert_chunk_size,
+            search_index_batch_size=config.search_index_batch_size,
+            load_batch_size=config.repository_load_batch_size,
+            outbox=init_outbox(),
         )
 
+        if not config.repository_cache_enabled:
+            return repository
+
+        return CachedProductRepo(
+            repository=repository,
+            cache=LRUCache(
+                max_size=config.repository_cache_max_size,
+                ttl_seconds=config.repository_cache_ttl_seconds,
+            ),
+        )
+
+    container.register(MongoConnectionManager, factory=init_mongodb_connection_manager, scope=Scope.singleton)
+
+    config: Config = container.resolve(Config)
+
+    if config.repository_backend == 'memory':
+        container.register(BasePharmacyRepo, MemoryPharmacyRepo, scope=Scope.singleton)
+        container.register(BaseProductRepo, MemoryProductRepo, scope=Scope.singleton)
+        return
+
     container.register(BasePharmacyRepo, factory=init_pharmacy_mongodb_repository, scope=Scope.singleton)
     container.register(BaseProductRepo, factory=init_product_mongodb_repository, scope=Scope.singleton)
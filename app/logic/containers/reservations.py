@@ -0,0 +1,50 @@
+from punq import Scope
+
+from app.infra.connections.mongo import MongoConnectionManager
+from app.infra.repositories.base import BasePharmacyRepo, BaseReservationRepo
+from app.infra.repositories.memory import MemoryReservationRepo
+from app.infra.repositories.mongo import MongoDBReservationRepo
+from app.logic.reservations import ReservationSweeper
+from app.settings.config import Config
+
+
+def init_reservation_dependencies(container):
+    def init_mongodb_reservation_repository():
+        config: Config = container.resolve(Config)
+        connection_manager: MongoConnectionManager = container.resolve(MongoConnectionManager)
+
+        return MongoDBReservationRepo(
+            mongo_db_client=connection_manager.client,
+            mongo_db_db_name=config.mongodb_pharmacy_database,
+            mongo_db_collection_name=config.mongodb_reservation_collection,
+            purge_after_seconds=config.reservation_purge_after_seconds,
+            return_lease_seconds=config.reservation_return_lease_seconds,
+        )
+
+    def init_memory_reservation_repository():
+        config: Config = container.resolve(Config)
+
+        return MemoryReservationRepo(return_lease_seconds=config.reservation_return_lease_seconds)
+
+    def init_reservation_sweeper():
+        config: Config = container.resolve(Config)
+
+        return ReservationSweeper(
+            reservation_repository=container.resolve(BaseReservationRepo),
+            pharmacy_repository=container.resolve(BasePharmacyRepo),
+            batch_size=config.reservation_sweep_batch_size,
+            interval_seconds=config.reservation_sweep_interval_seconds,
+        )
+
+    config: Config = container.resolve(Config)
+
+    if config.repository_backend == 'memory':
+        container.register(BaseReservationRepo, factory=init_memory_reservation_repository, scope=Scope.singleton)
+    else:
+        container.register(
+            BaseReservationRepo,
+            factory=init_mongodb_reservation_repository,
+            scope=Scope.singleton,
+        )
+
+    container.register(ReservationSweeper, factory=init_reservation_sweeper, scope=Scope.singleton)
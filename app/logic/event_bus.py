@@ -0,0 +1,142 @@
+import asyncio
+import logging
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Iterable
+
+from app.domain.entities.base import BaseEntity
+from app.domain.events.base import BaseEvent
+from app.logic.events.base import EventHandler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EventBusStats:
+    published: int = 0
+    dropped: int = 0
+    processed: int = 0
+    unhandled: int = 0
+    handler_failures: int = 0
+    handler_timeouts: int = 0
+    lag_total_seconds: float = 0.0
+    lag_max_seconds: float = 0.0
+
+
+def pull_result_events(result: Any) -> list[BaseEvent]:
+    """
+    Собирает события сущностей, которые вернул обработчик команды: одну сущность или список сущностей.
+    """
+    if isinstance(result, BaseEntity):
+        return result.pull_events()
+
+    if isinstance(result, (list, tuple)):
+        return [event for item in result if isinstance(item, BaseEntity) for event in item.pull_events()]
+
+    return []
+
+
+@dataclass(eq=False)
+class EventBus:
+    """
+    Фоновая доставка доменных событий: publish только кладет событие в ограниченную очередь,
+    обработчики вызывают workers фоновых задач, поэтому побочные эффекты не задерживают ответ.
+
+    Обработчики одного события выполняются одновременно, каждый со своим таймаутом.
+    Когда очередь заполнена, событие отбрасывается и учитывается в dropped: запрос не ждет места в очереди.
+    """
+    get_handlers: Callable[[type], tuple[EventHandler, ...]]
+    queue_size: int = 10000
+    workers: int = 4
+    handler_timeout_seconds: float = 5.0
+    stats: EventBusStats = field(default_factory=EventBusStats)
+
+    _queue: asyncio.Queue | None = field(default=None, init=False, repr=False)
+    _tasks: list[asyncio.Task] = field(default_factory=list, init=False, repr=False)
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+
+        return self._queue
+
+    def publish(self, events: Iterable[BaseEvent]) -> None:
+        loop = asyncio.get_running_loop()
+
+        for event in events:
+            try:
+                self.queue.put_nowait((event, loop.time()))
+            except asyncio.QueueFull:
+                self.stats.dropped += 1
+                logger.warning('Event bus queue is full, %s dropped', type(event).__name__)
+                continue
+
+            self.stats.published += 1
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self, drain_timeout_seconds: float = 5.0) -> None:
+        """
+        Дает workers дообработать очередь, затем останавливает их.
+        """
+        if not self._tasks:
+            return
+
+        try:
+            await asyncio.wait_for(self.queue.join(), drain_timeout_seconds)
+        except asyncio.TimeoutError:
+            logger.warning('Event bus stopped with %d events in queue', self.queue.qsize())
+
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            event, enqueued_at = await self.queue.get()
+
+            lag = loop.time() - enqueued_at
+            self.stats.lag_total_seconds += lag
+            self.stats.lag_max_seconds = max(self.stats.lag_max_seconds, lag)
+
+            try:
+                await self.dispatch(event)
+            finally:
+                self.stats.processed += 1
+                self.queue.task_done()
+
+    async def dispatch(self, event: BaseEvent) -> None:
+        handlers = self.get_handlers(event.__class__)
+
+        if not handlers:
+            self.stats.unhandled += 1
+            return
+
+        await asyncio.gather(*(self._run_handler(handler, event) for handler in handlers))
+
+    async def _run_handler(self, handler: EventHandler, event: BaseEvent) -> None:
+        try:
+            await asyncio.wait_for(handler.handle(event), self.handler_timeout_seconds)
+        except asyncio.TimeoutError:
+            self.stats.handler_timeouts += 1
+            logger.warning('%s timed out on %s', type(handler).__name__, type(event).__name__)
+        except Exception:
+            self.stats.handler_failures += 1
+            logger.exception('%s failed on %s', type(handler).__name__, type(event).__name__)
+
+    def snapshot(self) -> dict:
+        stats = asdict(self.stats)
+        stats['lag_avg_seconds'] = stats['lag_total_seconds'] / stats['processed'] if stats['processed'] else 0.0
+
+        return {
+            **stats,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'queue_size': self.queue_size,
+            'workers': len(self._tasks),
+        }
@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+from .base import LogicException
+
+
+@dataclass(eq=False)
+class UnknownFieldsException(LogicException):
+    fields: tuple[str, ...]
+
+    @property
+    def message(self):
+        return f'Неизвестные поля: {", ".join(self.fields)}'
@@ -9,7 +9,16 @@ class CommandHandlersNotRegisteredException(LogicException):
 
     @property
     def message(self):
-        return f'Не удалось найти обработчики для команды: {self.event_type}'
+        return f'Не удалось найти обработчики для команды: {self.command_type}'
+
+
+@dataclass(eq=False)
+class MultipleCommandHandlersException(LogicException):
+    command_type: type
+
+    @property
+    def message(self):
+        return f'У команды несколько обработчиков, результат одного вернуть нельзя: {self.command_type}'
 
 
 @dataclass(eq=False)
@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+from .base import LogicException
+
+
+@dataclass(eq=False)
+class InvalidContinuationTokenException(LogicException):
+    token: str
+
+    @property
+    def message(self):
+        return 'Неверный токен продолжения выдачи'
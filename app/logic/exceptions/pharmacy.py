@@ -34,3 +34,63 @@ class PharmacyNotFoundWithThisQuery(LogicException):
     @property
     def message(self):
         return 'Аптека не найдена по этому названию'
+
+
+@dataclass(eq=False)
+class PharmacyVersionConflictException(LogicException):
+    """
+    Аптеку изменили между чтением версии и записью. Запись не применена, ее можно повторить с новой версией.
+    """
+    pharmacy_oid: str
+    expected_version: int
+    actual_version: int
+
+    @property
+    def message(self):
+        return 'Аптеку одновременно изменили в другом запросе, повторите запрос'
+
+
+@dataclass(eq=False)
+class ProductAlreadyInPharmacyException(LogicException):
+    product_oid: str
+
+    @property
+    def message(self):
+        return f'Товар "{self.product_oid}" уже добавлен в аптеку'
+
+
+@dataclass(eq=False)
+class InventoryOperationValueMissingException(LogicException):
+    op: str
+    field_name: str
+
+    @property
+    def message(self):
+        return f'Для операции "{self.op}" нужно поле {self.field_name}'
+
+
+@dataclass(eq=False)
+class InventoryOperationNotSavedException(LogicException):
+    reason: str
+
+    @property
+    def message(self):
+        return f'Изменение не сохранено: {self.reason}'
+
+
+@dataclass(eq=False)
+class NotEnoughStockException(LogicException):
+    product_oid: str
+    quantity: int
+
+    @property
+    def message(self):
+        return f'Недостаточно товара "{self.product_oid}" в аптеке для резерва {self.quantity} шт.'
+
+
+@dataclass(eq=False)
+class ReservationNotFoundException(LogicException):
+
+    @property
+    def message(self):
+        return 'Резерв не найден: он уже подтвержден, отменен или истек'
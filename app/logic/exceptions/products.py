@@ -12,6 +12,16 @@ class ProductWithThatTitleAlreadyExistsException(LogicException):
         return f'Товар "{self.title}" уже существует.'
 
 
+@dataclass(eq=False)
+class ProductNotSavedException(LogicException):
+    title: str
+    reason: str
+
+    @property
+    def message(self):
+        return f'Товар "{self.title}" не сохранен: {self.reason}'
+
+
 @dataclass(eq=False)
 class ProductExpiresDateException(LogicException):
 
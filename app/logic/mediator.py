@@ -1,16 +1,69 @@
 from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import Iterable
+from types import MappingProxyType
+from typing import Iterable, Mapping
 
 from app.domain.events.base import BaseEvent
-from app.logic.commands.base import CR, CT, BaseCommand, CommandHandler
+from app.logic.commands.base import (CR, CT, BaseCommand, BaseReadCommand,
+                                     CommandHandler)
+from app.logic.event_bus import EventBus, pull_result_events
 from app.logic.events.base import ER, ET, EventHandler
 from app.logic.exceptions.mediator import (
-    CommandHandlersNotRegisteredException, EventHandlersNotRegisteredException)
+    CommandHandlersNotRegisteredException, EventHandlersNotRegisteredException,
+    MultipleCommandHandlersException)
+from app.logic.singleflight import SingleFlight
+
+
+def is_hashable(command: BaseCommand) -> bool:
+    try:
+        hash(command)
+    except TypeError:
+        return False
+
+    return True
+
+
+def is_read_command(table: 'DispatchTable', command_type: type) -> bool:
+    # Команда, найденная по MRO, в таблице не записана, для нее проверка делается каждый раз
+    return command_type in table.read_commands or (
+        command_type not in table.commands and issubclass(command_type, BaseReadCommand)
+    )
+
+
+@dataclass(frozen=True)
+class DispatchTable:
+    """
+    Неизменяемая таблица обработчиков, собранная из commands_map и events_map.
+    single - команды ровно с одним обработчиком, их send вызывает без обхода списка.
+    read_commands заранее отвечает на isinstance(command, BaseReadCommand): проверка по ABC медленная.
+    """
+    commands: Mapping[type, tuple[CommandHandler, ...]]
+    single: Mapping[type, CommandHandler]
+    events: Mapping[type, tuple[EventHandler, ...]]
+    read_commands: frozenset[type]
+
+    @classmethod
+    def build(cls, commands_map: dict, events_map: dict) -> 'DispatchTable':
+        commands = {command: tuple(handlers) for command, handlers in commands_map.items() if handlers}
+
+        return cls(
+            commands=MappingProxyType(commands),
+            single=MappingProxyType(
+                {command: handlers[0] for command, handlers in commands.items() if len(handlers) == 1},
+            ),
+            events=MappingProxyType({event: tuple(handlers) for event, handlers in events_map.items() if handlers}),
+            read_commands=frozenset(command for command in commands if issubclass(command, BaseReadCommand)),
+        )
 
 
 @dataclass(eq=False)
 class Mediator:
+    """
+    Таблица обработчиков собирается один раз в compile после регистрации, регистрация сбрасывает ее.
+    При dispatch_by_mro команда или событие без своих обработчиков ищет их у ближайшего
+    зарегистрированного базового класса.
+    Если задан event_bus, события сущностей из результата изменяющей команды уходят в фоновую доставку.
+    """
     events_map: dict[ET, EventHandler] = field(
         default_factory=lambda: defaultdict(list),
         kw_only=True,
@@ -19,32 +72,128 @@ class Mediator:
         default_factory=lambda: defaultdict(list),
         kw_only=True,
     )
+    singleflight: SingleFlight | None = field(default=None, kw_only=True)
+    dispatch_by_mro: bool = field(default=False, kw_only=True)
+    event_bus: EventBus | None = field(default=None, kw_only=True)
+
+    _table: DispatchTable | None = field(default=None, init=False, repr=False)
+    _resolved_by_mro: dict[type, tuple] = field(default_factory=dict, init=False, repr=False)
 
     def register_event(self, event: ET, event_handlers: Iterable[EventHandler[ET, ER]]):
-        self.events_map[event].append(event_handlers)
+        self.events_map[event].extend(event_handlers)
+        self._reset()
 
-    def register_command(self, command: CT, command_handlers: Iterable[EventHandler[CT, CR]]):
-        self.events_map[command].extend(command_handlers)
+    def register_command(self, command: CT, command_handlers: Iterable[CommandHandler[CT, CR]]):
+        self.commands_map[command].extend(command_handlers)
+        self._reset()
 
-    async def publish(self, events: Iterable[BaseEvent]) -> Iterable[ER]:
-        event_type = events.__class__
-        handlers = self.events_map.get(event_type)
+    def _reset(self) -> None:
+        self._table = None
+        self._resolved_by_mro.clear()
+
+    def compile(self) -> DispatchTable:
+        self._table = DispatchTable.build(self.commands_map, self.events_map)
+        return self._table
+
+    def _resolve_by_mro(self, message_type: type, handlers_map: Mapping[type, tuple]) -> tuple:
+        handlers = self._resolved_by_mro.get(message_type)
+
+        if handlers is None:
+            handlers = next(
+                (handlers_map[base] for base in message_type.__mro__[1:] if base in handlers_map),
+                (),
+            )
+            self._resolved_by_mro[message_type] = handlers
+
+        return handlers
+
+    def _get_command_handlers(self, table: DispatchTable, command_type: type) -> tuple[CommandHandler, ...]:
+        handlers = table.commands.get(command_type)
+
+        if handlers is None and self.dispatch_by_mro:
+            handlers = self._resolve_by_mro(command_type, table.commands)
 
         if not handlers:
-            raise EventHandlersNotRegisteredException(event_type)
+            raise CommandHandlersNotRegisteredException(command_type)
+
+        return handlers
+
+    def get_event_handlers(self, event_type: type) -> tuple[EventHandler, ...]:
+        table = self._table or self.compile()
+        handlers = table.events.get(event_type)
+
+        if handlers is None and self.dispatch_by_mro:
+            handlers = self._resolve_by_mro(event_type, table.events)
 
+        return handlers or ()
+
+    async def publish(self, events: Iterable[BaseEvent]) -> Iterable[ER]:
         result = []
 
         for event in events:
-            result.extend([await handler.handle(event) for handler in handlers])
+            handlers = self.get_event_handlers(event.__class__)
+
+            if not handlers:
+                raise EventHandlersNotRegisteredException(event.__class__)
+
+            for handler in handlers:
+                result.append(await handler.handle(event))
 
         return result
 
+    async def send(self, command: BaseCommand) -> CR:
+        """
+        Выполняет команду с единственным обработчиком и возвращает его результат без обертки в список.
+        """
+        table = self._table or self.compile()
+        command_type = command.__class__
+        handler = table.single.get(command_type)
+
+        if handler is None:
+            handlers = self._get_command_handlers(table, command_type)
+
+            if len(handlers) > 1:
+                raise MultipleCommandHandlersException(command_type)
+
+            handler = handlers[0]
+
+        if not is_read_command(table, command_type):
+            result = await handler.handle(command)
+
+            if self.event_bus is not None:
+                self.event_bus.publish(pull_result_events(result))
+
+            return result
+
+        if self.singleflight is None:
+            return await handler.handle(command)
+
+        return await self._handle_collapsed(handler, command)
+
     async def handle_command(self, command: BaseCommand) -> Iterable[CR]:
+        table = self._table or self.compile()
         command_type = command.__class__
-        handlers = self.events_map.get(command_type)
+        handlers = self._get_command_handlers(table, command_type)
 
-        if not handlers:
-            raise CommandHandlersNotRegisteredException(command_type)
+        if is_read_command(table, command_type):
+            if self.singleflight is None or len(handlers) > 1:
+                return [await handler.handle(command) for handler in handlers]
+
+            return [await self._handle_collapsed(handlers[0], command)]
+
+        if len(handlers) == 1:
+            results = [await handlers[0].handle(command)]
+        else:
+            results = [await handler.handle(command) for handler in handlers]
+
+        if self.event_bus is not None:
+            self.event_bus.publish(pull_result_events(results))
+
+        return results
+
+    async def _handle_collapsed(self, handler: CommandHandler, command: BaseReadCommand):
+        # Склеиваются только читающие команды с одним обработчиком и общим результатом: ключом служит сама команда
+        if not command.collapsible or not is_hashable(command):
+            return await handler.handle(command)
 
-        return [await handler.handle(command) for handler in handlers]
+        return await self.singleflight.do(command, lambda: handler.handle(command))
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+
+from app.infra.outbox.base import BaseOutbox
+from app.infra.outbox.converters import convert_document_to_event
+from app.logic.mediator import Mediator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutboxRelayStats:
+    batches: int = 0
+    claimed: int = 0
+    delivered: int = 0
+    retried: int = 0
+    buried: int = 0
+    last_batch_seconds: float = 0.0
+
+
+@dataclass(eq=False)
+class OutboxRelay:
+    """
+    Фоновая доставка событий из outbox: забирает пачку под аренду, доставляет события обработчикам
+    медиатора и отмечает результат пачки одним запросом на каждый исход.
+
+    Доставка at-least-once: событие, обработчик которого упал, или пачка, аренда которой истекла,
+    доставляются повторно, поэтому обработчики событий должны быть идемпотентными.
+    Порядок доставки внутри пачки не гарантируется, события пачки доставляются одновременно.
+    """
+    outbox: BaseOutbox
+    mediator: Mediator
+    batch_size: int = 500
+    lease_seconds: float = 30.0
+    poll_interval_seconds: float = 0.5
+    retry_delay_seconds: float = 5.0
+    max_attempts: int = 10
+    stats: OutboxRelayStats = field(default_factory=OutboxRelayStats)
+
+    _task: asyncio.Task | None = field(default=None, init=False, repr=False)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                relayed = await self.relay_batch()
+            except Exception:
+                logger.exception('Outbox relay batch failed')
+                relayed = 0
+
+            if relayed < self.batch_size:
+                await asyncio.sleep(self.poll_interval_seconds)
+
+    async def relay_batch(self) -> int:
+        started = time.perf_counter()
+        documents = await self.outbox.claim(self.batch_size, self.lease_seconds)
+
+        if not documents:
+            return 0
+
+        results = await asyncio.gather(*(self._deliver(document) for document in documents))
+
+        delivered, retried, buried = [], [], []
+
+        for document, is_delivered in zip(documents, results):
+            if is_delivered:
+                delivered.append(document['_id'])
+            elif document['attempts'] >= self.max_attempts:
+                buried.append(document['_id'])
+            else:
+                retried.append(document['_id'])
+
+        claim_id = documents[0]['claim_id']
+        await self.outbox.complete(claim_id, delivered)
+        await self.outbox.release(claim_id, retried, self.retry_delay_seconds)
+        await self.outbox.bury(claim_id, buried)
+
+        self.stats.batches += 1
+        self.stats.claimed += len(documents)
+        self.stats.delivered += len(delivered)
+        self.stats.retried += len(retried)
+        self.stats.buried += len(buried)
+        self.stats.last_batch_seconds = time.perf_counter() - started
+
+        return len(documents)
+
+    async def _deliver(self, document: dict) -> bool:
+        try:
+            event = convert_document_to_event(document)
+            handlers = self.mediator.get_event_handlers(event.__class__)
+            await asyncio.gather(*(handler.handle(event) for handler in handlers))
+        except Exception:
+            logger.exception('Outbox event %s delivery failed', document['_id'])
+            return False
+
+        return True
+
+    def snapshot(self) -> dict:
+        return {**asdict(self.stats), 'running': self._task is not None}
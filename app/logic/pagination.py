@@ -0,0 +1,34 @@
+import base64
+import json
+import math
+from typing import AsyncIterator, TypeVar
+
+from .exceptions.pagination import InvalidContinuationTokenException
+
+IT = TypeVar('IT')
+
+
+def encode_continuation_token(score: float, oid: str) -> str:
+    payload = json.dumps([score, oid], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_continuation_token(token: str) -> tuple[float, str]:
+    try:
+        score, oid = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        score = float(score)
+    except (ValueError, TypeError):
+        raise InvalidContinuationTokenException(token=token)
+
+    # NaN и бесконечность ломают сравнение ключей, а oid из токена уходит в запрос как есть
+    if not math.isfinite(score) or not isinstance(oid, str):
+        raise InvalidContinuationTokenException(token=token)
+
+    return score, oid
+
+
+async def prepend(item: IT, items: AsyncIterator[IT]) -> AsyncIterator[IT]:
+    yield item
+
+    async for item in items:
+        yield item
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+
+from app.infra.repositories.base import BasePharmacyRepo, BaseReservationRepo
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReservationSweeperStats:
+    sweeps: int = 0
+    expired: int = 0
+    failed: int = 0
+    returned_quantity: int = 0
+    last_sweep_seconds: float = 0.0
+
+
+@dataclass(eq=False)
+class ReservationSweeper:
+    """
+    Фоновая очистка истекших резервов: берет их пачками в аренду и возвращает единицы в остатки позиций.
+    Аренда не дает нескольким воркерам возвращать один резерв одновременно, а удаление после возврата -
+    потерять единицы, если возврат не прошел.
+    """
+    reservation_repository: BaseReservationRepo
+    pharmacy_repository: BasePharmacyRepo
+    batch_size: int = 500
+    interval_seconds: float = 1.0
+    stats: ReservationSweeperStats = field(default_factory=ReservationSweeperStats)
+
+    _task: asyncio.Task | None = field(default=None, init=False, repr=False)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                swept = await self.sweep()
+            except Exception:
+                logger.exception('Reservation sweep failed')
+                swept = 0
+
+            if swept < self.batch_size:
+                await asyncio.sleep(self.interval_seconds)
+
+    async def sweep(self) -> int:
+        """
+        Возвращает единицы взятых в аренду резервов и удаляет только вернувшиеся. С резервов, возврат
+        которых не прошел, аренда снимается, и их заберет следующая очистка. Возвращает число забранных резервов.
+        """
+        started = time.perf_counter()
+        reservations = await self.reservation_repository.lease_expired_reservations(datetime.now(), self.batch_size)
+
+        results = await asyncio.gather(*(
+            self.pharmacy_repository.return_stock(
+                pharmacy_oid=reservation.pharmacy_oid,
+                product_oid=reservation.product_oid,
+                quantity=reservation.quantity,
+            )
+            for reservation in reservations
+        ), return_exceptions=True)
+
+        returned, failed = [], []
+
+        for reservation, result in zip(reservations, results):
+            if isinstance(result, BaseException):
+                logger.error('Reservation %s stock return failed: %r', reservation.oid, result)
+                failed.append(reservation)
+            else:
+                returned.append(reservation)
+
+        if failed:
+            await self.reservation_repository.release_leases([reservation.oid for reservation in failed])
+
+        await asyncio.gather(*(
+            self.reservation_repository.delete_reservation(reservation.oid) for reservation in returned
+        ))
+
+        self.stats.sweeps += 1
+        self.stats.expired += len(returned)
+        self.stats.failed += len(failed)
+        self.stats.returned_quantity += sum(reservation.quantity for reservation in returned)
+        self.stats.last_sweep_seconds = time.perf_counter() - started
+
+        return len(reservations)
+
+    def snapshot(self) -> dict:
+        return {**asdict(self.stats), 'running': self._task is not None}
@@ -0,0 +1,53 @@
+import asyncio
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Hashable
+
+
+@dataclass
+class SingleFlightStats:
+    calls: int = 0
+    collapsed: int = 0
+    overflow: int = 0
+
+
+@dataclass(eq=False)
+class SingleFlight:
+    """
+    Одновременные вызовы с одинаковым ключом выполняются один раз, остальные ждут результат первого.
+    Результат не запоминается: следующий вызов после завершения снова идет в хранилище.
+    Результат отдается всем ожидающим как есть, поэтому call должен возвращать то, что можно читать совместно.
+    Если результат уже ждут max_waiters вызовов, новый вызов выполняется отдельно.
+    """
+    max_waiters: int = 1000
+    stats: SingleFlightStats = field(default_factory=SingleFlightStats)
+
+    _in_flight: dict[Hashable, tuple[asyncio.Task, list[int]]] = field(default_factory=dict, init=False, repr=False)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        self.stats.calls += 1
+        in_flight = self._in_flight.get(key)
+
+        if in_flight is not None:
+            task, waiters = in_flight
+
+            if waiters[0] < self.max_waiters:
+                waiters[0] += 1
+                self.stats.collapsed += 1
+                return await asyncio.shield(task)
+
+            self.stats.overflow += 1
+            return await call()
+
+        task = asyncio.ensure_future(call())
+        self._in_flight[key] = (task, [0])
+        task.add_done_callback(lambda _: self._forget(key, task))
+
+        # Задачу ждут и другие вызовы, отмена первого вызывающего не должна ее отменять
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key, (None,))[0] is task:
+            del self._in_flight[key]
+
+    def snapshot(self) -> dict:
+        return {**asdict(self.stats), 'in_flight': len(self._in_flight)}
@@ -1,12 +1,76 @@
+from typing import Literal
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
 
 class Config(BaseSettings):
-    mongodb_connection_uri: str = Field(alias='MONGO_DB_CONNECTION_URI')
+    repository_backend: Literal['mongo', 'memory'] = Field(default='mongo', alias='REPOSITORY_BACKEND')
+    mongodb_connection_uri: str = Field(default='mongodb://localhost:27017', alias='MONGO_DB_CONNECTION_URI')
     mongodb_pharmacy_database: str = Field(default='drug-service', alias='MONGODB_PHARMACY_DATABASE')
     mongodb_pharmacy_collection: str = Field(default='pharmacy_collection', alias='MONGODB_PHARMACY_COLLECTION')
     mongodb_product_collection: str = Field(
         default='products_collection',
         alias='MONGODB_PRODUCT_COLLECTION',
     )
+    mongodb_inventory_collection: str = Field(default='inventory_collection', alias='MONGODB_INVENTORY_COLLECTION')
+    mongodb_reservation_collection: str = Field(
+        default='reservations_collection',
+        alias='MONGODB_RESERVATION_COLLECTION',
+    )
+    reservation_ttl_seconds: float = Field(default=900.0, alias='RESERVATION_TTL_SECONDS')
+    reservation_max_ttl_seconds: float = Field(default=86400.0, alias='RESERVATION_MAX_TTL_SECONDS')
+    reservation_sweep_interval_seconds: float = Field(default=1.0, alias='RESERVATION_SWEEP_INTERVAL_SECONDS')
+    reservation_sweep_batch_size: int = Field(default=500, alias='RESERVATION_SWEEP_BATCH_SIZE')
+    reservation_purge_after_seconds: int = Field(default=86400, alias='RESERVATION_PURGE_AFTER_SECONDS')
+    reservation_return_lease_seconds: float = Field(default=30.0, alias='RESERVATION_RETURN_LEASE_SECONDS')
+    pharmacy_inventory_storage: Literal['embedded', 'collection'] = Field(
+        default='embedded',
+        alias='PHARMACY_INVENTORY_STORAGE',
+    )
+    inventory_migration_batch_size: int = Field(default=500, alias='INVENTORY_MIGRATION_BATCH_SIZE')
+    mongodb_max_pool_size: int = Field(default=100, alias='MONGODB_MAX_POOL_SIZE')
+    mongodb_min_pool_size: int = Field(default=0, alias='MONGODB_MIN_POOL_SIZE')
+    mongodb_max_idle_time_ms: int | None = Field(default=None, alias='MONGODB_MAX_IDLE_TIME_MS')
+    mongodb_wait_queue_timeout_ms: int | None = Field(default=None, alias='MONGODB_WAIT_QUEUE_TIMEOUT_MS')
+    mongodb_server_selection_timeout_ms: int = Field(default=3000, alias='MONGODB_SERVER_SELECTION_TIMEOUT_MS')
+    mongodb_compressors: str = Field(default='', alias='MONGODB_COMPRESSORS')
+    mongodb_insert_chunk_size: int = Field(default=1000, alias='MONGODB_INSERT_CHUNK_SIZE')
+    mongodb_bulk_write_chunk_size: int = Field(default=1000, alias='MONGODB_BULK_WRITE_CHUNK_SIZE')
+    mongodb_lazy_documents: bool = Field(default=False, alias='MONGODB_LAZY_DOCUMENTS')
+    products_import_batch_size: int = Field(default=1000, alias='PRODUCTS_IMPORT_BATCH_SIZE')
+    products_import_max_line_bytes: int = Field(default=65536, alias='PRODUCTS_IMPORT_MAX_LINE_BYTES')
+    inventory_bulk_max_operations: int = Field(default=5000, alias='INVENTORY_BULK_MAX_OPERATIONS')
+    search_page_size: int = Field(default=20, alias='SEARCH_PAGE_SIZE')
+    search_max_page_size: int = Field(default=100, alias='SEARCH_MAX_PAGE_SIZE')
+    search_index_batch_size: int = Field(default=1000, alias='SEARCH_INDEX_BATCH_SIZE')
+    export_batch_size: int = Field(default=1000, alias='EXPORT_BATCH_SIZE')
+    export_chunk_size: int = Field(default=65536, alias='EXPORT_CHUNK_SIZE')
+    search_index_rebuild_interval_seconds: int = Field(default=300, alias='SEARCH_INDEX_REBUILD_INTERVAL_SECONDS')
+    repository_load_batch_size: int = Field(default=100, alias='REPOSITORY_LOAD_BATCH_SIZE')
+    repository_cache_enabled: bool = Field(default=False, alias='REPOSITORY_CACHE_ENABLED')
+    repository_cache_ttl_seconds: float = Field(default=30.0, alias='REPOSITORY_CACHE_TTL_SECONDS')
+    repository_cache_max_size: int = Field(default=10000, alias='REPOSITORY_CACHE_MAX_SIZE')
+    mediator_dispatch_by_mro: bool = Field(default=False, alias='MEDIATOR_DISPATCH_BY_MRO')
+    event_delivery: Literal['bus', 'outbox'] = Field(default='bus', alias='EVENT_DELIVERY')
+    mongodb_outbox_collection: str = Field(default='outbox_collection', alias='MONGODB_OUTBOX_COLLECTION')
+    outbox_use_transactions: bool = Field(default=True, alias='OUTBOX_USE_TRANSACTIONS')
+    outbox_batch_size: int = Field(default=500, alias='OUTBOX_BATCH_SIZE')
+    outbox_lease_seconds: float = Field(default=30.0, alias='OUTBOX_LEASE_SECONDS')
+    outbox_poll_interval_seconds: float = Field(default=0.5, alias='OUTBOX_POLL_INTERVAL_SECONDS')
+    outbox_retry_delay_seconds: float = Field(default=5.0, alias='OUTBOX_RETRY_DELAY_SECONDS')
+    outbox_max_attempts: int = Field(default=10, alias='OUTBOX_MAX_ATTEMPTS')
+    outbox_done_ttl_seconds: int = Field(default=86400, alias='OUTBOX_DONE_TTL_SECONDS')
+    event_bus_enabled: bool = Field(default=True, alias='EVENT_BUS_ENABLED')
+    event_bus_queue_size: int = Field(default=10000, alias='EVENT_BUS_QUEUE_SIZE')
+    event_bus_workers: int = Field(default=4, alias='EVENT_BUS_WORKERS')
+    event_bus_handler_timeout_seconds: float = Field(default=5.0, alias='EVENT_BUS_HANDLER_TIMEOUT_SECONDS')
+    conflict_retry_attempts: int = Field(default=10, alias='CONFLICT_RETRY_ATTEMPTS')
+    conflict_retry_base_delay_seconds: float = Field(default=0.002, alias='CONFLICT_RETRY_BASE_DELAY_SECONDS')
+    conflict_retry_max_delay_seconds: float = Field(default=0.1, alias='CONFLICT_RETRY_MAX_DELAY_SECONDS')
+    mediator_singleflight_enabled: bool = Field(default=True, alias='MEDIATOR_SINGLEFLIGHT_ENABLED')
+    mediator_singleflight_max_waiters: int = Field(default=1000, alias='MEDIATOR_SINGLEFLIGHT_MAX_WAITERS')
+
+    @property
+    def outbox_enabled(self) -> bool:
+        return self.event_delivery == 'outbox' and self.repository_backend == 'mongo'
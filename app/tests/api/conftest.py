@@ -0,0 +1,18 @@
+from fastapi.testclient import TestClient
+from punq import Container
+from pytest import fixture
+
+from ...application.api.main import create_app
+from ...logic.containers.init import init_container
+
+
+def create_client(container: Container) -> TestClient:
+    # Без with: lifespan не запускается, приложение работает на контейнере теста
+    app = create_app()
+    app.dependency_overrides[init_container] = lambda: container
+    return TestClient(app)
+
+
+@fixture()
+def client(container: Container) -> TestClient:
+    return create_client(container)
@@ -0,0 +1,87 @@
+import pytest
+
+from ...application.api.etag import build_etag, etag_matches, parse_if_match
+
+
+def test_build_etag_is_strong_and_quoted():
+    assert build_etag(3) == '"v3"'
+    assert build_etag(3, ()) == '"v3"'
+
+
+def test_build_etag_depends_on_version_and_fields():
+    etag = build_etag(3, ('title', 'description'))
+
+    assert etag.startswith('"v3-') and etag.endswith('"')
+    assert ',' not in etag
+    assert etag == build_etag(3, ('title', 'description'))
+    assert etag != build_etag(4, ('title', 'description'))
+    assert etag != build_etag(3, ('title',))
+    assert etag != build_etag(3, ('description', 'title'))
+    assert etag != build_etag(3)
+
+
+@pytest.mark.parametrize('if_none_match', [
+    '"v3"',
+    'W/"v3"',
+    '*',
+    '  *  ',
+    '"v1", "v3"',
+    '"v1",W/"v3"',
+    '  "v3"  ',
+    '"v1" ,  "v3" ',
+])
+def test_etag_matches(if_none_match: str):
+    assert etag_matches(if_none_match, '"v3"')
+
+
+@pytest.mark.parametrize('if_none_match', [
+    '"v4"',
+    'v3',
+    '"V3"',
+    'w/"v3"',
+    '"v1", "v2"',
+    '"v3-0000abcd"',
+    '',
+])
+def test_etag_does_not_match(if_none_match: str):
+    assert not etag_matches(if_none_match, '"v3"')
+
+
+def test_etag_matches_fields_tag_only_for_same_fields():
+    etag = build_etag(3, ('title',))
+
+    assert etag_matches(etag, etag)
+    assert not etag_matches(build_etag(3), etag)
+    assert not etag_matches(build_etag(3, ('description',)), etag)
+
+
+@pytest.mark.parametrize('if_match, expected', [
+    ('"v3"', 3),
+    ('  "v3" ', 3),
+    ('"v3", "v3"', 3),
+    ('"v0"', 0),
+    ('*', None),
+    (' * ', None),
+])
+def test_parse_if_match(if_match: str, expected: int | None):
+    assert parse_if_match(if_match) == expected
+
+
+@pytest.mark.parametrize('if_match', [
+    'W/"v3"',
+    '"v3", W/"v3"',
+    '"v1", "v2"',
+    build_etag(3, ('title',)),
+    'v3',
+    '"3"',
+    '"v"',
+    '"v-1"',
+    '"v٣"',
+    '"v3',
+    '',
+    '"v3",',
+    '*, "v3"',
+])
+def test_parse_if_match_rejects_tags_without_single_strong_version(if_match: str):
+    with pytest.raises(ValueError):
+        parse_if_match(if_match)
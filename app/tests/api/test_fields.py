@@ -0,0 +1,68 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from ...application.api.dependecies.base import get_fields
+from ...domain.entities.pharmacy import PharmacyEntity
+from ...domain.values.product import Text, Title
+from ...infra.repositories.base import BasePharmacyRepo
+
+
+@pytest.mark.parametrize('fields, expected', [
+    (None, ()),
+    ('', ()),
+    ('title', ('title',)),
+    (' title , description ', ('title', 'description')),
+    ('title,,description,', ('title', 'description')),
+    ('title,description,title', ('title', 'description')),
+])
+def test_get_fields_parses_comma_separated_list(fields: str | None, expected: tuple[str, ...]):
+    assert get_fields(fields) == expected
+
+
+@pytest.mark.asyncio
+async def test_get_pharmacy_returns_only_requested_fields(client: TestClient, pharmacy_repository: BasePharmacyRepo):
+    pharmacy = PharmacyEntity(title=Title('Аптека'), description=Text('Описание'))
+    await pharmacy_repository.add_pharmacy(pharmacy)
+
+    response = client.get('/pharmacy/get-pharmacy', params={'pharmacy_oid': pharmacy.oid, 'fields': 'title,oid'})
+
+    assert response.status_code == 200
+    assert response.json() == {'title': 'Аптека', 'oid': pharmacy.oid}
+
+
+@pytest.mark.asyncio
+async def test_get_pharmacy_with_unknown_field_gives_bad_request(
+    client: TestClient,
+    pharmacy_repository: BasePharmacyRepo,
+):
+    pharmacy = PharmacyEntity(title=Title('Аптека'), description=Text('Описание'))
+    await pharmacy_repository.add_pharmacy(pharmacy)
+
+    response = client.get('/pharmacy/get-pharmacy', params={'pharmacy_oid': pharmacy.oid, 'fields': 'title,price'})
+
+    assert response.status_code == 400
+    assert response.json()['detail']['error'] == 'Неизвестные поля: price'
+
+
+@pytest.mark.asyncio
+async def test_get_product_maps_product_oid_field(client: TestClient):
+    created = client.post('/products/create-product', json={
+        'title': 'Аспирин',
+        'description': 'Описание',
+        'expiry_date': '2099-01-01T00:00:00',
+        'image_url': 'https://example.com/image.png',
+        'ingredients': 'Состав',
+        'manufacturer': 'Производитель',
+    })
+    assert created.status_code == 201
+    product_oid = created.json()['product_oid']
+
+    response = client.get('/products/get-product', params={'product_oid': product_oid, 'fields': 'product_oid,version'})
+
+    assert response.status_code == 200
+    assert response.json() == {'product_oid': product_oid, 'version': 0}
+
+    response = client.get('/products/get-product', params={'product_oid': product_oid, 'fields': 'title,_id'})
+
+    assert response.status_code == 400
+    assert response.json()['detail']['error'] == 'Неизвестные поля: _id'
@@ -0,0 +1,77 @@
+import json
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from ...infra.repositories.base import BaseProductRepo
+from ...logic.containers.init import _init_container
+from ...logic.exceptions.products import ProductNotSavedException
+from ...settings.config import Config
+from .conftest import create_client
+
+
+def product_line(title: str, expiry_date: datetime | None = None) -> str:
+    return json.dumps({
+        'title': title,
+        'description': 'Описание',
+        'expiry_date': (expiry_date or datetime.now() + timedelta(days=30)).isoformat(),
+        'image_url': 'https://example.com/image.png',
+        'ingredients': 'Состав',
+        'manufacturer': 'Производитель',
+    })
+
+
+def test_import_products_reports_errors_by_line(client: TestClient):
+    body = '\n'.join([
+        product_line('Аспирин'),
+        '{"title": ',
+        '',
+        json.dumps({'title': 'Без полей'}),
+        product_line('Аспирин'),
+        product_line('Просроченный', expiry_date=datetime.now() - timedelta(days=1)),
+        product_line('Парацетамол'),
+    ])
+
+    response = client.post('/products/import-products', content=body.encode())
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result['imported'] == 2
+    assert [error['line'] for error in result['errors']] == [2, 4, 5, 6]
+    assert 'Аспирин' in result['errors'][2]['error']
+
+
+def test_import_products_reports_storage_error_for_batch_lines(monkeypatch):
+    container = _init_container(Config(REPOSITORY_BACKEND='memory', PRODUCTS_IMPORT_BATCH_SIZE=2))
+    repository = container.resolve(BaseProductRepo)
+    add_products_bulk = repository.add_products_bulk
+
+    async def failing_add_products_bulk(products):
+        if any(product.title.as_generic_type() == 'Сбой' for product in products):
+            raise ProductNotSavedException(title='Сбой', reason='хранилище недоступно')
+
+        return await add_products_bulk(products)
+
+    monkeypatch.setattr(repository, 'add_products_bulk', failing_add_products_bulk)
+
+    body = '\n'.join([product_line('Первый'), product_line('Второй'), product_line('Сбой'), product_line('Третий')])
+    response = create_client(container).post('/products/import-products', content=body.encode())
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result['imported'] == 2
+    assert [error['line'] for error in result['errors']] == [3, 4]
+    assert 'хранилище недоступно' in result['errors'][0]['error']
+
+
+def test_import_products_rejects_too_long_lines():
+    container = _init_container(Config(REPOSITORY_BACKEND='memory', PRODUCTS_IMPORT_MAX_LINE_BYTES=512))
+    body = '\n'.join([product_line('Первый'), product_line('Длинный' * 100), product_line('Второй')])
+
+    response = create_client(container).post('/products/import-products', content=body.encode())
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result['imported'] == 2
+    assert [error['line'] for error in result['errors']] == [2]
+    assert '512' in result['errors'][0]['error']
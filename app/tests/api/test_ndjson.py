@@ -0,0 +1,36 @@
+import pytest
+
+from ...application.api.ndjson import iter_ndjson_lines
+
+
+async def read_lines(chunks: list[bytes], max_line_bytes: int = 10) -> list[tuple[int, bytes | None]]:
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    return [line async for line in iter_ndjson_lines(stream(), max_line_bytes)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('chunks', [
+    [b'{"a": 1}\n\n{"b": 2}\n{"c": 3}'],
+    [b'{"a"', b': 1}\n', b'\n{"b": 2}', b'\n{"c": 3}'],
+    [bytes([byte]) for byte in b'{"a": 1}\n\n{"b": 2}\n{"c": 3}'],
+])
+async def test_iter_ndjson_lines_splits_across_chunks(chunks: list[bytes]):
+    assert await read_lines(chunks) == [(1, b'{"a": 1}'), (3, b'{"b": 2}'), (4, b'{"c": 3}')]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('chunks', [
+    [b'{"a": 1}\n{"long": 12345}\n{"c": 3}\n{"long": 67890}'],
+    [b'{"a": 1}\n{"lo', b'ng": 1', b'2345}\n{"c": 3}\n{"long"', b': 67890}'],
+    [bytes([byte]) for byte in b'{"a": 1}\n{"long": 12345}\n{"c": 3}\n{"long": 67890}'],
+])
+async def test_iter_ndjson_lines_rejects_too_long_lines(chunks: list[bytes]):
+    assert await read_lines(chunks) == [(1, b'{"a": 1}'), (2, None), (3, b'{"c": 3}'), (4, None)]
+
+
+@pytest.mark.asyncio
+async def test_iter_ndjson_lines_accepts_line_of_max_length():
+    assert await read_lines([b'0123456789\n', b'01234', b'56789']) == [(1, b'0123456789'), (2, b'0123456789')]
@@ -0,0 +1,80 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from ...domain.entities.pharmacy import PharmacyEntity
+from ...domain.values.product import Price, Text, Title
+from ...infra.repositories.base import BasePharmacyRepo
+from ...logic.pagination import encode_continuation_token
+
+TAMPERED_TOKEN = encode_continuation_token(1.0, 'a')[:-3] + '$$$'
+
+
+async def add_pharmacies(pharmacy_repository: BasePharmacyRepo, count: int) -> list[str]:
+    pharmacy_oids = []
+
+    for number in range(count):
+        # Названия одной длины с общим словом дают при поиске по нему одинаковый score
+        pharmacy = PharmacyEntity(title=Title(f'Аптека {number}'), description=Text('Описание'))
+        await pharmacy_repository.add_pharmacy(pharmacy)
+        pharmacy_oids.append(pharmacy.oid)
+
+    return pharmacy_oids
+
+
+def read_all_pages(send_page) -> list[list[dict]]:
+    pages, continuation_token = [], None
+
+    while True:
+        response = send_page(continuation_token)
+        assert response.status_code == 200
+        body = response.json()
+        pages.append(body)
+
+        continuation_token = body['continuation_token']
+        if continuation_token is None:
+            return pages
+
+
+@pytest.mark.parametrize('method, url, params, json', [
+    ('post', '/products/search-product', None, {'product_title': 'Аспирин', 'continuation_token': TAMPERED_TOKEN}),
+    ('post', '/pharmacy/find-pharmacy', None, {'pharmacy_title': 'Аптека', 'continuation_token': TAMPERED_TOKEN}),
+    ('get', '/products/offers', {'product_oid': 'product', 'continuation_token': TAMPERED_TOKEN}, None),
+    ('get', '/pharmacy/inventory', {'pharmacy_oid': 'pharmacy', 'continuation_token': TAMPERED_TOKEN}, None),
+])
+def test_tampered_continuation_token_gives_bad_request(client: TestClient, method, url, params, json):
+    response = client.request(method, url, params=params, json=json)
+
+    assert response.status_code == 400
+    assert response.json()['detail']['error'] == 'Неверный токен продолжения выдачи'
+
+
+@pytest.mark.asyncio
+async def test_offers_pages_split_equal_prices_by_pharmacy_oid(
+    client: TestClient,
+    pharmacy_repository: BasePharmacyRepo,
+):
+    pharmacy_oids = await add_pharmacies(pharmacy_repository, count=5)
+    for pharmacy_oid in pharmacy_oids:
+        await pharmacy_repository.add_product_to_pharmacy(pharmacy_oid, 'product', Price(100.0), count=1)
+
+    pages = read_all_pages(lambda continuation_token: client.get(
+        '/products/offers',
+        params={'product_oid': 'product', 'page_size': 2, 'continuation_token': continuation_token},
+    ))
+
+    assert [len(page['offers']) for page in pages] == [2, 2, 1]
+    assert [offer['pharmacy_oid'] for page in pages for offer in page['offers']] == sorted(pharmacy_oids)
+
+
+@pytest.mark.asyncio
+async def test_search_pages_split_equal_scores_by_oid(client: TestClient, pharmacy_repository: BasePharmacyRepo):
+    pharmacy_oids = await add_pharmacies(pharmacy_repository, count=4)
+
+    pages = read_all_pages(lambda continuation_token: client.post(
+        '/pharmacy/find-pharmacy',
+        json={'pharmacy_title': 'Аптека', 'page_size': 2, 'continuation_token': continuation_token},
+    ))
+
+    # Полная последняя страница тоже выдает токен, следующая за ней пуста
+    assert [len(page['pharmacies']) for page in pages] == [2, 2, 0]
+    assert [pharmacy['oid'] for page in pages for pharmacy in page['pharmacies']] == sorted(pharmacy_oids)
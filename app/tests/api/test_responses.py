@@ -0,0 +1,72 @@
+import json
+from datetime import datetime
+
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from ...application.api.products.schemas import PartialProductResponseSchema
+from ...application.api.responses import render_json, render_model
+
+
+def test_render_model_writes_json_with_status():
+    model = PartialProductResponseSchema.model_construct(product_oid='oid', title='Аспирин', version=2)
+
+    response = render_model(model, status_code=status.HTTP_201_CREATED)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.media_type == 'application/json'
+    assert json.loads(response.body) == {
+        'product_oid': 'oid',
+        'title': 'Аспирин',
+        'description': None,
+        'expiry_date': None,
+        'image_url': None,
+        'ingredients': None,
+        'manufacturer': None,
+        'created_at': None,
+        'version': 2,
+    }
+
+
+def test_render_model_excludes_unset_fields_of_projection():
+    model = PartialProductResponseSchema.from_document({
+        'oid': 'oid',
+        'title': 'Аспирин',
+        'expiry_date': datetime(2030, 1, 2, 3, 4, 5),
+    })
+
+    response = render_model(model, exclude_unset=True)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert json.loads(response.body) == {
+        'product_oid': 'oid',
+        'title': 'Аспирин',
+        'expiry_date': '2030-01-02T03:04:05',
+    }
+
+
+def test_render_model_matches_pydantic_dump():
+    model = PartialProductResponseSchema(title='Аспирин', created_at=datetime(2030, 1, 1))
+
+    assert render_model(model).body == model.model_dump_json().encode()
+
+
+def test_render_json_writes_plain_data():
+    response = render_json({'calls': 3, 'stats': {1: 'a'}}, status_code=status.HTTP_202_ACCEPTED)
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.media_type == 'application/json'
+    assert json.loads(response.body) == {'calls': 3, 'stats': {'1': 'a'}}
+
+
+def test_handlers_return_explicit_responses(client: TestClient):
+    monitoring = client.get('/monitoring/singleflight')
+
+    assert monitoring.status_code == status.HTTP_200_OK
+    assert set(monitoring.json()) == {'calls', 'collapsed', 'overflow', 'in_flight'}
+
+    created = client.post('/pharmacy/', json={'title': 'Аптека', 'description': 'Описание'})
+    deleted = client.post('/pharmacy/delete-pharmacy', json={'pharmacy_oid': created.json()['oid']})
+
+    assert deleted.status_code == status.HTTP_204_NO_CONTENT
+    assert deleted.content == b''
@@ -1,8 +1,7 @@
 from punq import Container
 from pytest import fixture
 
-from ..infra.repositories.pharmacy import BasePharmacyRepo
-from ..infra.repositories.products import BaseProductRepo
+from ..infra.repositories.base import BasePharmacyRepo, BaseProductRepo
 from ..logic.mediator import Mediator
 from .fixtures import init_dummy_container
 
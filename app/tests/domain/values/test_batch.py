@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+from ....domain.exceptions.product import (EmptyTextException,
+                                           ExpiresDateException,
+                                           TitleTooLongException)
+from ....domain.values.batch import (merge_row_errors, validate_expiry_dates,
+                                     validate_texts, validate_titles)
+from ....domain.values.product import Title
+
+
+def test_batch_validation_returns_first_error_per_row():
+    now = datetime.now()
+    errors = merge_row_errors((
+        validate_titles(['Товар', '', 'x' * 256, 'Товар']),
+        validate_texts(['Описание', 'Описание', '', '']),
+        validate_expiry_dates([now, now, now, now - timedelta(days=1)], now=now),
+    ))
+
+    assert [type(error) for error in errors] == [
+        type(None),
+        EmptyTextException,
+        TitleTooLongException,
+        EmptyTextException,
+    ]
+    assert isinstance(validate_expiry_dates([now - timedelta(days=1)], now=now)[0], ExpiresDateException)
+
+
+def test_from_validated_skips_validation():
+    title = Title.from_validated('')
+
+    assert title == Title.from_validated('')
+    assert title.as_generic_type() == ''
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import pytest
 
@@ -15,7 +15,7 @@ from ....domain.values.product import ExpiresDate, Price, Text, Title
 def test_create_product_success():
     title = Title('Синупрет драже')
     description = Text('Лечит все болезни')
-    expiry_date = ExpiresDate(datetime(2025, 1, 7))
+    expiry_date = ExpiresDate(datetime.now() + timedelta(days=365))
     image_url = Text('https://letsenhance.io/static/73136da51c245e80edc6ccfe44888a99/1015f/MainBefore.jpg')
     ingredients = Text("...")
     manufacturer = Text("Китай")
@@ -66,7 +66,7 @@ def test_create_pharmacy():
 def test_add_product_to_pharmacy():
     title = Title('Синупрет драже')
     description = Text('Лечит все болезни')
-    expiry_date = ExpiresDate(datetime(2025, 1, 7))
+    expiry_date = ExpiresDate(datetime.now() + timedelta(days=365))
     image_url = Text('https://letsenhance.io/static/73136da51c245e80edc6ccfe44888a99/1015f/MainBefore.jpg')
     ingredients = Text("...")
     manufacturer = Text("Китай")
@@ -88,15 +88,15 @@ def test_add_product_to_pharmacy():
         description=description_pharmacy,
     )
     price = Price(100.020)
-    pharmacy.add_product(product=product, price=price)
+    pharmacy.add_product_with_price(product=product, price=price.as_generic_type())
 
-    assert product in pharmacy.products
+    assert [position['product_oid'] for position in pharmacy.products] == [product.oid]
 
 
 def test_new_product_events():
     title = Title('Синупрет драже')
     description = Text('Лечит все болезни')
-    expiry_date = ExpiresDate(datetime(2025, 1, 7))
+    expiry_date = ExpiresDate(datetime.now() + timedelta(days=365))
     image_url = Text('https://letsenhance.io/static/73136da51c245e80edc6ccfe44888a99/1015f/MainBefore.jpg')
     ingredients = Text("...")
     manufacturer = Text("Китай")
@@ -118,7 +118,7 @@ def test_new_product_events():
         description=description_pharmacy,
     )
     price = Price(100.020)
-    pharmacy.add_product(product, price)
+    pharmacy.add_product_with_price(product, price.as_generic_type())
 
     events = pharmacy.pull_events()
     pulled_events = pharmacy.pull_events()
@@ -130,3 +130,12 @@ def test_new_product_events():
     assert new_event.product_oid == product.oid
     assert new_event.title == product.title
     assert new_event.pharmacy_oid == pharmacy.oid
+
+
+def test_entities_and_values_are_slotted():
+    pharmacy = PharmacyEntity(title=Title('apteka'), description=Text('apteka'))
+
+    assert not hasattr(pharmacy, '__dict__')
+    assert not hasattr(pharmacy.title, '__dict__')
+    assert pharmacy._events is None
+    assert pharmacy.pull_events() == []
@@ -0,0 +1,157 @@
+from types import SimpleNamespace
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+COMPARISONS = {
+    '$gt': lambda value, bound: value is not None and value > bound,
+    '$gte': lambda value, bound: value is not None and value >= bound,
+    '$lte': lambda value, bound: value is not None and value <= bound,
+    '$in': lambda value, values: value in values,
+}
+
+
+def matches_condition(value, condition) -> bool:
+    if not isinstance(condition, dict):
+        return value == condition
+
+    for operator, argument in condition.items():
+        if operator == '$not':
+            if matches_condition(value, argument):
+                return False
+        elif not COMPARISONS[operator](value, argument):
+            return False
+
+    return True
+
+
+def matches(document: dict, query: dict) -> bool:
+    return all(matches_condition(document.get(key), condition) for key, condition in query.items())
+
+
+def project(document: dict, projection: dict | None) -> dict:
+    document = {key: value for key, value in document.items() if key != '_id'}
+
+    if not projection:
+        return document
+
+    if any(value for key, value in projection.items() if key != '_id'):
+        return {key: value for key, value in document.items() if projection.get(key)}
+
+    return {key: value for key, value in document.items() if projection.get(key, 1)}
+
+
+def apply_update(document: dict, update: dict) -> None:
+    for key, value in update.get('$set', {}).items():
+        document[key] = value
+
+    for key, value in update.get('$inc', {}).items():
+        document[key] = document.get(key, 0) + value
+
+    for key, value in update.get('$min', {}).items():
+        document[key] = min(document[key], value) if key in document else value
+
+    for key in update.get('$unset', {}):
+        document.pop(key, None)
+
+
+class DocumentCursor:
+    def __init__(self, documents: list[dict], projection: dict | None):
+        self.documents = documents
+        self.projection = projection
+
+    def sort(self, key, direction: int = 1) -> 'DocumentCursor':
+        keys = [(key, direction)] if isinstance(key, str) else key
+
+        for name, order in reversed(keys):
+            self.documents.sort(key=lambda document: document[name], reverse=order < 0)
+
+        return self
+
+    def limit(self, limit: int) -> 'DocumentCursor':
+        self.documents = self.documents[:limit]
+        return self
+
+    async def __aiter__(self):
+        for document in self.documents:
+            yield project(document, self.projection)
+
+
+class DocumentCollection:
+    """
+    Коллекция MongoDB в памяти для тестов репозиториев: только те фильтры и операторы, которые они используют.
+    """
+
+    def __init__(self, documents: list[dict] = (), unique_keys: tuple[str, ...] = ()):
+        self.documents = [dict(document) for document in documents]
+        self.unique_keys = unique_keys
+
+    def _find(self, query: dict) -> dict | None:
+        return next((document for document in self.documents if matches(document, query)), None)
+
+    def find(self, query: dict, projection: dict | None = None, **kwargs) -> DocumentCursor:
+        return DocumentCursor([document for document in self.documents if matches(document, query)], projection)
+
+    async def find_one(self, query: dict, projection: dict | None = None, session=None) -> dict | None:
+        document = self._find(query)
+        return None if document is None else project(document, projection)
+
+    async def count_documents(self, query: dict, limit: int = 0, session=None) -> int:
+        return sum(matches(document, query) for document in self.documents)
+
+    async def insert_one(self, document: dict, session=None):
+        if self.unique_keys and self._find({key: document[key] for key in self.unique_keys}) is not None:
+            raise DuplicateKeyError('E11000 duplicate key')
+
+        self.documents.append(dict(document))
+
+    async def update_one(self, query: dict, update: dict, session=None):
+        document = self._find(query)
+
+        if document is not None:
+            apply_update(document, update)
+
+        return SimpleNamespace(matched_count=int(document is not None), modified_count=int(document is not None))
+
+    async def update_many(self, query: dict, update: dict, session=None):
+        documents = [document for document in self.documents if matches(document, query)]
+
+        for document in documents:
+            apply_update(document, update)
+
+        return SimpleNamespace(matched_count=len(documents), modified_count=len(documents))
+
+    async def find_one_and_update(
+        self,
+        query: dict,
+        update: dict,
+        projection: dict | None = None,
+        return_document: bool = ReturnDocument.BEFORE,
+        session=None,
+    ) -> dict | None:
+        document = self._find(query)
+
+        if document is None:
+            return None
+
+        before = project(document, projection)
+        apply_update(document, update)
+
+        return project(document, projection) if return_document == ReturnDocument.AFTER else before
+
+    async def find_one_and_delete(self, query: dict, projection: dict | None = None, session=None) -> dict | None:
+        document = self._find(query)
+
+        if document is None:
+            return None
+
+        self.documents.remove(document)
+        return project(document, projection)
+
+    async def delete_one(self, query: dict, session=None):
+        document = self._find(query)
+
+        if document is not None:
+            self.documents.remove(document)
+
+        return SimpleNamespace(deleted_count=int(document is not None))
@@ -0,0 +1,88 @@
+import pytest
+from pymongo.errors import BulkWriteError
+
+from ...domain.values.product import Price
+from ...infra.repositories.bulk import (InventoryOperation, map_write_errors,
+                                        plan_inventory_operations)
+from ...infra.repositories.mongo import MongoDBPharmacyRepo
+from ...logic.exceptions.pharmacy import InventoryOperationNotSavedException
+
+
+class PharmacyCollection:
+    """
+    Коллекция аптек со встроенными позициями, в которой отклоняется каждая запись в аптеку broken_oid.
+    """
+
+    def __init__(self, documents: list[dict], broken_oid: str):
+        self.documents = documents
+        self.broken_oid = broken_oid
+        self.written = []
+
+    async def find(self, query: dict, projection: dict):
+        for document in self.documents:
+            if document['oid'] in query['oid']['$in']:
+                yield document
+
+    async def bulk_write(self, writes: list, ordered: bool):
+        assert not ordered
+        write_errors = []
+
+        for index, write in enumerate(writes):
+            if write._filter['oid'] == self.broken_oid:
+                write_errors.append({'index': index, 'code': 121, 'errmsg': 'Document failed validation'})
+            else:
+                self.written.append(write._filter['oid'])
+
+        if write_errors:
+            raise BulkWriteError({'writeErrors': write_errors, 'nInserted': 0})
+
+
+def test_map_write_errors_reports_every_operation_of_failed_write():
+    changes, _ = plan_inventory_operations(
+        [
+            InventoryOperation('first', 'a', 'set_price', price=Price(1)),
+            InventoryOperation('second', 'a', 'set_price', price=Price(1)),
+            InventoryOperation('first', 'b', 'set_count', count=1),
+            InventoryOperation('first', 'b', 'remove'),
+        ],
+        {'first': {'a', 'b'}, 'second': {'a'}},
+    )
+
+    assert changes['first'].indexes_of(changes['first'].changed_product_oids) == [0]
+    assert changes['first'].indexes_of(changes['first'].removals) == [2, 3]
+
+    errors = map_write_errors([[0], [2, 3], [1]], [{'index': 1, 'code': 121, 'errmsg': 'Document failed validation'}])
+
+    assert sorted(errors) == [2, 3]
+    assert all(isinstance(error, InventoryOperationNotSavedException) for error in errors.values())
+    assert 'Document failed validation' in errors[2].message
+
+
+@pytest.mark.asyncio
+async def test_failed_inventory_write_is_reported_per_operation_and_later_chunks_run():
+    collection = PharmacyCollection(
+        [
+            {'oid': 'good', 'products': [{'product_oid': 'a'}, {'product_oid': 'b'}]},
+            {'oid': 'broken', 'products': [{'product_oid': 'a'}]},
+            {'oid': 'later', 'products': [{'product_oid': 'a'}]},
+        ],
+        broken_oid='broken',
+    )
+    repository = MongoDBPharmacyRepo(
+        mongo_db_client={'db': {'pharmacies': collection}},
+        mongo_db_db_name='db',
+        mongo_db_collection_name='pharmacies',
+        bulk_write_chunk_size=3,
+    )
+
+    errors = await repository.apply_inventory_operations([
+        InventoryOperation('good', 'a', 'set_price', price=Price(10)),
+        InventoryOperation('broken', 'a', 'set_price', price=Price(10)),
+        InventoryOperation('broken', 'a', 'set_count', count=3),
+        InventoryOperation('later', 'a', 'remove'),
+        InventoryOperation('good', 'b', 'remove'),
+    ])
+
+    assert sorted(errors) == [1, 2]
+    assert all(isinstance(error, InventoryOperationNotSavedException) for error in errors.values())
+    assert collection.written == ['good', 'later', 'good']
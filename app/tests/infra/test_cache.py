@@ -0,0 +1,41 @@
+from ...infra.cache.lru import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cache_expires_entries():
+    clock = FakeClock()
+    cache = LRUCache(max_size=10, ttl_seconds=5, clock=clock)
+    cache.put('a', 1)
+
+    assert cache.get('a') == 1
+    clock.now = 5
+    assert cache.get('a') is None
+    assert cache.stats.expirations == 1
+
+
+def test_cache_evicts_least_recently_used_by_weight():
+    cache = LRUCache(max_size=3, ttl_seconds=60, weigher=len)
+    cache.put('a', [1])
+    cache.put('b', [1])
+    cache.get('a')
+    cache.put('c', [1, 2])
+
+    assert cache.get('b') is None
+    assert cache.get('a') == [1]
+    assert cache.size == 3
+
+
+def test_cache_skips_put_after_invalidation():
+    cache = LRUCache(max_size=10, ttl_seconds=60)
+    generation = cache.generation
+    cache.invalidate('a')
+    cache.put('a', 'stale', generation=generation)
+
+    assert cache.get('a') is None
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+from ...domain.entities.product import ProductEntity
+from ...domain.values.product import ExpiresDate, Text, Title
+from ...infra.repositories.mongo import map_insert_errors
+from ...logic.exceptions.products import (
+    ProductNotSavedException, ProductWithThatTitleAlreadyExistsException)
+
+
+def create_product(title: str) -> ProductEntity:
+    return ProductEntity.create_product(
+        title=Title(title),
+        description=Text('...'),
+        expiry_date=ExpiresDate(datetime.now() + timedelta(days=30)),
+        image_url=Text('...'),
+        ingredients=Text('...'),
+        manufacturer=Title('...'),
+    )
+
+
+def test_map_insert_errors_separates_duplicates_from_other_failures():
+    products = [create_product(title) for title in ('Первый', 'Второй', 'Третий')]
+
+    errors = map_insert_errors(
+        products,
+        [
+            {'index': 0, 'code': 11000, 'keyPattern': {'title': 1}, 'errmsg': 'E11000 duplicate key'},
+            {'index': 1, 'code': 11000, 'keyPattern': {'oid': 1}, 'errmsg': 'E11000 duplicate key oid'},
+            {'index': 2, 'code': 121, 'errmsg': 'Document failed validation'},
+        ],
+        offset=10,
+    )
+
+    assert sorted(errors) == [10, 11, 12]
+    assert isinstance(errors[10], ProductWithThatTitleAlreadyExistsException)
+    assert errors[10].title == 'Первый'
+    assert isinstance(errors[11], ProductNotSavedException)
+    assert isinstance(errors[12], ProductNotSavedException)
+    assert 'Document failed validation' in errors[12].message
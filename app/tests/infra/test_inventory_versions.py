@@ -0,0 +1,113 @@
+from datetime import datetime
+
+import pytest
+
+from ...domain.values.product import Price
+from ...infra.repositories.inventory import MongoDBInventoryPharmacyRepo
+from ...logic.exceptions.pharmacy import (PharmacyVersionConflictException,
+                                          ProductAlreadyInPharmacyException)
+from ...logic.exceptions.products import ProductNotFoundException
+from .documents import DocumentCollection
+
+
+@pytest.fixture()
+def pharmacies() -> DocumentCollection:
+    return DocumentCollection([{
+        'oid': 'pharmacy',
+        'title': 'Аптека',
+        'description': 'Описание',
+        'products': [],
+        'created_at': datetime(2030, 1, 1),
+        'version': 3,
+    }])
+
+
+@pytest.fixture()
+def repository(pharmacies: DocumentCollection) -> MongoDBInventoryPharmacyRepo:
+    inventory = DocumentCollection(
+        [{'pharmacy_oid': 'pharmacy', 'product_oid': 'product', 'price': 10.0, 'count': 1, 'updated_at': None}],
+        unique_keys=('pharmacy_oid', 'product_oid'),
+    )
+
+    return MongoDBInventoryPharmacyRepo(
+        mongo_db_client={'db': {'pharmacies': pharmacies, 'inventory': inventory}},
+        mongo_db_db_name='db',
+        mongo_db_collection_name='pharmacies',
+        mongo_db_inventory_collection_name='inventory',
+    )
+
+
+async def get_version(pharmacies: DocumentCollection) -> int:
+    return (await pharmacies.find_one({'oid': 'pharmacy'}))['version']
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('expected_version', [None, 3])
+async def test_position_write_bumps_version_once(
+    repository: MongoDBInventoryPharmacyRepo,
+    pharmacies: DocumentCollection,
+    expected_version: int | None,
+):
+    def if_match(version: int) -> int | None:
+        return version if expected_version is not None else None
+
+    await repository.update_product_price_in_pharmacy('pharmacy', 'product', Price(20), if_match(3))
+    assert await get_version(pharmacies) == 4
+
+    await repository.add_product_to_pharmacy('pharmacy', 'other', Price(5), count=1, expected_version=if_match(4))
+    assert await get_version(pharmacies) == 5
+
+    await repository.delete_product_in_pharmacy('pharmacy', 'other', expected_version=if_match(5))
+    assert await get_version(pharmacies) == 6
+
+
+@pytest.mark.asyncio
+async def test_failed_versioned_write_returns_claimed_version(
+    repository: MongoDBInventoryPharmacyRepo,
+    pharmacies: DocumentCollection,
+):
+    with pytest.raises(ProductNotFoundException):
+        await repository.update_product_price_in_pharmacy('pharmacy', 'missing', Price(20), expected_version=3)
+
+    with pytest.raises(ProductNotFoundException):
+        await repository.delete_product_in_pharmacy('pharmacy', 'missing', expected_version=3)
+
+    with pytest.raises(ProductAlreadyInPharmacyException):
+        await repository.add_product_to_pharmacy('pharmacy', 'product', Price(5), count=1, expected_version=3)
+
+    assert await get_version(pharmacies) == 3
+
+    await repository.update_product_price_in_pharmacy('pharmacy', 'product', Price(20), expected_version=3)
+    assert await get_version(pharmacies) == 4
+
+
+@pytest.mark.asyncio
+async def test_stale_version_leaves_position_and_version(
+    repository: MongoDBInventoryPharmacyRepo,
+    pharmacies: DocumentCollection,
+):
+    with pytest.raises(PharmacyVersionConflictException):
+        await repository.update_product_price_in_pharmacy('pharmacy', 'product', Price(20), expected_version=2)
+
+    assert await get_version(pharmacies) == 3
+    positions = [position async for position in repository.get_pharmacy_inventory('pharmacy', limit=10)]
+    assert positions[0]['price'] == 10.0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('expected_version', [None, 3])
+async def test_price_update_builds_pharmacy_from_version_bump(
+    repository: MongoDBInventoryPharmacyRepo,
+    pharmacies: DocumentCollection,
+    monkeypatch: pytest.MonkeyPatch,
+    expected_version: int | None,
+):
+    async def find_one(*args, **kwargs):
+        raise AssertionError('аптека читается отдельным запросом')
+
+    monkeypatch.setattr(pharmacies, 'find_one', find_one)
+
+    pharmacy = await repository.update_product_price_in_pharmacy('pharmacy', 'product', Price(20), expected_version)
+
+    assert (pharmacy.oid, pharmacy.title, pharmacy.version) == ('pharmacy', 'Аптека', 4)
+    assert [(position['product_oid'], position['price']) for position in pharmacy.products] == [('product', 20.0)]
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import bson
+
+from ...domain.entities.product import ProductEntity
+from ...domain.values.product import ExpiresDate, Text, Title
+from ...infra.repositories.cached import copy_pharmacy, weigh_pharmacy
+from ...infra.repositories.lazy import (convert_raw_document_to_pharmacy,
+                                        split_pharmacy_document)
+
+
+def build_pharmacy_document(products: list[dict]) -> dict:
+    return {
+        '_id': bson.ObjectId(),
+        'oid': 'pharmacy',
+        'title': 'Аптека',
+        'description': 'Описание',
+        'products': products,
+        'created_at': datetime(2024, 1, 1),
+    }
+
+
+def test_lazy_pharmacy_decodes_products_on_first_access():
+    products = [{'product_oid': f'product-{index}', 'price': float(index), 'count': index} for index in range(3)]
+    pharmacy = convert_raw_document_to_pharmacy(split_pharmacy_document(bson.encode(build_pharmacy_document(products))))
+
+    assert pharmacy.title == 'Аптека'
+    assert pharmacy.created_at == datetime(2024, 1, 1)
+    assert not pharmacy.is_hydrated
+    assert weigh_pharmacy(pharmacy) == 4
+
+    cached_copy = copy_pharmacy(pharmacy)
+
+    assert pharmacy.products == products
+    assert pharmacy.is_hydrated
+    assert not cached_copy.is_hydrated
+
+    pharmacy.add_product_with_price(
+        product=ProductEntity(
+            title=Title('Товар'),
+            description=Text('Описание'),
+            expiry_date=ExpiresDate(datetime(2100, 1, 1)),
+            image_url=Text('url'),
+            ingredients=Text('...'),
+            manufacturer=Text('Производитель'),
+        ),
+        price=10.0,
+    )
+
+    assert len(pharmacy.products) == 4
+    assert cached_copy.products == products
+
+
+def test_pharmacy_without_products_is_not_lazy():
+    pharmacy_document = build_pharmacy_document([])
+    del pharmacy_document['products']
+    document = split_pharmacy_document(bson.encode(pharmacy_document))
+
+    assert document.raw_products is None
+    assert convert_raw_document_to_pharmacy(document).products == []
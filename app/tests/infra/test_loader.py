@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+from ...infra.repositories.loader import BatchLoader
+
+
+@pytest.mark.asyncio
+async def test_loader_coalesces_concurrent_loads():
+    calls = []
+
+    async def batch_load(keys: list[str]) -> dict[str, str]:
+        calls.append(keys)
+        return {key: key.upper() for key in keys if key != 'missing'}
+
+    loader = BatchLoader(batch_load, max_batch_size=3)
+
+    results = await asyncio.gather(*(loader.load(key) for key in ('a', 'b', 'a', 'missing', 'c')))
+
+    assert results == ['A', 'B', 'A', None, 'C']
+    assert calls == [['a', 'b', 'missing'], ['c']]
+
+
+@pytest.mark.asyncio
+async def test_loader_propagates_errors_to_every_waiter():
+    async def batch_load(keys: list[str]) -> dict[str, str]:
+        raise RuntimeError('boom')
+
+    loader = BatchLoader(batch_load)
+
+    results = await asyncio.gather(loader.load('a'), loader.load('b'), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
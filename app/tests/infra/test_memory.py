@@ -0,0 +1,164 @@
+import pytest
+
+from ...domain.entities.pharmacy import PharmacyEntity
+from ...domain.values.product import Price, Text, Title
+from ...infra.repositories.bulk import InventoryOperation
+from ...infra.repositories.memory import MemoryPharmacyRepo
+from ...logic.exceptions.pharmacy import (
+    PharmacyByTitleAlreadyExistsException, PharmacyNotFoundException,
+    ProductAlreadyInPharmacyException)
+from ...logic.exceptions.products import ProductNotFoundException
+
+
+@pytest.mark.asyncio
+async def test_memory_pharmacy_positions():
+    repository = MemoryPharmacyRepo()
+    pharmacy = PharmacyEntity(title=Title('Аптека'), description=Text('...'))
+    await repository.add_pharmacy(pharmacy)
+
+    await repository.add_product_to_pharmacy(pharmacy.oid, 'product', Price(10), count=3)
+    with pytest.raises(ProductAlreadyInPharmacyException):
+        await repository.add_product_to_pharmacy(pharmacy.oid, 'product', Price(10), count=3)
+
+    updated = await repository.update_product_price_in_pharmacy(pharmacy.oid, 'product', Price(15))
+    assert updated.products == [{'product_oid': 'product', 'price': 15.0, 'count': 3}]
+
+    updated.products.clear()
+    assert len((await repository.get_pharmacy_by_oid(pharmacy.oid)).products) == 1
+
+    await repository.delete_product_in_pharmacy(pharmacy.oid, 'product')
+    with pytest.raises(ProductNotFoundException):
+        await repository.update_product_price_in_pharmacy(pharmacy.oid, 'product', Price(15))
+
+
+@pytest.mark.asyncio
+async def test_memory_pharmacy_title_index():
+    repository = MemoryPharmacyRepo()
+    first = PharmacyEntity(title=Title('Первая'), description=Text('...'))
+    second = PharmacyEntity(title=Title('Вторая'), description=Text('...'))
+    await repository.add_pharmacy(first)
+    await repository.add_pharmacy(second)
+
+    with pytest.raises(PharmacyByTitleAlreadyExistsException):
+        await repository.update_pharmacy(second.oid, Title('Первая'), Text('...'))
+
+    await repository.update_pharmacy(second.oid, Title('Третья'), Text('...'))
+    await repository.delete_pharmacy(first.oid)
+
+    assert not await repository.check_pharmacy_exists_by_title('Первая')
+    assert not await repository.check_pharmacy_exists_by_title('Вторая')
+    assert [document['oid'] async for document in repository.find_pharmacy('третья', limit=10)] == [second.oid]
+
+
+@pytest.mark.asyncio
+async def test_memory_pharmacy_titles_compared_as_stored():
+    repository = MemoryPharmacyRepo()
+    composed = PharmacyEntity(title=Title('Аптека \u0439'), description=Text('...'))
+    decomposed = PharmacyEntity(title=Title('Аптека \u0438\u0306'), description=Text('...'))
+    await repository.add_pharmacy(composed)
+    await repository.add_pharmacy(decomposed)
+
+    assert await repository.check_pharmacy_exists_by_title('Аптека \u0439')
+    assert await repository.check_pharmacy_exists_by_title('Аптека \u0438\u0306')
+
+
+@pytest.mark.asyncio
+async def test_memory_pharmacy_inventory_pages():
+    repository = MemoryPharmacyRepo()
+    pharmacy = PharmacyEntity(title=Title('Аптека'), description=Text('...'))
+    await repository.add_pharmacy(pharmacy)
+
+    for product_oid in ('c', 'a', 'b'):
+        await repository.add_product_to_pharmacy(pharmacy.oid, product_oid, Price(10), count=1)
+
+    first_page = [position['product_oid'] async for position in repository.get_pharmacy_inventory(pharmacy.oid, 2)]
+    second_page = [
+        position['product_oid'] async for position in repository.get_pharmacy_inventory(pharmacy.oid, 2, after='b')
+    ]
+
+    assert first_page == ['a', 'b']
+    assert second_page == ['c']
+
+
+@pytest.mark.asyncio
+async def test_memory_offers_sorted_by_price_in_stock():
+    repository = MemoryPharmacyRepo()
+    pharmacies = [PharmacyEntity(title=Title(title), description=Text('...')) for title in ('А', 'Б', 'В', 'Г')]
+
+    for pharmacy, price, count in zip(pharmacies, (30, 10, 20, 5), (1, 2, 3, 0)):
+        await repository.add_pharmacy(pharmacy)
+        await repository.add_product_to_pharmacy(pharmacy.oid, 'product', Price(price), count=count)
+
+    first_page = [offer async for offer in repository.find_offers_for_product('product', limit=2)]
+    second_page = [
+        offer async for offer in repository.find_offers_for_product('product', limit=2, after=(20.0, pharmacies[2].oid))
+    ]
+
+    assert [(offer['title'], offer['price']) for offer in first_page] == [('Б', 10.0), ('В', 20.0)]
+    assert [(offer['title'], offer['price']) for offer in second_page] == [('А', 30.0)]
+
+
+@pytest.mark.asyncio
+async def test_memory_pharmacy_export_iterates_copies():
+    repository = MemoryPharmacyRepo()
+    pharmacy = PharmacyEntity(title=Title('Аптека'), description=Text('...'))
+    await repository.add_pharmacy(pharmacy)
+    await repository.add_product_to_pharmacy(pharmacy.oid, 'product', Price(10), count=3)
+
+    exported = [document async for document in repository.iter_pharmacies(batch_size=100)]
+
+    assert [document['products'] for document in exported] == [[{'product_oid': 'product', 'price': 10.0, 'count': 3}]]
+    assert set(exported[0]) == {'oid', 'title', 'description', 'products', 'created_at', 'version'}
+
+    exported[0]['products'].clear()
+    assert len((await repository.get_pharmacy_by_oid(pharmacy.oid)).products) == 1
+
+
+@pytest.mark.asyncio
+async def test_memory_pharmacy_writes_bump_version():
+    repository = MemoryPharmacyRepo()
+    pharmacy = PharmacyEntity(title=Title('Аптека'), description=Text('...'))
+    await repository.add_pharmacy(pharmacy)
+
+    assert await repository.get_pharmacy_version(pharmacy.oid) == 0
+
+    await repository.add_product_to_pharmacy(pharmacy.oid, 'product', Price(10), count=3)
+    await repository.update_product_price_in_pharmacy(pharmacy.oid, 'product', Price(12))
+    await repository.update_pharmacy(pharmacy.oid, Title('Аптека 2'), Text('...'))
+    await repository.delete_product_in_pharmacy(pharmacy.oid, 'product')
+
+    assert await repository.get_pharmacy_version(pharmacy.oid) == 4
+    assert (await repository.get_pharmacy_by_oid(pharmacy.oid)).version == 4
+    assert await repository.get_partial_pharmacy_by_oid(pharmacy.oid, ('version',)) == {'version': 4}
+
+    with pytest.raises(PharmacyNotFoundException):
+        await repository.get_pharmacy_version('missing')
+
+
+@pytest.mark.asyncio
+async def test_memory_inventory_operations_apply_in_request_order():
+    repository = MemoryPharmacyRepo()
+    pharmacy = PharmacyEntity(title=Title('Аптека'), description=Text('...'))
+    await repository.add_pharmacy(pharmacy)
+    await repository.add_product_to_pharmacy(pharmacy.oid, 'first', Price(10), count=1)
+    await repository.add_product_to_pharmacy(pharmacy.oid, 'second', Price(20), count=2)
+    version = await repository.get_pharmacy_version(pharmacy.oid)
+
+    errors = await repository.apply_inventory_operations([
+        InventoryOperation(pharmacy.oid, 'first', 'set_price', price=Price(11)),
+        InventoryOperation(pharmacy.oid, 'first', 'set_count', count=5),
+        InventoryOperation(pharmacy.oid, 'second', 'set_price', price=Price(21)),
+        InventoryOperation(pharmacy.oid, 'second', 'remove'),
+        InventoryOperation(pharmacy.oid, 'second', 'set_count', count=1),
+        InventoryOperation('missing', 'first', 'remove'),
+    ])
+
+    assert {index: type(error) for index, error in errors.items()} == {
+        4: ProductNotFoundException,
+        5: PharmacyNotFoundException,
+    }
+    assert (await repository.get_pharmacy_by_oid(pharmacy.oid)).products == [
+        {'product_oid': 'first', 'price': 11.0, 'count': 5},
+    ]
+    assert await repository.get_pharmacy_version(pharmacy.oid) == version + 2
+    assert [offer async for offer in repository.find_offers_for_product('second', limit=10)] == []
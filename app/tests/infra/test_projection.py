@@ -0,0 +1,24 @@
+import pytest
+
+from ...infra.repositories.converters import (PHARMACY_DOCUMENT_FIELDS,
+                                              PRODUCT_DOCUMENT_FIELDS,
+                                              build_projection)
+from ...logic.exceptions.fields import UnknownFieldsException
+
+
+def test_build_projection_includes_only_requested_fields():
+    assert build_projection(('title', 'version'), PRODUCT_DOCUMENT_FIELDS) == {'_id': 0, 'title': 1, 'version': 1}
+
+
+def test_build_projection_of_all_fields_hides_mongo_id():
+    projection = build_projection(PHARMACY_DOCUMENT_FIELDS, PHARMACY_DOCUMENT_FIELDS)
+
+    assert projection == {'_id': 0, **{field: 1 for field in PHARMACY_DOCUMENT_FIELDS}}
+
+
+@pytest.mark.parametrize('fields', [('_id',), ('title', 'price'), ('products.price',)])
+def test_build_projection_rejects_unknown_fields(fields: tuple[str, ...]):
+    with pytest.raises(UnknownFieldsException) as exc_info:
+        build_projection(fields, PHARMACY_DOCUMENT_FIELDS)
+
+    assert exc_info.value.fields == tuple(field for field in fields if field not in PHARMACY_DOCUMENT_FIELDS)
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from ...domain.entities.reservation import ReservationEntity
+from ...infra.repositories.base import BaseReservationRepo
+from ...infra.repositories.memory import MemoryReservationRepo
+from ...infra.repositories.mongo import MongoDBReservationRepo
+from .documents import DocumentCollection
+
+NOW = datetime(2030, 1, 1, 12)
+
+
+def create_mongo_repository() -> MongoDBReservationRepo:
+    return MongoDBReservationRepo(
+        mongo_db_client={'db': {'reservations': DocumentCollection()}},
+        mongo_db_db_name='db',
+        mongo_db_collection_name='reservations',
+        return_lease_seconds=30,
+    )
+
+
+@pytest.fixture(params=['memory', 'mongo'])
+def repository(request) -> BaseReservationRepo:
+    if request.param == 'memory':
+        return MemoryReservationRepo(return_lease_seconds=30)
+
+    return create_mongo_repository()
+
+
+async def add_reservation(repository: BaseReservationRepo, expires_at: datetime) -> ReservationEntity:
+    reservation = ReservationEntity(pharmacy_oid='pharmacy', product_oid='product', quantity=1, expires_at=expires_at)
+    await repository.add_reservation(reservation)
+    return reservation
+
+
+@pytest.mark.asyncio
+async def test_leased_reservation_is_returned_once_until_lease_ends(repository: BaseReservationRepo):
+    active = await add_reservation(repository, NOW + timedelta(minutes=5))
+
+    leased = await repository.lease_reservation(active.oid, NOW)
+    assert leased.oid == active.oid
+    assert leased.expires_at == NOW
+
+    assert await repository.lease_reservation(active.oid, NOW) is None
+    assert await repository.pop_reservation(active.oid, active_at=NOW) is None
+    assert await repository.lease_expired_reservations(NOW + timedelta(seconds=10), limit=10) == []
+
+    retried = await repository.lease_expired_reservations(NOW + timedelta(seconds=31), limit=10)
+    assert [reservation.oid for reservation in retried] == [active.oid]
+
+    await repository.delete_reservation(active.oid)
+    assert await repository.lease_expired_reservations(NOW + timedelta(minutes=10), limit=10) == []
+
+
+@pytest.mark.asyncio
+async def test_released_lease_is_swept_again_at_once(repository: BaseReservationRepo):
+    expired = await add_reservation(repository, NOW - timedelta(seconds=1))
+    await add_reservation(repository, NOW + timedelta(minutes=5))
+
+    assert [reservation.oid for reservation in await repository.lease_expired_reservations(NOW, limit=10)] == [
+        expired.oid,
+    ]
+    assert await repository.lease_expired_reservations(NOW, limit=10) == []
+
+    await repository.release_leases([expired.oid])
+
+    assert [reservation.oid for reservation in await repository.lease_expired_reservations(NOW, limit=10)] == [
+        expired.oid,
+    ]
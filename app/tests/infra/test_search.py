@@ -0,0 +1,64 @@
+from ...infra.search.index import SearchIndex
+from ...infra.search.text import tokenize
+
+
+def test_tokenize_normalizes_cyrillic():
+    assert tokenize('Ёжик-Аспирин, 500мг') == ['ежик', 'аспирин', '500мг']
+
+
+def test_search_exact_and_fuzzy():
+    index = SearchIndex()
+    index.add('1', 'Синупрет драже')
+    index.add('2', 'Нурофен форте')
+
+    assert [oid for _, oid in index.search('синупрет', limit=10)] == ['1']
+    assert [oid for _, oid in index.search('нурафен', limit=10)] == ['2']
+    assert index.search('валидол', limit=10) == []
+
+
+def test_search_ranks_by_bm25():
+    index = SearchIndex()
+    index.add('1', 'Аспирин')
+    index.add('2', 'Аспирин кардио форте плюс')
+    index.add('3', 'Парацетамол')
+
+    assert [oid for _, oid in index.search('аспирин', limit=10)] == ['1', '2']
+
+
+def test_search_pagination_after():
+    index = SearchIndex()
+    for oid in ('a', 'b', 'c'):
+        index.add(oid, 'Нурофен')
+
+    first_page = index.search('нурофен', limit=2)
+    second_page = index.search('нурофен', limit=2, after=first_page[-1])
+
+    assert [oid for _, oid in first_page] == ['a', 'b']
+    assert [oid for _, oid in second_page] == ['c']
+
+
+def test_update_and_remove_document():
+    index = SearchIndex()
+    index.add('1', 'Аспирин')
+    index.add('1', 'Парацетамол')
+
+    assert index.search('аспирин', limit=10) == []
+    assert [oid for _, oid in index.search('парацетамол', limit=10)] == ['1']
+
+    index.remove('1')
+
+    assert index.search('парацетамол', limit=10) == []
+    assert len(index) == 0
+
+
+def test_rebuild_keeps_concurrent_writes():
+    index = SearchIndex()
+    index.add('1', 'Аспирин')
+
+    rebuilt_index = index.start_rebuild()
+    rebuilt_index.add('1', 'Аспирин')
+    index.add('2', 'Нурофен')
+    index.finish_rebuild()
+
+    assert [oid for _, oid in index.search('нурофен', limit=10)] == ['2']
+    assert len(index) == 2
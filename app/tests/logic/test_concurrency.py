@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from ...domain.entities.pharmacy import PharmacyEntity
+from ...domain.entities.product import ProductEntity
+from ...domain.values.product import ExpiresDate, Price, Text, Title
+from ...infra.repositories.memory import MemoryPharmacyRepo, MemoryProductRepo
+from ...logic.commands.pharmacy import (AddProductWithPriceCommand,
+                                        AddProductWithPriceHandler,
+                                        ChangeProductPriceCommand,
+                                        ChangeProductPriceHandler)
+from ...logic.concurrency import ConflictRetry
+from ...logic.exceptions.pharmacy import PharmacyVersionConflictException
+
+
+class InterleavingPharmacyRepo(MemoryPharmacyRepo):
+    async def get_pharmacy_by_oid(self, oid: str) -> PharmacyEntity:
+        pharmacy = await super().get_pharmacy_by_oid(oid)
+        # Как между чтением аптеки и записью в MongoDB: другие писатели успевают записать свое
+        await asyncio.sleep(0)
+        return pharmacy
+
+
+@pytest.mark.asyncio
+async def test_concurrent_product_adds_retry_on_conflict():
+    pharmacy_repository = InterleavingPharmacyRepo()
+    product_repository = MemoryProductRepo()
+    pharmacy = PharmacyEntity(title=Title('Аптека'), description=Text('...'))
+    await pharmacy_repository.add_pharmacy(pharmacy)
+
+    products = [
+        ProductEntity.create_product(
+            title=Title(f'Товар {index}'),
+            description=Text('...'),
+            expiry_date=ExpiresDate(datetime.now() + timedelta(days=30)),
+            image_url=Text('...'),
+            ingredients=Text('...'),
+            manufacturer=Title('...'),
+        )
+        for index in range(8)
+    ]
+    for product in products:
+        await product_repository.add_product(product)
+
+    conflict_retry = ConflictRetry(attempts=50, base_delay_seconds=0.0001, max_delay_seconds=0.001)
+    handler = AddProductWithPriceHandler(
+        pharmacy_repository=pharmacy_repository,
+        product_repository=product_repository,
+        conflict_retry=conflict_retry,
+    )
+
+    await asyncio.gather(*(
+        handler.handle(AddProductWithPriceCommand(pharmacy_oid=pharmacy.oid, product_oid=product.oid, price=1, count=1))
+        for product in products
+    ))
+
+    assert conflict_retry.stats.conflicts > 0
+    assert conflict_retry.stats.exhausted == 0
+    assert await pharmacy_repository.get_pharmacy_version(pharmacy.oid) == 8
+    assert len((await pharmacy_repository.get_pharmacy_by_oid(pharmacy.oid)).products) == 8
+
+
+@pytest.mark.asyncio
+async def test_price_change_checks_only_client_version():
+    repository = MemoryPharmacyRepo()
+    pharmacy = PharmacyEntity(title=Title('Аптека'), description=Text('...'))
+    await repository.add_pharmacy(pharmacy)
+    await repository.add_product_to_pharmacy(pharmacy.oid, 'first', Price(10), count=1)
+    await repository.add_product_to_pharmacy(pharmacy.oid, 'second', Price(10), count=1)
+    handler = ChangeProductPriceHandler(pharmacy_repository=repository)
+
+    await handler.handle(ChangeProductPriceCommand(pharmacy_oid=pharmacy.oid, product_oid='first', price=11))
+    updated = await handler.handle(
+        ChangeProductPriceCommand(pharmacy_oid=pharmacy.oid, product_oid='second', price=12, expected_version=3),
+    )
+    assert updated.version == 4
+
+    with pytest.raises(PharmacyVersionConflictException):
+        await handler.handle(
+            ChangeProductPriceCommand(pharmacy_oid=pharmacy.oid, product_oid='first', price=13, expected_version=3),
+        )
+
+    assert (await repository.get_pharmacy_by_oid(pharmacy.oid)).products[0]['price'] == 11
+
+
+@pytest.mark.asyncio
+async def test_conflict_retry_gives_up_after_attempts():
+    calls = 0
+
+    async def write():
+        nonlocal calls
+        calls += 1
+        raise PharmacyVersionConflictException(pharmacy_oid='oid', expected_version=0, actual_version=1)
+
+    conflict_retry = ConflictRetry(attempts=3, base_delay_seconds=0)
+
+    with pytest.raises(PharmacyVersionConflictException):
+        await conflict_retry.run(write)
+
+    assert calls == 3
+    assert conflict_retry.stats.conflicts == 3
+    assert conflict_retry.stats.exhausted == 1
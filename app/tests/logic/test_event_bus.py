@@ -0,0 +1,56 @@
+import asyncio
+from dataclasses import dataclass, field
+
+import pytest
+
+from ...domain.entities.pharmacy import PharmacyEntity
+from ...domain.events.base import BaseEvent
+from ...domain.events.pharmacy import NewPharmacyCreatedEvent
+from ...domain.values.product import Text, Title
+from ...logic.commands.pharmacy import CreatePharmacyCommand
+from ...logic.event_bus import EventBus
+from ...logic.events.base import EventHandler
+from ...logic.mediator import Mediator
+
+
+@dataclass(frozen=True)
+class RecordingHandler(EventHandler[BaseEvent, None]):
+    handled: list = field(default_factory=list)
+    delay: float = 0.0
+
+    async def handle(self, event: BaseEvent) -> None:
+        await asyncio.sleep(self.delay)
+        self.handled.append(event)
+
+
+@pytest.mark.asyncio
+async def test_event_bus_runs_handlers_with_timeouts():
+    fast, slow = RecordingHandler(), RecordingHandler(delay=1)
+    event = NewPharmacyCreatedEvent(pharmacy_oid='oid', title='title', description='description')
+
+    bus = EventBus(get_handlers=lambda event_type: (fast, slow), queue_size=1, handler_timeout_seconds=0.01)
+    bus.start()
+    bus.publish([event, event])
+    await bus.stop()
+
+    assert fast.handled == [event]
+    assert slow.handled == []
+    assert bus.snapshot()['published'] == 1
+    assert bus.snapshot()['dropped'] == 1
+    assert bus.snapshot()['handler_timeouts'] == 1
+
+
+@pytest.mark.asyncio
+async def test_mediator_publishes_command_events(mediator: Mediator):
+    handler = RecordingHandler()
+    mediator.register_event(NewPharmacyCreatedEvent, [handler])
+    mediator.event_bus = EventBus(get_handlers=mediator.get_event_handlers)
+    mediator.event_bus.start()
+
+    pharmacy: PharmacyEntity = await mediator.send(
+        CreatePharmacyCommand(title=Title('title'), description=Text('description')),
+    )
+    await mediator.event_bus.stop()
+
+    assert [event.pharmacy_oid for event in handler.handled] == [pharmacy.oid]
+    assert pharmacy.pull_events() == []
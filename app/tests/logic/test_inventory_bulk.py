@@ -0,0 +1,32 @@
+import pytest
+
+from ...domain.entities.pharmacy import PharmacyEntity
+from ...domain.values.product import Price, Text, Title
+from ...infra.repositories.base import BasePharmacyRepo
+from ...logic.commands.pharmacy import (ChangeInventoryBulkCommand,
+                                        InventoryOperationRow)
+from ...logic.mediator import Mediator
+
+
+@pytest.mark.asyncio
+async def test_change_inventory_bulk_reports_errors_by_row(
+    pharmacy_repository: BasePharmacyRepo,
+    mediator: Mediator,
+):
+    pharmacy = PharmacyEntity(title=Title('Аптека'), description=Text('...'))
+    await pharmacy_repository.add_pharmacy(pharmacy)
+    await pharmacy_repository.add_product_to_pharmacy(pharmacy.oid, 'product', Price(10), count=1)
+
+    result = await mediator.send(ChangeInventoryBulkCommand(operations=(
+        InventoryOperationRow(pharmacy_oid=pharmacy.oid, product_oid='product', op='set_price'),
+        InventoryOperationRow(pharmacy_oid=pharmacy.oid, product_oid='product', op='set_price', price=-1),
+        InventoryOperationRow(pharmacy_oid=pharmacy.oid, product_oid='missing', op='remove'),
+        InventoryOperationRow(pharmacy_oid=pharmacy.oid, product_oid='product', op='set_price', price=12),
+        InventoryOperationRow(pharmacy_oid=pharmacy.oid, product_oid='product', op='set_count', count=4),
+    )))
+
+    assert result.applied == 2
+    assert sorted(result.errors) == [0, 1, 2]
+    assert (await pharmacy_repository.get_pharmacy_by_oid(pharmacy.oid)).products == [
+        {'product_oid': 'product', 'price': 12.0, 'count': 4},
+    ]
@@ -0,0 +1,60 @@
+from dataclasses import dataclass
+
+import pytest
+
+from ...logic.commands.base import BaseCommand, CommandHandler
+from ...logic.exceptions.mediator import (
+    CommandHandlersNotRegisteredException, MultipleCommandHandlersException)
+from ...logic.mediator import Mediator
+
+
+@dataclass(frozen=True)
+class EchoCommand(BaseCommand):
+    value: int
+
+
+@dataclass(frozen=True)
+class LoudEchoCommand(EchoCommand):
+    ...
+
+
+@dataclass(frozen=True)
+class EchoHandler(CommandHandler[EchoCommand, int]):
+    multiplier: int = 1
+
+    async def handle(self, command: EchoCommand) -> int:
+        return command.value * self.multiplier
+
+
+@pytest.mark.asyncio
+async def test_mediator_send_returns_single_result():
+    mediator = Mediator()
+    mediator.register_command(EchoCommand, [EchoHandler()])
+    table = mediator.compile()
+
+    assert await mediator.send(EchoCommand(value=2)) == 2
+    assert await mediator.handle_command(EchoCommand(value=2)) == [2]
+    assert mediator._table is table
+
+    mediator.register_command(EchoCommand, [EchoHandler(multiplier=10)])
+
+    assert await mediator.handle_command(EchoCommand(value=2)) == [2, 20]
+    with pytest.raises(MultipleCommandHandlersException):
+        await mediator.send(EchoCommand(value=2))
+
+
+@pytest.mark.asyncio
+async def test_mediator_dispatch_by_mro():
+    mediator = Mediator()
+    mediator.register_command(EchoCommand, [EchoHandler()])
+
+    with pytest.raises(CommandHandlersNotRegisteredException):
+        await mediator.send(LoudEchoCommand(value=3))
+
+    mediator.dispatch_by_mro = True
+
+    assert await mediator.send(LoudEchoCommand(value=3)) == 3
+
+    mediator.register_command(LoudEchoCommand, [EchoHandler(multiplier=10)])
+
+    assert await mediator.send(LoudEchoCommand(value=3)) == 30
@@ -0,0 +1,149 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from ...domain.events.pharmacy import NewPharmacyCreatedEvent
+from ...domain.events.product import ProductAddedToPharmacyEvent
+from ...domain.values.product import Text, Title
+from ...infra.outbox.base import BaseOutbox
+from ...infra.outbox.converters import (convert_document_to_event,
+                                        convert_event_to_document)
+from ...logic.events.base import EventHandler
+from ...logic.mediator import Mediator
+from ...logic.outbox import OutboxRelay
+
+
+@dataclass
+class ListOutbox(BaseOutbox):
+    documents: dict[str, dict] = field(default_factory=dict)
+    done: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+
+    async def add(self, events, session=None) -> None:
+        for event in events:
+            document = convert_event_to_document(event, datetime.now())
+            self.documents.setdefault(document['_id'], document)
+
+    async def claim(self, batch_size: int, lease_seconds: float) -> list[dict]:
+        claim_id = str(uuid4())
+        claimed = [document for document in self.documents.values() if document.get('claim_id') is None]
+
+        for document in claimed[:batch_size]:
+            document['attempts'] += 1
+            document['claim_id'] = claim_id
+
+        return [dict(document) for document in claimed[:batch_size]]
+
+    def expire_claims(self) -> None:
+        for document in self.documents.values():
+            document['claim_id'] = None
+
+    def _pop_claimed(self, claim_id: str, event_ids: list[str]) -> list[str]:
+        claimed = [
+            event_id for event_id in event_ids
+            if event_id in self.documents and self.documents[event_id].get('claim_id') == claim_id
+        ]
+        for event_id in claimed:
+            del self.documents[event_id]
+
+        return claimed
+
+    async def complete(self, claim_id: str, event_ids: list[str]) -> None:
+        self.done.extend(self._pop_claimed(claim_id, event_ids))
+
+    async def release(self, claim_id: str, event_ids: list[str], retry_delay_seconds: float) -> None:
+        for event_id in event_ids:
+            if self.documents[event_id].get('claim_id') == claim_id:
+                self.documents[event_id]['claim_id'] = None
+
+    async def bury(self, claim_id: str, event_ids: list[str]) -> None:
+        self.failed.extend(self._pop_claimed(claim_id, event_ids))
+
+
+@dataclass(frozen=True)
+class FailingHandler(EventHandler[NewPharmacyCreatedEvent, None]):
+    handled: list = field(default_factory=list)
+
+    async def handle(self, event: NewPharmacyCreatedEvent) -> None:
+        self.handled.append(event)
+        raise RuntimeError('boom')
+
+
+def test_outbox_event_round_trip():
+    event = NewPharmacyCreatedEvent(pharmacy_oid='oid', title=Title('Аптека'), description=Text('Описание'))
+
+    restored = convert_document_to_event(convert_event_to_document(event, datetime.now()))
+
+    assert restored == NewPharmacyCreatedEvent(
+        pharmacy_oid='oid',
+        title='Аптека',
+        description='Описание',
+        event_id=event.event_id,
+    )
+
+
+@pytest.mark.asyncio
+async def test_outbox_relay_delivers_retries_and_buries():
+    handler = FailingHandler()
+    mediator = Mediator()
+    mediator.register_event(NewPharmacyCreatedEvent, [handler])
+
+    outbox = ListOutbox()
+    failing = NewPharmacyCreatedEvent(pharmacy_oid='oid', title='Аптека', description='Описание')
+    unhandled = ProductAddedToPharmacyEvent(
+        product_oid='product',
+        title='Товар',
+        description='Описание',
+        expiry_date=datetime.now(),
+        image_url='url',
+        ingredients='...',
+        manufacturer='Производитель',
+        price=10.0,
+        pharmacy_oid='oid',
+    )
+    await outbox.add([failing, unhandled, failing])
+
+    relay = OutboxRelay(outbox=outbox, mediator=mediator, max_attempts=2)
+
+    assert await relay.relay_batch() == 2
+    assert outbox.done == [str(unhandled.event_id)]
+
+    assert await relay.relay_batch() == 1
+    assert outbox.failed == [str(failing.event_id)]
+    assert len(handler.handled) == 2
+    assert relay.snapshot()['retried'] == 1
+
+
+@dataclass(frozen=True)
+class ExpiringLeaseHandler(EventHandler[NewPharmacyCreatedEvent, None]):
+    """
+    Пока релей доставляет событие, его аренда истекает, и событие забирает другой релей.
+    """
+    outbox: ListOutbox
+    reclaimed: list = field(default_factory=list)
+
+    async def handle(self, event: NewPharmacyCreatedEvent) -> None:
+        self.outbox.expire_claims()
+        self.reclaimed.extend(await self.outbox.claim(batch_size=10, lease_seconds=30))
+        raise RuntimeError('boom')
+
+
+@pytest.mark.asyncio
+async def test_outbox_relay_does_not_touch_events_reclaimed_after_lease_expired():
+    outbox = ListOutbox()
+    event = NewPharmacyCreatedEvent(pharmacy_oid='oid', title='Аптека', description='Описание')
+    await outbox.add([event])
+
+    handler = ExpiringLeaseHandler(outbox=outbox)
+    mediator = Mediator()
+    mediator.register_event(NewPharmacyCreatedEvent, [handler])
+    relay = OutboxRelay(outbox=outbox, mediator=mediator, max_attempts=1)
+
+    assert await relay.relay_batch() == 1
+    assert outbox.failed == []
+
+    [reclaimed] = handler.reclaimed
+    await outbox.complete(reclaimed['claim_id'], [reclaimed['_id']])
+    assert outbox.done == [str(event.event_id)]
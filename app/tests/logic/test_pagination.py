@@ -0,0 +1,46 @@
+import base64
+
+import pytest
+
+from ...logic.exceptions.pagination import InvalidContinuationTokenException
+from ...logic.pagination import (decode_continuation_token,
+                                 encode_continuation_token)
+
+
+@pytest.mark.parametrize('score, oid', [
+    (0.0, 'a'),
+    (12.345678, '6f1c0b9e-2a3d-4c5e-8f70-112233445566'),
+    (-1.5, 'аптека'),
+    (99.99, ''),
+])
+def test_continuation_token_round_trip(score: float, oid: str):
+    token = encode_continuation_token(score, oid)
+
+    assert '=' not in token
+    assert decode_continuation_token(token) == (score, oid)
+
+
+def encode_payload(payload: str) -> str:
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('token', [
+    'не base64',
+    '!!!',
+    'a',
+    encode_payload('{"title": '),
+    encode_payload('[1.0]'),
+    encode_payload('[1.0, "a", "b"]'),
+    encode_payload('{"score": 1}'),
+    encode_payload('"ab"'),
+    encode_payload('5'),
+    encode_payload('[[1], "a"]'),
+    encode_payload('["цена", "a"]'),
+    encode_payload('[NaN, "a"]'),
+    encode_payload('[Infinity, "a"]'),
+    encode_payload('[1.0, null]'),
+    encode_payload('[1.0, {"$gt": ""}]'),
+])
+def test_garbage_continuation_token_is_rejected(token: str):
+    with pytest.raises(InvalidContinuationTokenException):
+        decode_continuation_token(token)
@@ -3,7 +3,7 @@ from faker import Faker
 
 from ...domain.entities.pharmacy import PharmacyEntity
 from ...domain.values.product import Text, Title
-from ...infra.repositories.pharmacy import BasePharmacyRepo
+from ...infra.repositories.base import BasePharmacyRepo
 from ...logic.commands.pharmacy import CreatePharmacyCommand
 from ...logic.exceptions.pharmacy import PharmacyByTitleAlreadyExistsException
 from ...logic.mediator import Mediator
@@ -41,13 +41,13 @@ async def test_create_pharmacy_command_title_already_exists(
     pharmacy = PharmacyEntity(title=title, description=description)
     await pharmacy_repository.add_pharmacy(pharmacy)
 
-    assert pharmacy in pharmacy_repository._saved_pharmacies
+    assert pharmacy.oid in pharmacy_repository._saved_pharmacies
 
     with pytest.raises(PharmacyByTitleAlreadyExistsException):
         await mediator.handle_command(
             CreatePharmacyCommand(
-                title=title.as_generic_type(),
-                description=description.as_generic_type(),
+                title=title,
+                description=description,
             ),
         )
 
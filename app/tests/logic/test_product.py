@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import pytest
 from faker import Faker
@@ -7,8 +7,7 @@ from ...domain.entities.pharmacy import PharmacyEntity
 from ...domain.entities.product import ProductEntity
 from ...domain.exceptions.product import ExpiresDateException
 from ...domain.values.product import ExpiresDate, Price, Text, Title
-from ...infra.repositories.pharmacy import BasePharmacyRepo
-from ...infra.repositories.products import BaseProductRepo
+from ...infra.repositories.base import BasePharmacyRepo, BaseProductRepo
 from ...logic.commands.pharmacy import CreatePharmacyCommand
 from ...logic.commands.products import CreateProductCommand
 from ...logic.exceptions.products import \
@@ -24,7 +23,7 @@ async def test_create_product_success(
 ):
     title = Title(faker.text())
     description = Text(faker.text())
-    expiry_date = ExpiresDate(datetime(2025, 2, 15))
+    expiry_date = ExpiresDate(datetime.now() + timedelta(days=365))
     image_url = Text(faker.text())
     ingredients = Text(faker.text())
     manufacturer = Title(faker.text())
@@ -34,7 +33,7 @@ async def test_create_product_success(
         CreateProductCommand(
             title=title.as_generic_type(),
             description=description.as_generic_type(),
-            expiry_date=expiry_date.as_generic_type(),
+            expiry_date=expiry_date.value,
             image_url=image_url.as_generic_type(),
             ingredients=ingredients.as_generic_type(),
             manufacturer=manufacturer.as_generic_type(),
@@ -52,7 +51,7 @@ async def test_create_command_title_already_exists_and_check_expiry_date(
 ):
     title = Title(faker.text())
     description = Text(faker.text())
-    expiry_date = ExpiresDate(datetime(2025, 2, 15))
+    expiry_date = ExpiresDate(datetime.now() + timedelta(days=365))
     image_url = Text(faker.text())
     ingredients = Text(faker.text())
     manufacturer = Title(faker.text())
@@ -67,14 +66,14 @@ async def test_create_command_title_already_exists_and_check_expiry_date(
     )
     await product_repository.add_product(product)
 
-    assert product in product_repository._saved_products
+    assert product.oid in product_repository._saved_products
 
     with pytest.raises(ProductWithThatTitleAlreadyExistsException):
         await mediator.handle_command(
             CreateProductCommand(
                 title=title.as_generic_type(),
                 description=description.as_generic_type(),
-                expiry_date=expiry_date.as_generic_type(),
+                expiry_date=expiry_date.value,
                 image_url=image_url.as_generic_type(),
                 ingredients=ingredients.as_generic_type(),
                 manufacturer=manufacturer.as_generic_type(),
@@ -86,7 +85,7 @@ async def test_create_command_title_already_exists_and_check_expiry_date(
             CreateProductCommand(
                 title=new_title.as_generic_type(),
                 description=description.as_generic_type(),
-                expiry_date=ExpiresDate(datetime(2023, 1, 1)).as_generic_type(),
+                expiry_date=datetime(2023, 1, 1),
                 image_url=image_url.as_generic_type(),
                 ingredients=ingredients.as_generic_type(),
                 manufacturer=manufacturer.as_generic_type(),
@@ -117,7 +116,7 @@ async def test_create_product_to_pharmacy(
 
     title = Title(faker.text())
     description = Text(faker.text())
-    expiry_date = ExpiresDate(datetime(2025, 2, 15))
+    expiry_date = ExpiresDate(datetime.now() + timedelta(days=365))
     image_url = Text(faker.text())
     ingredients = Text(faker.text())
     manufacturer = Title(faker.text())
@@ -127,7 +126,7 @@ async def test_create_product_to_pharmacy(
         CreateProductCommand(
             title=title.as_generic_type(),
             description=description.as_generic_type(),
-            expiry_date=expiry_date.as_generic_type(),
+            expiry_date=expiry_date.value,
             image_url=image_url.as_generic_type(),
             ingredients=ingredients.as_generic_type(),
             manufacturer=manufacturer.as_generic_type(),
@@ -137,9 +136,8 @@ async def test_create_product_to_pharmacy(
     assert await product_repository.check_product_exists_by_title(title=title.as_generic_type())
 
     price = Price(100.123)
-    pharmacy.add_product(product, price)
-    product_price = pharmacy.prices.get(product)
+    pharmacy.add_product_with_price(product, price.as_generic_type())
 
-    assert product in pharmacy.products
-
-    assert product_price.price.as_generic_type() == price.as_generic_type()
+    assert pharmacy.products == [
+        {'product_oid': product.oid, 'price': price.as_generic_type(), 'count': 0},
+    ]
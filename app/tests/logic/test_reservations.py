@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+from punq import Container
+
+from ...domain.entities.pharmacy import PharmacyEntity
+from ...domain.values.product import Price, Text, Title
+from ...infra.repositories.base import BasePharmacyRepo
+from ...logic.commands.reservations import (CommitReservationCommand,
+                                            ReleaseReservationCommand,
+                                            ReserveStockCommand)
+from ...logic.exceptions.pharmacy import (NotEnoughStockException,
+                                          ReservationNotFoundException)
+from ...logic.mediator import Mediator
+from ...logic.reservations import ReservationSweeper
+
+
+async def add_pharmacy_with_stock(pharmacy_repository: BasePharmacyRepo, count: int) -> str:
+    pharmacy = PharmacyEntity(title=Title('Аптека'), description=Text('...'))
+    await pharmacy_repository.add_pharmacy(pharmacy)
+    await pharmacy_repository.add_product_to_pharmacy(pharmacy.oid, 'product', Price(10), count=count)
+    return pharmacy.oid
+
+
+async def get_count(pharmacy_repository: BasePharmacyRepo, pharmacy_oid: str) -> int:
+    pharmacy = await pharmacy_repository.get_pharmacy_by_oid(pharmacy_oid)
+    return pharmacy.products[0]['count']
+
+
+@pytest.mark.asyncio
+async def test_reserve_release_and_commit(pharmacy_repository: BasePharmacyRepo, mediator: Mediator):
+    pharmacy_oid = await add_pharmacy_with_stock(pharmacy_repository, count=5)
+
+    released = await mediator.send(
+        ReserveStockCommand(pharmacy_oid=pharmacy_oid, product_oid='product', quantity=3, ttl_seconds=60),
+    )
+    assert await get_count(pharmacy_repository, pharmacy_oid) == 2
+
+    with pytest.raises(NotEnoughStockException):
+        await mediator.send(
+            ReserveStockCommand(pharmacy_oid=pharmacy_oid, product_oid='product', quantity=3, ttl_seconds=60),
+        )
+
+    await mediator.send(ReleaseReservationCommand(reservation_oid=released.oid))
+    assert await get_count(pharmacy_repository, pharmacy_oid) == 5
+
+    committed = await mediator.send(
+        ReserveStockCommand(pharmacy_oid=pharmacy_oid, product_oid='product', quantity=4, ttl_seconds=60),
+    )
+    await mediator.send(CommitReservationCommand(reservation_oid=committed.oid))
+    assert await get_count(pharmacy_repository, pharmacy_oid) == 1
+
+    with pytest.raises(ReservationNotFoundException):
+        await mediator.send(ReleaseReservationCommand(reservation_oid=committed.oid))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reservations_never_oversell(pharmacy_repository: BasePharmacyRepo, mediator: Mediator):
+    pharmacy_oid = await add_pharmacy_with_stock(pharmacy_repository, count=10)
+
+    results = await asyncio.gather(*(
+        mediator.send(ReserveStockCommand(pharmacy_oid=pharmacy_oid, product_oid='product', quantity=1, ttl_seconds=60))
+        for _ in range(50)
+    ), return_exceptions=True)
+
+    assert sum(not isinstance(result, Exception) for result in results) == 10
+    assert all(
+        isinstance(result, NotEnoughStockException) for result in results if isinstance(result, Exception)
+    )
+    assert await get_count(pharmacy_repository, pharmacy_oid) == 0
+
+
+@pytest.mark.asyncio
+async def test_sweeper_returns_expired_reservations(
+    container: Container,
+    pharmacy_repository: BasePharmacyRepo,
+    mediator: Mediator,
+):
+    pharmacy_oid = await add_pharmacy_with_stock(pharmacy_repository, count=5)
+
+    expired = await mediator.send(
+        ReserveStockCommand(pharmacy_oid=pharmacy_oid, product_oid='product', quantity=2, ttl_seconds=0),
+    )
+    await mediator.send(
+        ReserveStockCommand(pharmacy_oid=pharmacy_oid, product_oid='product', quantity=1, ttl_seconds=60),
+    )
+
+    with pytest.raises(ReservationNotFoundException):
+        await mediator.send(CommitReservationCommand(reservation_oid=expired.oid))
+
+    sweeper = container.resolve(ReservationSweeper)
+    assert await sweeper.sweep() == 1
+    assert await sweeper.sweep() == 0
+    assert sweeper.stats.returned_quantity == 2
+    assert await get_count(pharmacy_repository, pharmacy_oid) == 4
+
+
+def fail_return_stock(monkeypatch: pytest.MonkeyPatch, pharmacy_repository: BasePharmacyRepo, fail_times: int):
+    return_stock = pharmacy_repository.return_stock
+    failures = iter(range(fail_times))
+
+    async def failing_return_stock(**kwargs):
+        if next(failures, None) is not None:
+            raise ConnectionError('хранилище недоступно')
+
+        await return_stock(**kwargs)
+
+    monkeypatch.setattr(pharmacy_repository, 'return_stock', failing_return_stock)
+
+
+@pytest.mark.asyncio
+async def test_failed_release_keeps_reservation_for_sweeper(
+    monkeypatch: pytest.MonkeyPatch,
+    container: Container,
+    pharmacy_repository: BasePharmacyRepo,
+    mediator: Mediator,
+):
+    pharmacy_oid = await add_pharmacy_with_stock(pharmacy_repository, count=5)
+    reservation = await mediator.send(
+        ReserveStockCommand(pharmacy_oid=pharmacy_oid, product_oid='product', quantity=3, ttl_seconds=60),
+    )
+    fail_return_stock(monkeypatch, pharmacy_repository, fail_times=1)
+
+    with pytest.raises(ConnectionError):
+        await mediator.send(ReleaseReservationCommand(reservation_oid=reservation.oid))
+
+    assert await get_count(pharmacy_repository, pharmacy_oid) == 2
+
+    with pytest.raises(ReservationNotFoundException):
+        await mediator.send(CommitReservationCommand(reservation_oid=reservation.oid))
+
+    sweeper = container.resolve(ReservationSweeper)
+    assert await sweeper.sweep() == 1
+    assert await sweeper.sweep() == 0
+    assert await get_count(pharmacy_repository, pharmacy_oid) == 5
+
+
+@pytest.mark.asyncio
+async def test_sweeper_requeues_reservations_whose_return_failed(
+    monkeypatch: pytest.MonkeyPatch,
+    container: Container,
+    pharmacy_repository: BasePharmacyRepo,
+    mediator: Mediator,
+):
+    pharmacy_oid = await add_pharmacy_with_stock(pharmacy_repository, count=5)
+    for _ in range(2):
+        await mediator.send(
+            ReserveStockCommand(pharmacy_oid=pharmacy_oid, product_oid='product', quantity=2, ttl_seconds=0),
+        )
+    fail_return_stock(monkeypatch, pharmacy_repository, fail_times=1)
+
+    sweeper = container.resolve(ReservationSweeper)
+    assert await sweeper.sweep() == 2
+    assert sweeper.stats.failed == 1
+    assert await get_count(pharmacy_repository, pharmacy_oid) == 3
+
+    assert await sweeper.sweep() == 1
+    assert await sweeper.sweep() == 0
+    assert sweeper.stats.returned_quantity == 4
+    assert await get_count(pharmacy_repository, pharmacy_oid) == 5
@@ -0,0 +1,77 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+import pytest
+
+from ...logic.commands.base import BaseReadCommand, CommandHandler
+from ...logic.mediator import Mediator
+from ...logic.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_singleflight_collapses_concurrent_calls():
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        result = calls
+        await asyncio.sleep(0)
+        return result
+
+    singleflight = SingleFlight(max_waiters=2)
+
+    results = await asyncio.gather(*(singleflight.do('key', call) for _ in range(4)))
+
+    assert calls == 2
+    assert sorted(results.count(result) for result in set(results)) == [1, 3]
+    assert singleflight.snapshot() == {'calls': 4, 'collapsed': 2, 'overflow': 1, 'in_flight': 0}
+
+    assert await singleflight.do('key', call) == 3
+
+
+@dataclass(frozen=True)
+class CountCommand(BaseReadCommand):
+    key: str
+
+
+@dataclass(frozen=True)
+class StreamCommand(BaseReadCommand):
+    collapsible = False
+    key: str
+
+
+@dataclass(frozen=True)
+class CountingHandler(CommandHandler[BaseReadCommand, Any]):
+    calls: list[BaseReadCommand] = field(default_factory=list)
+
+    async def handle(self, command: BaseReadCommand) -> Any:
+        self.calls.append(command)
+        await asyncio.sleep(0)
+
+        if isinstance(command, StreamCommand):
+            return stream_items()
+
+        return len(self.calls)
+
+
+async def stream_items() -> AsyncIterator[dict]:
+    yield {'oid': 'a'}
+    yield {'oid': 'b'}
+
+
+@pytest.mark.asyncio
+async def test_mediator_runs_lazy_read_commands_separately():
+    handler = CountingHandler()
+    mediator = Mediator(singleflight=SingleFlight())
+    mediator.register_command(CountCommand, [handler])
+    mediator.register_command(StreamCommand, [handler])
+
+    assert await asyncio.gather(*(mediator.send(CountCommand(key='a')) for _ in range(3))) == [1, 1, 1]
+
+    streams = await asyncio.gather(*(mediator.send(StreamCommand(key='a')) for _ in range(3)))
+
+    assert len(handler.calls) == 4
+    assert len({id(stream) for stream in streams}) == 3
+    assert [[item async for item in stream] for stream in streams] == [[{'oid': 'a'}, {'oid': 'b'}]] * 3